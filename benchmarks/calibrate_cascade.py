@@ -0,0 +1,109 @@
+"""Calibrate RECOGNITION.CASCADE thresholds on the enrolled dataset.
+
+Every dataset image goes through the live path: YOLO face crop, then the fast
+model, then a search of the fast gallery. For each image this records the
+cosine distance to its own person's row (genuine) and to the nearest other
+person (impostor). It then suggests:
+    ACCEPT_THRESHOLD: below almost every impostor distance (--impostor-quantile)
+    REJECT_THRESHOLD: above almost every genuine distance  (--genuine-quantile)
+
+Gallery rows are per-person means that include the image being scored, so
+genuine distances come out slightly optimistic. Enroll a few extra images,
+or keep a margin.
+
+Usage (from the project root, with the cascade enabled and precompute_embeddings.py run):
+    python benchmarks/calibrate_cascade.py --limit 500
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from common import dataset_images, git_revision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest cascade accept/reject thresholds from the dataset.")
+    parser.add_argument('--dataset', default='dataset')
+    parser.add_argument('--limit', type=int, default=None, help="Images to score (default: all)")
+    parser.add_argument('--impostor-quantile', type=float, default=0.01)
+    parser.add_argument('--genuine-quantile', type=float, default=0.99)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    import cv2
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.recognize_faces import FaceRecognizer
+    from src.utils import l2_normalize
+
+    recognizer = FaceRecognizer(warmup=False)
+    if not recognizer.fast_model_name:
+        print("RECOGNITION.CASCADE is disabled or its fast gallery is missing; nothing to calibrate.")
+        return
+    label_rows = {label: row for row, label in enumerate(recognizer.labels)}
+
+    genuine, impostor = [], []
+    for path in dataset_images(args.dataset, args.limit):
+        person = os.path.basename(os.path.dirname(path))
+        image = cv2.imread(path)
+        if image is None or person not in label_rows:
+            continue
+        faces = recognizer.detect_faces(image)
+        if not len(faces):
+            continue
+        x, y, w, h = faces.boxes[int(np.argmax(faces.boxes[:, 2] * faces.boxes[:, 3]))]
+        embedding = recognizer._embed(image[y:y + h, x:x + w], recognizer.fast_model_name, 'embed_fast')
+        if embedding is None:
+            continue
+        similarities, rows = recognizer.fast_index.search(l2_normalize(embedding[None, :]),
+                                                          recognizer.fast_index.ntotal)
+        distances = dict(zip(rows[0].tolist(), (1.0 - similarities[0]).tolist()))
+        own = label_rows[person]
+        genuine.append(distances[own])
+        others = [d for row, d in distances.items() if row != own]
+        if others:
+            impostor.append(min(others))
+
+    if not genuine or not impostor:
+        print("Not enough scored images (need at least two enrolled people).")
+        return
+
+    genuine, impostor = np.array(genuine), np.array(impostor)
+    accept = float(np.quantile(impostor, args.impostor_quantile))
+    reject = float(np.quantile(genuine, args.genuine_quantile))
+    escalated = float(np.mean((genuine > accept) & (genuine <= reject)))
+
+    print(f"Fast model {recognizer.fast_model_name}: {len(genuine)} images scored")
+    print(f"  genuine  cosine distance p50 {np.median(genuine):.3f}, p{args.genuine_quantile * 100:.0f} {reject:.3f}")
+    print(f"  impostor cosine distance p50 {np.median(impostor):.3f}, p{args.impostor_quantile * 100:.0f} {accept:.3f}")
+    if accept >= reject:
+        print("⚠️ Genuine and impostor distances barely overlap; any ACCEPT < REJECT works. Suggesting the midpoint.")
+        accept = reject = (accept + reject) / 2
+    print(f"\nSuggested config (genuine faces sent to the main model: {escalated:.1%}):")
+    print(f"  CASCADE:\n    ACCEPT_THRESHOLD: {accept:.2f}\n    REJECT_THRESHOLD: {reject:.2f}")
+
+    result = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'fast_model': recognizer.fast_model_name,
+        'images': int(len(genuine)),
+        'genuine_quantiles': {q: float(np.quantile(genuine, q)) for q in (0.5, 0.9, 0.99)},
+        'impostor_quantiles': {q: float(np.quantile(impostor, q)) for q in (0.01, 0.1, 0.5)},
+        'accept_threshold': accept,
+        'reject_threshold': reject,
+        'escalated_genuine_share': escalated,
+    }
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"cascade-{result['revision']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to: {output}")
+
+
+if __name__ == "__main__":
+    main()
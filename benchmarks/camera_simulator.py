@@ -0,0 +1,204 @@
+"""Synthetic cameras for load testing without real hardware.
+
+Serves N MJPEG streams built from dataset/ images:
+    python benchmarks/camera_simulator.py --cameras 8 --fps 15 --faces 3
+    # -> http://127.0.0.1:8554/cam/0 ... /cam/7, stats at /stats
+
+or writes N looping video files for file-backed VideoCapture sources:
+    python benchmarks/camera_simulator.py --cameras 8 --write-files benchmarks/results/sim
+
+Either way it prints a CAMERA_SOURCES block for config.yaml.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from common import load_face_tiles
+
+
+class SyntheticCamera:
+    """A looping clip of `clip_frames` frames with `faces` dataset faces
+    drifting across a `width`x`height` background, pre-encoded as JPEG so
+    serving many cameras costs little CPU. Only the JPEGs are kept; raw
+    frames are re-rendered when a video file is written."""
+
+    def __init__(self, camera_id, width=1280, height=720, fps=15, faces=3, tile=160,
+                 clip_frames=60, dataset_dir='dataset', quality=80):
+        import cv2
+        self.camera_id = camera_id
+        self.fps = fps
+        self.width, self.height = width, height
+        rng = random.Random(camera_id)
+
+        self.tile = tile
+        self.tiles = load_face_tiles(faces + camera_id, tile, dataset_dir)[camera_id:] if faces else []
+        # Start positions and per-frame drift of each face
+        self.starts = [(rng.randrange(0, max(1, width - tile)), rng.randrange(0, max(1, height - tile)))
+                       for _ in self.tiles]
+        self.drift = [(rng.choice((-3, -2, 2, 3)), rng.choice((-2, -1, 1, 2))) for _ in self.tiles]
+
+        # Raw frames (~2.7 MB each at 720p) would sit in the load-tested process; keep only JPEGs
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.jpegs = [cv2.imencode('.jpg', self.render(f, frame), [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+                      for f in range(clip_frames)]
+
+        self.sent = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def render(self, f, out=None):
+        """Frame `f` of the clip, drawn into `out` if given."""
+        frame = out if out is not None else np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[:] = 40
+        tile = self.tile
+        for t, (x0, y0), (dx, dy) in zip(self.tiles, self.starts, self.drift):
+            x = (x0 + dx * f) % max(1, self.width - tile)
+            y = (y0 + dy * f) % max(1, self.height - tile)
+            frame[y:y + tile, x:x + tile] = t
+        return frame
+
+    def frame_index(self, now):
+        """Index of the frame a real camera would be showing at `now`."""
+        return int(now * self.fps)
+
+    def count(self, sent=0, skipped=0):
+        with self._lock:
+            self.sent += sent
+            self.skipped += skipped
+
+    def write_video(self, path, seconds=60):
+        import cv2
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (self.width, self.height))
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        for i in range(int(seconds * self.fps)):
+            writer.write(self.render(i % len(self.jpegs), frame))
+        writer.release()
+
+
+def _make_handler(cameras):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == '/stats':
+                body = json.dumps({str(c.camera_id): {'sent': c.sent, 'skipped': c.skipped}
+                                   for c in cameras}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != 'cam' or not parts[1].isdigit() or int(parts[1]) >= len(cameras):
+                self.send_error(404)
+                return
+            cam = cameras[int(parts[1])]
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+            self.end_headers()
+            last = None
+            try:
+                while True:
+                    now = time.monotonic()
+                    index = cam.frame_index(now)
+                    if last is not None:
+                        # A reader slower than the camera misses frames, like a real stream
+                        cam.count(skipped=max(0, index - last - 1))
+                    jpeg = cam.jpegs[index % len(cam.jpegs)]
+                    self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                                     + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+                    cam.count(sent=1)
+                    last = index
+                    time.sleep(max(0.0, (index + 1) / cam.fps - time.monotonic()))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+
+class CameraSimulator:
+    """N synthetic MJPEG cameras on one HTTP port (/cam/<i>, /stats)."""
+
+    def __init__(self, n, host='127.0.0.1', port=8554, **camera_kwargs):
+        self.cameras = [SyntheticCamera(i, **camera_kwargs) for i in range(n)]
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self.cameras))
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name='camera-sim', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def sources(self):
+        return [{'name': f'Sim-{c.camera_id}', 'source': f"{self.base_url}/cam/{c.camera_id}"}
+                for c in self.cameras]
+
+    def stats(self):
+        return {c.camera_id: {'sent': c.sent, 'skipped': c.skipped} for c in self.cameras}
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _print_sources(sources):
+    print("\nCAMERA_SOURCES:")
+    for s in sources:
+        print(f"  - name: \"{s['name']}\"\n    source: \"{s['source']}\"")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic MJPEG cameras built from dataset/ images.")
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--fps', type=float, default=15)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--faces', type=int, default=3, help="Faces per frame")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8554)
+    parser.add_argument('--dataset', default='dataset')
+    parser.add_argument('--write-files', metavar='DIR', help="Write looping .mp4 files instead of serving")
+    parser.add_argument('--seconds', type=float, default=60, help="Length of each written file")
+    args = parser.parse_args()
+
+    camera_kwargs = dict(width=args.width, height=args.height, fps=args.fps, faces=args.faces,
+                         dataset_dir=args.dataset)
+
+    if args.write_files:
+        os.makedirs(args.write_files, exist_ok=True)
+        sources = []
+        for i in range(args.cameras):
+            path = os.path.join(args.write_files, f"cam{i}.mp4")
+            SyntheticCamera(i, **camera_kwargs).write_video(path, args.seconds)
+            sources.append({'name': f'Sim-{i}', 'source': path})
+            print(f"Wrote {path}")
+        _print_sources(sources)
+        return
+
+    sim = CameraSimulator(args.cameras, args.host, args.port, **camera_kwargs).start()
+    print(f"📹 Serving {args.cameras} synthetic cameras at {sim.base_url}/cam/<i> "
+          f"({args.width}x{args.height} @ {args.fps} fps, {args.faces} faces)")
+    _print_sources(sim.sources())
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import glob
+import time
+import random
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def time_call(fn, repeat=20, warmup=2):
+    """Run fn repeatedly and return latency stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples = np.array(samples)
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'min_ms': float(samples.min()),
+        'max_ms': float(samples.max()),
+        'repeat': repeat,
+    }
+
+
+def dataset_images(dataset_dir='dataset', limit=None, seed=0):
+    """Paths of bundled dataset images, shuffled deterministically."""
+    paths = sorted(glob.glob(os.path.join(dataset_dir, '*', '*.jpg')) +
+                   glob.glob(os.path.join(dataset_dir, '*', '*.jpeg')) +
+                   glob.glob(os.path.join(dataset_dir, '*', '*.png')))
+    random.Random(seed).shuffle(paths)
+    return paths[:limit] if limit else paths
+
+
+def load_face_tiles(n, size=160, dataset_dir='dataset'):
+    """Load n dataset images resized to square tiles (reused cyclically)."""
+    import cv2
+    paths = dataset_images(dataset_dir)
+    if not paths:
+        raise RuntimeError(f"No images found in {dataset_dir}")
+    tiles = []
+    for i in range(n):
+        img = cv2.imread(paths[i % len(paths)])
+        tiles.append(cv2.resize(img, (size, size)))
+    return tiles
+
+
+def compose_frame(faces_per_frame, width=1280, height=720, tile=160, dataset_dir='dataset'):
+    """Synthetic frame with faces_per_frame dataset images pasted on a grid."""
+    frame = np.full((height, width, 3), 40, dtype=np.uint8)
+    if faces_per_frame == 0:
+        return frame
+    tiles = load_face_tiles(faces_per_frame, tile, dataset_dir)
+    cols = max(1, width // (tile + 20))
+    for i, t in enumerate(tiles):
+        row, col = divmod(i, cols)
+        y, x = 20 + row * (tile + 20), 20 + col * (tile + 20)
+        if y + tile > height:
+            break
+        frame[y:y + tile, x:x + tile] = t
+    return frame
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return 'unknown'
@@ -0,0 +1,47 @@
+"""Compare two benchmark result files: python benchmarks/compare.py base.json new.json"""
+import sys
+import json
+
+KEY_FIELDS = ('faces_per_frame', 'crops', 'gallery_size', 'queries')
+
+
+def _key(entry):
+    return tuple((k, entry[k]) for k in KEY_FIELDS if k in entry)
+
+
+def compare(base, new):
+    for group, new_entries in new['results'].items():
+        base_entries = base['results'].get(group)
+        if base_entries is None:
+            continue
+        print(f"\n{group}")
+        if isinstance(new_entries, dict):
+            b, n = base_entries['images_per_second'], new_entries['images_per_second']
+            change = (n - b) / b * 100 if b else 0.0
+            print(f"  images/s {b:10.2f} -> {n:10.2f} ({change:+.1f}%)")
+            continue
+        base_by_key = {_key(e): e for e in base_entries}
+        for entry in new_entries:
+            old = base_by_key.get(_key(entry))
+            if not old:
+                continue
+            label = ' '.join(f"{k}={v}" for k, v in _key(entry))
+            b, n = old['p50_ms'], entry['p50_ms']
+            change = (n - b) / b * 100 if b else 0.0
+            print(f"  {label:32s} p50 {b:10.3f} -> {n:10.3f} ms ({change:+.1f}%)")
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        base = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+    print(f"Base: {base['revision']}  New: {new['revision']}")
+    compare(base, new)
+
+
+if __name__ == "__main__":
+    main()
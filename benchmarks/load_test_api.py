@@ -0,0 +1,108 @@
+"""Load-test the Flask and ASGI APIs side by side.
+
+Start both servers first, e.g.
+    python serve_api.py                                   # Flask on :5000
+    uvicorn src.api_async:app --port 5001 --workers 4     # ASGI on :5001
+
+then
+    python benchmarks/load_test_api.py --email you@x --password ... \\
+        --target flask=http://127.0.0.1:5000 --target asgi=http://127.0.0.1:5001
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+DEFAULT_PATHS = ['/students', '/cameras', '/attendance?limit=100', '/attendance/summary/daily']
+
+
+async def _login(client, base_url, email, password):
+    r = await client.post(f"{base_url}/auth/login", json={'email': email, 'password': password})
+    r.raise_for_status()
+    return r.json()['token']
+
+
+async def _worker(client, base_url, token, paths, deadline, latencies, errors):
+    i = 0
+    headers = {'Authorization': token}
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            r = await client.get(f"{base_url}{path}", headers=headers)
+            if r.status_code != 200:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+async def run_target(name, base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        token = args.token or await _login(client, base_url, args.email, args.password)
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(_worker(client, base_url, token, args.paths, deadline, latencies, errors)
+                               for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        'target': name,
+        'url': base_url,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'p99_ms': _percentile(latencies, 0.99),
+    }
+    print(f"{name:8s} {result['requests_per_second']:9.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+          f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
+    return result
+
+
+async def main_async(args):
+    results = []
+    for target in args.target:
+        name, _, url = target.partition('=')
+        results.append(await run_target(name, url.rstrip('/'), args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare API throughput and tail latency.")
+    parser.add_argument('--target', action='append', required=True, help="name=base_url (repeatable)")
+    parser.add_argument('--email')
+    parser.add_argument('--password')
+    parser.add_argument('--token', help="Use an existing JWT instead of logging in")
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds per target")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    if not args.token and not (args.email and args.password):
+        parser.error("--token or --email/--password required")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
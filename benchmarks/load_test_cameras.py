@@ -0,0 +1,167 @@
+"""Find how many cameras one server can process.
+
+Ramps the number of synthetic cameras (benchmarks/camera_simulator.py) fed
+through the real camera loop (headless) and records, per step, pipeline FPS
+per camera, recognize latency and the share of frames the cameras produced
+that were never processed.
+
+The THREADS budget is applied as run_video.py does, sized for the largest
+count (or --budget-workers), so the limit reflects the budgeted setup rather
+than every library's default pool size.
+
+Usage (from the project root, models and embeddings must exist):
+    python benchmarks/load_test_cameras.py --counts 1,2,4,8 --fps 15 --faces 3
+    python benchmarks/load_test_cameras.py --simulator http://10.0.0.5:8554   # external simulator
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# numpy/cv2 (via common and camera_simulator) are imported in main(), after the
+# thread budget's environment variables are exported
+
+
+def _sim_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as r:
+        return json.loads(r.read())
+
+
+def run_step(n, base_url, recognizer, duration, warmup, step_tag):
+    from src.metrics import REGISTRY
+    from src.threads import configure_worker_thread
+    from src.utils import AttendanceManager, DedupeManager
+    from ui.video_stream import _camera_loop
+
+    def run(i, source, name):
+        configure_worker_thread(i)  # as run_video.py's camera threads do
+        _camera_loop(source, name, recognizer, attendance, dedupe, stop_event, display=False)
+
+    # No database/CSV: only the recognition path is measured
+    attendance = AttendanceManager(roll_numbers=recognizer.roll_numbers)
+    dedupe = DedupeManager()
+    stop_event = threading.Event()
+    names = [f"{step_tag}-cam{i}" for i in range(n)]
+    threads = [threading.Thread(target=run, args=(i, f"{base_url}/cam/{i}", name), daemon=True)
+               for i, name in enumerate(names)]
+    for t in threads:
+        t.start()
+
+    time.sleep(warmup)
+    before_frames = {name: REGISTRY.value('frames_processed_total', camera=name) for name in names}
+    before_sim = _sim_stats(base_url)
+    start = time.monotonic()
+    time.sleep(duration)
+    elapsed = time.monotonic() - start
+    after_frames = {name: REGISTRY.value('frames_processed_total', camera=name) for name in names}
+    after_sim = _sim_stats(base_url)
+
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=10)
+
+    cameras = []
+    for i, name in enumerate(names):
+        sent = after_sim[str(i)]['sent'] - before_sim[str(i)]['sent']
+        skipped = after_sim[str(i)]['skipped'] - before_sim[str(i)]['skipped']
+        latency = REGISTRY.quantiles('face_stage_seconds', stage='recognize', camera=name)
+        cameras.append({
+            'camera': i,
+            'fps': (after_frames[name] - before_frames[name]) / elapsed,
+            'drop_rate': skipped / (sent + skipped) if sent + skipped else 0.0,
+            'recognize_p50_ms': latency.get('p50', 0.0) * 1000.0,
+            'recognize_p95_ms': latency.get('p95', 0.0) * 1000.0,
+        })
+
+    return {
+        'cameras': n,
+        'mean_fps': sum(c['fps'] for c in cameras) / n,
+        'min_fps': min(c['fps'] for c in cameras),
+        'mean_drop_rate': sum(c['drop_rate'] for c in cameras) / n,
+        'max_recognize_p95_ms': max(c['recognize_p95_ms'] for c in cameras),
+        'per_camera': cameras,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp synthetic cameras to find the per-server camera limit.")
+    parser.add_argument('--counts', default='1,2,4,8,16', help="Camera counts to test, in order")
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds per step")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds before measuring each step")
+    parser.add_argument('--fps', type=float, default=15)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--faces', type=int, default=3, help="Faces per frame")
+    parser.add_argument('--min-fps', type=float, default=None,
+                        help="Per-camera FPS a step must sustain (default: 80%% of --fps)")
+    parser.add_argument('--simulator', help="Base URL of an already running camera_simulator.py")
+    parser.add_argument('--budget-workers', type=int, default=None,
+                        help="Cameras the thread budget is sized for (default: the largest count)")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.counts.split(',') if c]
+    min_fps = args.min_fps if args.min_fps is not None else 0.8 * args.fps
+
+    # Same budget as run_video.py for this many cameras; the OMP/BLAS variables
+    # only take effect before numpy/cv2/torch are first imported
+    from src.utils import load_config
+    from src.threads import export_thread_env, apply_thread_budget
+    config = load_config() or {}
+    budget_workers = args.budget_workers or max(counts)
+    export_thread_env(config, budget_workers)
+
+    from common import git_revision
+    from camera_simulator import CameraSimulator
+    apply_thread_budget(config, budget_workers)
+
+    sim = None
+    base_url = args.simulator
+    if not base_url:
+        sim = CameraSimulator(max(counts), port=0, width=args.width, height=args.height,
+                              fps=args.fps, faces=args.faces).start()
+        base_url = sim.base_url
+    print(f"📹 Synthetic cameras at {base_url}")
+
+    from src.recognize_faces import FaceRecognizer
+    recognizer = FaceRecognizer()
+
+    steps, limit = [], 0
+    for n in counts:
+        print(f"\n▶ {n} camera(s): {args.warmup:.0f}s warm-up, {args.duration:.0f}s measured")
+        step = run_step(n, base_url, recognizer, args.duration, args.warmup, f"n{n}")
+        steps.append(step)
+        print(f"  fps/camera mean {step['mean_fps']:.1f} (min {step['min_fps']:.1f}), "
+              f"drop rate {step['mean_drop_rate']:.1%}, recognize p95 {step['max_recognize_p95_ms']:.0f} ms")
+        if step['min_fps'] >= min_fps:
+            limit = n
+
+    if sim:
+        sim.stop()
+
+    print(f"\n✅ Highest camera count sustaining {min_fps:.1f} fps per camera: {limit or 'none tested'}")
+
+    result = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'settings': {'fps': args.fps, 'width': args.width, 'height': args.height, 'faces': args.faces,
+                     'duration': args.duration, 'min_fps': min_fps, 'budget_workers': budget_workers},
+        'camera_limit': limit,
+        'steps': steps,
+    }
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"cameras-{result['revision']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""End-to-end benchmarks for the recognition pipeline.
+
+Usage:
+    python benchmarks/run_benchmarks.py                 # all benchmarks
+    python benchmarks/run_benchmarks.py --only faiss    # one group
+    python benchmarks/compare.py old.json new.json      # diff two runs
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from common import time_call, compose_frame, load_face_tiles, dataset_images, git_revision
+
+
+# ---------------- Benchmarks ----------------
+def bench_detection(recognizer, repeat):
+    results = []
+    for faces in (0, 1, 4, 8):
+        frame = compose_frame(faces)
+        stats = time_call(lambda: recognizer.yolo_model(frame, verbose=False, device=recognizer.device),
+                          repeat=repeat)
+        results.append({'faces_per_frame': faces, **stats})
+        print(f"  detection faces={faces}: p50 {stats['p50_ms']:.1f} ms")
+    return results
+
+
+def bench_embedding(recognizer, repeat):
+    # The pipeline embeds crops one DeepFace.represent call at a time (there is
+    # no batched embedding path), so this is the cost of N crops in sequence
+    results = []
+    for crops_per_call in (1, 4, 8, 16):
+        crops = load_face_tiles(crops_per_call)
+        stats = time_call(lambda: recognizer.match_crops(crops), repeat=max(3, repeat // 4))
+        stats['per_face_ms'] = stats['p50_ms'] / crops_per_call
+        results.append({'crops': crops_per_call, **stats})
+        print(f"  embedding+search crops={crops_per_call} (sequential): {stats['per_face_ms']:.1f} ms/face")
+    return results
+
+
+# Output size of DeepFace's models, so the FAISS benchmark runs without loading one
+EMBEDDING_DIMENSIONS = {
+    'VGG-Face': 4096, 'Facenet': 128, 'Facenet512': 512, 'OpenFace': 128, 'DeepFace': 4096,
+    'DeepID': 160, 'ArcFace': 512, 'Dlib': 128, 'SFace': 128, 'GhostFaceNet': 512,
+}
+
+
+def embedding_dimension(config):
+    model = (config.get('RECOGNITION', {}) or {}).get('EMBEDDING_MODEL', 'VGG-Face')
+    return EMBEDDING_DIMENSIONS.get(str(model).strip(), 4096)
+
+
+def bench_faiss(repeat, dimension=4096):
+    import faiss
+    rng = np.random.default_rng(0)
+    results = []
+    for gallery_size in (10, 1_000, 10_000, 100_000):
+        index = faiss.IndexFlatL2(dimension)
+        # float32 directly: a float64 draw of 100k x 4096 alone would be ~3.3 GB
+        index.add(rng.standard_normal((gallery_size, dimension), dtype=np.float32))
+        for n_queries in (1, 16):
+            queries = rng.standard_normal((n_queries, dimension), dtype=np.float32)
+            stats = time_call(lambda: index.search(queries, 1), repeat=repeat)
+            results.append({'gallery_size': gallery_size, 'queries': n_queries, 'dimension': dimension, **stats})
+            print(f"  faiss gallery={gallery_size} queries={n_queries}: p50 {stats['p50_ms']:.3f} ms")
+    return results
+
+
+def bench_recognize(recognizer, repeat):
+    results = []
+    for faces in (0, 1, 2, 4, 8):
+        frame = compose_frame(faces)
+        stats = time_call(lambda: recognizer.recognize_face(frame), repeat=max(3, repeat // 2))
+        results.append({'faces_per_frame': faces, **stats})
+        print(f"  recognize_face faces={faces}: p50 {stats['p50_ms']:.1f} ms")
+    return results
+
+
+def bench_enrollment(recognizer, n_images=20):
+    from deepface import DeepFace
+    paths = dataset_images(limit=n_images)
+    start = time.perf_counter()
+    for path in paths:
+        DeepFace.represent(img_path=path, model_name=recognizer.embedding_model_name,
+                           enforce_detection=False, detector_backend='opencv')
+    elapsed = time.perf_counter() - start
+    result = {'images': len(paths), 'seconds': elapsed,
+              'images_per_second': len(paths) / elapsed if elapsed > 0 else 0.0}
+    print(f"  enrollment: {result['images_per_second']:.2f} images/s")
+    return result
+
+
+GROUPS = ('detection', 'embedding', 'faiss', 'recognize', 'enrollment')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition pipeline.")
+    parser.add_argument('--only', choices=GROUPS, action='append', help="Run only these groups")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/<rev>.json)")
+    args = parser.parse_args()
+
+    groups = args.only or list(GROUPS)
+    revision = git_revision()
+    report = {
+        'revision': revision,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'results': {},
+    }
+
+    recognizer = None
+    if any(g != 'faiss' for g in groups):
+        from src.recognize_faces import FaceRecognizer
+        recognizer = FaceRecognizer()
+        report['device'] = recognizer.device
+        report['embedding_model'] = recognizer.embedding_model_name
+
+    for group in groups:
+        print(f"Running {group}...")
+        if group == 'detection':
+            report['results'][group] = bench_detection(recognizer, args.repeat)
+        elif group == 'embedding':
+            report['results'][group] = bench_embedding(recognizer, args.repeat)
+        elif group == 'faiss':
+            # Same vector size as the gallery the recognizer actually searches
+            if recognizer is not None:
+                dimension = recognizer.faiss_index.d
+            else:
+                from src.utils import load_config
+                dimension = embedding_dimension(load_config() or {})
+            report['results'][group] = bench_faiss(args.repeat, dimension)
+        elif group == 'recognize':
+            report['results'][group] = bench_recognize(recognizer, args.repeat)
+        elif group == 'enrollment':
+            report['results'][group] = bench_enrollment(recognizer)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# Production server for the API: gunicorn -c gunicorn.conf.py src.api_backend:app
+import os
+import multiprocessing
+
+bind = os.getenv('API_BIND', '0.0.0.0:5000')
+
+# Each worker process loads its own FaceRecognizer on the first /recognize call;
+# the FAISS gallery is shared between them when RECOGNITION.MMAP_INDEX is on.
+workers = int(os.getenv('API_WORKERS', max(2, multiprocessing.cpu_count() // 4)))
+
+# Threads feed concurrent requests into the per-worker batching queue
+worker_class = 'gthread'
+threads = int(os.getenv('API_THREADS', 16))
+
+# Model loading can take a while on the first recognition request
+timeout = 120
+graceful_timeout = 30
+
+# Models must be loaded after fork (CUDA/TensorFlow don't survive it)
+preload_app = False
+
+
+def on_starting(server):
+    # Runs once in the master before any worker starts
+    from src.api_backend import init_db
+    init_db()
@@ -0,0 +1,15 @@
+import sys
+import os
+
+# Add the project root to Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+
+from src.batch_process import main
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Face Recognition System - Offline Batch Processing")
+    print("=" * 60)
+    main()
@@ -6,6 +6,13 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
+# The OMP/MKL/OpenBLAS variables are only read when numpy/cv2/torch first
+# load, so the thread budget is exported before ui.video_stream imports them
+from src.utils import load_config
+from src.threads import export_thread_env
+
+_config = load_config() or {}
+export_thread_env(_config, len(_config.get('CAMERA_SOURCES') or []) or 1)
 
 from ui.video_stream import run_video_stream
 
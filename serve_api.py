@@ -0,0 +1,23 @@
+import sys
+import os
+
+# Add the project root to Python path
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Face Recognition System - API Server")
+    print("=" * 60)
+
+    if os.name == 'nt':
+        # gunicorn doesn't run on Windows; waitress serves the same app with a thread pool
+        from waitress import serve
+        from src.api_backend import app, init_db
+        init_db()
+        serve(app, host='0.0.0.0', port=int(os.getenv('API_PORT', 5000)),
+              threads=int(os.getenv('API_THREADS', 16)))
+    else:
+        os.execvp('gunicorn', ['gunicorn', '-c', os.path.join(project_root, 'gunicorn.conf.py'),
+                               'src.api_backend:app'])
@@ -0,0 +1,417 @@
+"""ASGI variant of the attendance API (same routes and JWT contract as api_backend.py).
+
+Handlers are async: SQLite goes through aiosqlite, password hashing and image
+decoding run on the thread pool, and recognition awaits the shared batching
+queue, so slow requests never hold up the dashboard's polling.
+
+    uvicorn src.api_async:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import os
+import sys
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from functools import wraps
+
+import aiosqlite
+import jwt
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import (DB_PATH, connect, create_schema, attendance_row, INSERT_ATTENDANCE,
+                          attendance_query, attendance_record, daily_summary_query,
+                          student_summary_query, camera_summary_query,
+                          bulk_insert_students, bulk_insert_cameras, parse_import_rows)
+from src.events import BUS, sse_format
+from src.cluster import start_bus_relay
+from src.auth import seed_users, issue_token, decode_token, revoke_token, check_password_hash, TOKEN_CACHE
+
+# Load environment variables from .env
+load_dotenv()
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'PLACEHOLDER_SECRET_KEY')
+
+
+# ---------------- Async Connection Pool ----------------
+class AsyncConnectionPool:
+    """Fixed set of aiosqlite connections (each runs on its own thread)."""
+
+    def __init__(self, db_path=DB_PATH, size=8):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "asyncio.Queue" = None
+
+    async def open(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.db_path, timeout=10)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+
+    async def fetchall(self, query, params=()):
+        conn = await self._idle.get()
+        try:
+            async with conn.execute(query, params) as cur:
+                return await cur.fetchall()
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def execute_commit(self, query, params=()):
+        """Run one write statement and commit. Returns the cursor's rowcount."""
+        conn = await self._idle.get()
+        try:
+            cur = await conn.execute(query, params)
+            await conn.commit()
+            return cur.rowcount
+        except Exception:
+            await conn.rollback()
+            raise
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def stream(self, query, params=(), chunk=1000):
+        conn = await self._idle.get()
+        try:
+            async with conn.execute(query, params) as cur:
+                while True:
+                    rows = await cur.fetchmany(chunk)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            self._idle.put_nowait(conn)
+
+
+db_pool = AsyncConnectionPool(DB_PATH, size=int(os.getenv('DB_POOL_SIZE', 8)))
+
+
+def _init_db():
+    conn = connect(DB_PATH)
+    create_schema(conn)
+    seed_users(conn)
+    conn.close()
+
+
+# token_required runs on the event loop, so it only reads the in-memory revoked
+# set; revoked_tokens is re-read by this task on the thread pool
+TOKEN_CACHE.sync_on_read = False
+
+
+async def _sync_revocations():
+    while True:
+        await run_in_threadpool(TOKEN_CACHE.sync)
+        await asyncio.sleep(TOKEN_CACHE.sync_interval)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(_init_db)
+    await db_pool.open()
+    revocation_sync = asyncio.create_task(_sync_revocations())
+    try:
+        yield
+    finally:
+        revocation_sync.cancel()
+        await db_pool.close()
+
+
+# ---------------- JWT Token Protection ----------------
+def token_required(handler=None, *, allow_query=False):
+    """Same contract as api_backend.token_required: ?token= only where
+    allow_query=True (the SSE stream)."""
+    if handler is None:
+        return lambda h: token_required(h, allow_query=allow_query)
+
+    @wraps(handler)
+    async def decorated(request):
+        token = request.headers.get('Authorization')
+        if not token and allow_query:
+            token = request.query_params.get('token')
+        if not token:
+            return JSONResponse({'error': 'Token missing'}, status_code=401)
+        try:
+            data = decode_token(token, SECRET_KEY)
+            current_user = data['email']
+        except jwt.ExpiredSignatureError:
+            return JSONResponse({'error': 'Token expired'}, status_code=401)
+        except jwt.InvalidTokenError:
+            return JSONResponse({'error': 'Invalid token'}, status_code=401)
+        return await handler(request, current_user)
+    return decorated
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return {}
+
+
+# ---------------- Authentication ----------------
+async def login(request):
+    data = await _json_body(request)
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return JSONResponse({'error': 'Email and password required'}, status_code=400)
+
+    rows = await db_pool.fetchall("SELECT * FROM users WHERE email=?", (email,))
+    user = rows[0] if rows else None
+
+    # Password hashing is deliberately slow; keep it off the event loop
+    if not user or not await run_in_threadpool(check_password_hash, user[2], password):
+        return JSONResponse({'error': 'Invalid credentials'}, status_code=401)
+
+    return JSONResponse({'token': issue_token(user[0], user[1], SECRET_KEY)})
+
+
+@token_required
+async def logout(request, current_user):
+    # Writes the shared revoked_tokens table; keep it off the event loop
+    await run_in_threadpool(revoke_token, request.headers.get('Authorization'))
+    return JSONResponse({'message': 'Logged out'})
+
+
+# ---------------- Students ----------------
+@token_required
+async def get_students(request, current_user):
+    rows = await db_pool.fetchall("SELECT roll_no, name, dataset_folder FROM students")
+    return JSONResponse([{'roll_no': row[0], 'name': row[1], 'dataset_folder': row[2]} for row in rows])
+
+
+@token_required
+async def add_student(request, current_user):
+    data = await _json_body(request)
+    roll_no = data.get('roll_no')
+    name = data.get('name')
+    if not roll_no or not name:
+        return JSONResponse({'error': 'Missing fields'}, status_code=400)
+    await db_pool.execute_commit("INSERT OR IGNORE INTO students (roll_no, name) VALUES (?, ?)",
+                                 (roll_no, name))
+    return JSONResponse({'message': f'Student {name} added successfully'})
+
+
+async def _import_rows(request):
+    if request.headers.get('content-type', '').startswith('multipart/'):
+        form = await request.form()
+        files = [f for _, f in form.multi_items() if hasattr(f, 'read')]
+        return parse_import_rows(await files[0].read(), 'text/csv') if files else []
+    return parse_import_rows(await request.body(), request.headers.get('content-type', ''))
+
+
+def _bulk_import(fn, rows, **kwargs):
+    # Runs on the thread pool: one short-lived connection, one transaction
+    conn = connect(DB_PATH)
+    try:
+        return fn(conn, rows, **kwargs)
+    finally:
+        conn.close()
+
+
+@token_required
+async def add_students_bulk(request, current_user):
+    try:
+        rows = await _import_rows(request)
+    except ValueError as e:
+        return JSONResponse({'error': f'Could not parse import: {e}'}, status_code=400)
+    statuses = await run_in_threadpool(_bulk_import, bulk_insert_students, rows,
+                                       update_existing=bool(request.query_params.get('update')))
+    return JSONResponse(statuses)
+
+
+# ---------------- Cameras ----------------
+@token_required
+async def get_cameras(request, current_user):
+    rows = await db_pool.fetchall("SELECT * FROM cameras")
+    return JSONResponse([{'camera_id': row[0], 'ip_address': row[1]} for row in rows])
+
+
+@token_required
+async def add_camera(request, current_user):
+    data = await _json_body(request)
+    ip_address = data.get('ip_address')
+    if not ip_address:
+        return JSONResponse({'error': 'Missing IP address'}, status_code=400)
+    await db_pool.execute_commit("INSERT INTO cameras (ip_address) VALUES (?)", (ip_address,))
+    return JSONResponse({'message': f'Camera {ip_address} added successfully'})
+
+
+@token_required
+async def add_cameras_bulk(request, current_user):
+    try:
+        rows = await _import_rows(request)
+    except ValueError as e:
+        return JSONResponse({'error': f'Could not parse import: {e}'}, status_code=400)
+    return JSONResponse(await run_in_threadpool(_bulk_import, bulk_insert_cameras, rows))
+
+
+# ---------------- Attendance ----------------
+@token_required
+async def get_attendance(request, current_user):
+    """Same filters and pagination as the Flask GET /attendance."""
+    try:
+        query, params, limit = attendance_query(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    if limit is not None:
+        rows = await db_pool.fetchall(query + " LIMIT ?", params + [limit])
+        headers = {'X-Next-After-Id': str(rows[-1][0])} if len(rows) == limit else None
+        return JSONResponse([attendance_record(r) for r in rows], headers=headers)
+
+    async def generate():
+        first = True
+        yield '['
+        async for rows in db_pool.stream(query, params):
+            chunk = ','.join(json.dumps(attendance_record(r)) for r in rows)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+
+    return StreamingResponse(generate(), media_type='application/json')
+
+
+@token_required
+async def mark_attendance(request, current_user):
+    data = await _json_body(request)
+    roll_no = data.get('roll_no')
+    camera_id = data.get('camera_id')
+    if not roll_no or not camera_id:
+        return JSONResponse({'error': 'Missing fields'}, status_code=400)
+
+    row = attendance_row(roll_no, camera_id)
+    inserted = await db_pool.execute_commit(INSERT_ATTENDANCE, row)
+    if not inserted:
+        return JSONResponse({'message': 'Attendance already marked for today'})
+    BUS.publish('attendance', roll_no=roll_no, camera_id=camera_id, detected_time=row[2], source='api')
+    return JSONResponse({'message': f'Attendance logged for {roll_no} at {row[2]}'})
+
+
+# ---------------- Attendance Summaries ----------------
+async def _summary_response(query, params, to_record):
+    rows = await db_pool.fetchall(query, params)
+    return JSONResponse([to_record(r) for r in rows])
+
+
+@token_required
+async def get_daily_summary(request, current_user):
+    return await _summary_response(*daily_summary_query(request.query_params))
+
+
+@token_required
+async def get_student_summary(request, current_user):
+    return await _summary_response(*student_summary_query(request.query_params))
+
+
+@token_required
+async def get_camera_summary(request, current_user):
+    return await _summary_response(*camera_summary_query(request.query_params))
+
+
+# ---------------- Recognition Service ----------------
+_batcher = None
+_batcher_lock = asyncio.Lock()
+
+
+async def get_batcher():
+    global _batcher
+    if _batcher is None:
+        async with _batcher_lock:
+            if _batcher is None:
+                from src.batching import create_batching_recognizer
+                # Model loading is slow and blocking
+                _batcher = await run_in_threadpool(create_batching_recognizer)
+    return _batcher
+
+
+@token_required
+async def recognize(request, current_user):
+    from src.batching import decode_image
+
+    if request.headers.get('content-type', '').startswith('multipart/'):
+        form = await request.form()
+        blobs = [await f.read() for _, f in form.multi_items() if hasattr(f, 'read')]
+    else:
+        blobs = [await request.body()]
+
+    images = [await run_in_threadpool(decode_image, blob) for blob in blobs]
+    if not images or any(img is None for img in images):
+        return JSONResponse({'error': 'Could not decode one or more images'}, status_code=400)
+
+    batcher = await get_batcher()
+    results = await asyncio.gather(*(asyncio.wrap_future(batcher.submit(img)) for img in images))
+    return JSONResponse([{'faces': r.to_dicts()} for r in results])
+
+
+# ---------------- Live Events (SSE) ----------------
+@token_required(allow_query=True)
+async def stream_events(request, current_user):
+    types = [t for t in request.query_params.get('types', '').split(',') if t] or None
+    start_bus_relay(BUS)  # multi-node: also stream events from the other camera nodes
+    sub = BUS.subscribe(types=types)
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                # Parks until the bus pushes an event; no wakeups while idle
+                event = await sub.get_async(timeout=15)
+                if event:
+                    yield sse_format(event)
+                else:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+        finally:
+            sub.close()
+
+    return StreamingResponse(generate(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def home(request):
+    return JSONResponse({'message': 'Secure Face Recognition Attendance API Running ✅'})
+
+
+routes = [
+    Route('/auth/login', login, methods=['POST']),
+    Route('/auth/logout', logout, methods=['POST']),
+    Route('/students', get_students, methods=['GET']),
+    Route('/students', add_student, methods=['POST']),
+    Route('/students/bulk', add_students_bulk, methods=['POST']),
+    Route('/cameras', get_cameras, methods=['GET']),
+    Route('/cameras', add_camera, methods=['POST']),
+    Route('/cameras/bulk', add_cameras_bulk, methods=['POST']),
+    Route('/attendance', get_attendance, methods=['GET']),
+    Route('/attendance', mark_attendance, methods=['POST']),
+    Route('/attendance/summary/daily', get_daily_summary, methods=['GET']),
+    Route('/attendance/summary/students', get_student_summary, methods=['GET']),
+    Route('/attendance/summary/cameras', get_camera_summary, methods=['GET']),
+    Route('/recognize', recognize, methods=['POST']),
+    Route('/events/stream', stream_events, methods=['GET']),
+    Route('/', home),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                           allow_headers=['*'], expose_headers=['X-Next-After-Id'])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
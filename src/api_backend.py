@@ -1,86 +1,76 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
-import datetime
+import json
+import threading
 from functools import wraps
 from dotenv import load_dotenv
 
+try:
+    from src.database import (DB_PATH, ConnectionPool, PoolExhaustedError, create_schema,
+                              attendance_row, insert_attendance,
+                              attendance_query, attendance_record, daily_summary_query,
+                              student_summary_query, camera_summary_query,
+                              bulk_insert_students, bulk_insert_cameras, parse_import_rows)
+    from src.events import BUS, sse_format
+    from src.cluster import start_bus_relay
+    from src.auth import seed_users, issue_token, decode_token, revoke_token, check_password_hash
+except ImportError:
+    from database import (DB_PATH, ConnectionPool, PoolExhaustedError, create_schema,
+                          attendance_row, insert_attendance,
+                          attendance_query, attendance_record, daily_summary_query,
+                          student_summary_query, camera_summary_query,
+                          bulk_insert_students, bulk_insert_cameras, parse_import_rows)
+    from events import BUS, sse_format
+    from cluster import start_bus_relay
+    from auth import seed_users, issue_token, decode_token, revoke_token, check_password_hash
+
 # Load environment variables from .env
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-After-Id'])
 
 # Secret key from environment
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'PLACEHOLDER_SECRET_KEY')
 
-DB_PATH = "attendance_system.db"
+# Shared WAL-mode connections reused by every route
+db_pool = ConnectionPool(DB_PATH, max_size=int(os.getenv('DB_POOL_SIZE', 8)),
+                         timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)))
+
+
+@app.errorhandler(PoolExhaustedError)
+def pool_exhausted(e):
+    response = jsonify({'error': 'Database busy, retry shortly', 'detail': str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # ---------------- Database Initialization ----------------
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    # Students table
-    c.execute('''CREATE TABLE IF NOT EXISTS students (
-                    roll_no TEXT PRIMARY KEY,
-                    name TEXT NOT NULL
-                )''')
-
-    # Cameras table
-    c.execute('''CREATE TABLE IF NOT EXISTS cameras (
-                    camera_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ip_address TEXT NOT NULL
-                )''')
-
-    # Attendance table
-    c.execute('''CREATE TABLE IF NOT EXISTS attendance (
-                    attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    roll_no TEXT NOT NULL,
-                    camera_id INTEGER NOT NULL,
-                    detected_time TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    FOREIGN KEY (roll_no) REFERENCES students (roll_no),
-                    FOREIGN KEY (camera_id) REFERENCES cameras (camera_id)
-                )''')
-
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL
-                )''')
-
-    # Preload users from environment variables (placeholders for GitHub)
-    users = [
-        (os.getenv("EMAIL1", "EMAIL1_PLACEHOLDER"), os.getenv("PWD1", "PWD1_PLACEHOLDER")),
-        (os.getenv("EMAIL2", "EMAIL2_PLACEHOLDER"), os.getenv("PWD2", "PWD2_PLACEHOLDER")),
-        (os.getenv("EMAIL3", "EMAIL3_PLACEHOLDER"), os.getenv("PWD3", "PWD3_PLACEHOLDER")),
-        (os.getenv("EMAIL4", "EMAIL4_PLACEHOLDER"), os.getenv("PWD4", "PWD4_PLACEHOLDER"))
-    ]
-
-    for email, pwd in users:
-        if email and pwd:
-            c.execute("INSERT OR IGNORE INTO users (email, password_hash) VALUES (?, ?)",
-                      (email, generate_password_hash(pwd)))
-
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn:
+        create_schema(conn)
+        seed_users(conn)
     print("✅ Database initialized with authentication users (placeholders).")
 
 
 # ---------------- JWT Token Protection ----------------
-def token_required(f):
+def token_required(f=None, *, allow_query=False):
+    """Require a JWT in the Authorization header. allow_query=True also takes
+    ?token=, only for the SSE stream (EventSource can't send headers); query
+    strings end up in access and proxy logs, so no other route accepts it."""
+    if f is None:
+        return lambda g: token_required(g, allow_query=allow_query)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
+        if not token and allow_query:
+            token = request.args.get('token')
         if not token:
             return jsonify({'error': 'Token missing'}), 401
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            data = decode_token(token, app.config['SECRET_KEY'])
             current_user = data['email']
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token expired'}), 401
@@ -100,33 +90,31 @@ def login():
     if not email or not password:
         return jsonify({'error': 'Email and password required'}), 400
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email=?", (email,))
-    user = c.fetchone()
-    conn.close()
+    with db_pool.connection() as conn:
+        user = conn.execute("SELECT * FROM users WHERE email=?", (email,)).fetchone()
 
     if not user or not check_password_hash(user[2], password):
         return jsonify({'error': 'Invalid credentials'}), 401
 
-    token = jwt.encode({
-        'user_id': user[0],
-        'email': user[1],
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=4)
-    }, app.config['SECRET_KEY'], algorithm='HS256')
+    token = issue_token(user[0], user[1], app.config['SECRET_KEY'])
 
     return jsonify({'token': token})
 
 
+@app.route('/auth/logout', methods=['POST'])
+@token_required
+def logout(current_user):
+    revoke_token(request.headers.get('Authorization'))
+    return jsonify({'message': 'Logged out'})
+
+
 # ---------------- Students ----------------
 @app.route('/students', methods=['GET'])
 @token_required
 def get_students(current_user):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM students")
-    students = [{'roll_no': row[0], 'name': row[1]} for row in c.fetchall()]
-    conn.close()
+    with db_pool.connection() as conn:
+        rows = conn.execute("SELECT roll_no, name, dataset_folder FROM students").fetchall()
+    students = [{'roll_no': row[0], 'name': row[1], 'dataset_folder': row[2]} for row in rows]
     return jsonify(students)
 
 
@@ -138,23 +126,38 @@ def add_student(current_user):
     name = data.get('name')
     if not roll_no or not name:
         return jsonify({'error': 'Missing fields'}), 400
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO students (roll_no, name) VALUES (?, ?)", (roll_no, name))
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn, conn:
+        conn.execute("INSERT OR IGNORE INTO students (roll_no, name) VALUES (?, ?)", (roll_no, name))
     return jsonify({'message': f'Student {name} added successfully'})
 
 
+def _import_rows():
+    """Rows from a JSON array body, a text/csv body or an uploaded CSV file."""
+    if request.files:
+        return parse_import_rows(next(iter(request.files.values())).read(), 'text/csv')
+    return parse_import_rows(request.get_data(), request.content_type or '')
+
+
+@app.route('/students/bulk', methods=['POST'])
+@token_required
+def add_students_bulk(current_user):
+    """Import many students in one transaction; ?update=1 overwrites existing names/folders."""
+    try:
+        rows = _import_rows()
+    except ValueError as e:
+        return jsonify({'error': f'Could not parse import: {e}'}), 400
+    with db_pool.connection() as conn:
+        statuses = bulk_insert_students(conn, rows, update_existing=bool(request.args.get('update')))
+    return jsonify(statuses)
+
+
 # ---------------- Cameras ----------------
 @app.route('/cameras', methods=['GET'])
 @token_required
 def get_cameras(current_user):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM cameras")
-    cameras = [{'camera_id': row[0], 'ip_address': row[1]} for row in c.fetchall()]
-    conn.close()
+    with db_pool.connection() as conn:
+        rows = conn.execute("SELECT * FROM cameras").fetchall()
+    cameras = [{'camera_id': row[0], 'ip_address': row[1]} for row in rows]
     return jsonify(cameras)
 
 
@@ -165,26 +168,96 @@ def add_camera(current_user):
     ip_address = data.get('ip_address')
     if not ip_address:
         return jsonify({'error': 'Missing IP address'}), 400
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO cameras (ip_address) VALUES (?)", (ip_address,))
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn, conn:
+        conn.execute("INSERT INTO cameras (ip_address) VALUES (?)", (ip_address,))
     return jsonify({'message': f'Camera {ip_address} added successfully'})
 
 
+@app.route('/cameras/bulk', methods=['POST'])
+@token_required
+def add_cameras_bulk(current_user):
+    try:
+        rows = _import_rows()
+    except ValueError as e:
+        return jsonify({'error': f'Could not parse import: {e}'}), 400
+    with db_pool.connection() as conn:
+        statuses = bulk_insert_cameras(conn, rows)
+    return jsonify(statuses)
+
+
 # ---------------- Attendance ----------------
 @app.route('/attendance', methods=['GET'])
 @token_required
 def get_attendance(current_user):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM attendance")
-    rows = c.fetchall()
-    conn.close()
-    records = [{'attendance_id': r[0], 'roll_no': r[1], 'camera_id': r[2],
-                'detected_time': r[3], 'date': r[4]} for r in rows]
-    return jsonify(records)
+    """Attendance rows ordered by attendance_id.
+
+    Query parameters (all optional):
+      date_from, date_to  inclusive YYYY-MM-DD bounds
+      roll_no, camera_id  exact match
+      after_id            keyset cursor: only rows with attendance_id > after_id
+      limit               page size (max 10000); omit to stream every match
+
+    When a page is full the next cursor is returned in the X-Next-After-Id header.
+    """
+    try:
+        query, params, limit = attendance_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if limit is not None:
+        with db_pool.connection() as conn:
+            rows = conn.execute(query + " LIMIT ?", params + [limit]).fetchall()
+        records = [attendance_record(r) for r in rows]
+        response = jsonify(records)
+        if len(rows) == limit:
+            response.headers['X-Next-After-Id'] = str(rows[-1][0])
+        return response
+
+    def generate():
+        # Stream the JSON array in chunks so large exports never sit in memory
+        with db_pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            first = True
+            yield '['
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                chunk = ','.join(json.dumps(attendance_record(r)) for r in rows)
+                yield chunk if first else ',' + chunk
+                first = False
+            yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+# ---------------- Attendance Summaries ----------------
+def _summary_response(query, params, to_record):
+    with db_pool.connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return jsonify([to_record(r) for r in rows])
+
+
+@app.route('/attendance/summary/daily', methods=['GET'])
+@token_required
+def get_daily_summary(current_user):
+    """Students present per day (optionally bounded by date_from/date_to)."""
+    return _summary_response(*daily_summary_query(request.args))
+
+
+@app.route('/attendance/summary/students', methods=['GET'])
+@token_required
+def get_student_summary(current_user):
+    """Per student: days present and first/last sighting over the range.
+    With ?daily=1 (or a roll_no filter) returns the per-day rows instead."""
+    return _summary_response(*student_summary_query(request.args))
+
+
+@app.route('/attendance/summary/cameras', methods=['GET'])
+@token_required
+def get_camera_summary(current_user):
+    """Students seen per camera per day."""
+    return _summary_response(*camera_summary_query(request.args))
 
 
 @app.route('/attendance', methods=['POST'])
@@ -196,23 +269,113 @@ def mark_attendance(current_user):
     if not roll_no or not camera_id:
         return jsonify({'error': 'Missing fields'}), 400
 
-    now = datetime.datetime.now()
-    date = now.strftime("%Y-%m-%d")
-    detected_time = now.strftime("%Y-%m-%d %H:%M:%S")
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM attendance WHERE roll_no=? AND date=? AND camera_id=?",
-              (roll_no, date, camera_id))
-    if c.fetchone():
-        conn.close()
+    row = attendance_row(roll_no, camera_id)
+    with db_pool.connection() as conn:
+        inserted = insert_attendance(conn, [row])
+    if not inserted:
         return jsonify({'message': 'Attendance already marked for today'}), 200
-
-    c.execute("INSERT INTO attendance (roll_no, camera_id, detected_time, date) VALUES (?, ?, ?, ?)",
-              (roll_no, camera_id, detected_time, date))
-    conn.commit()
-    conn.close()
-    return jsonify({'message': f'Attendance logged for {roll_no} at {detected_time}'})
+    BUS.publish('attendance', roll_no=roll_no, camera_id=camera_id, detected_time=row[2], source='api')
+    return jsonify({'message': f'Attendance logged for {roll_no} at {row[2]}'})
+
+
+# ---------------- Recognition Service ----------------
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide FaceRecognizer behind a request-batching queue, created on
+    first use so the API starts without loading any models."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                try:
+                    from src.batching import create_batching_recognizer
+                except ImportError:
+                    from batching import create_batching_recognizer
+                _batcher = create_batching_recognizer()
+    return _batcher
+
+
+def _decode_images():
+    """Images from a multipart upload (any number of files) or a raw image body."""
+    try:
+        from src.batching import decode_image
+    except ImportError:
+        from batching import decode_image
+
+    # items(multi=True): several files under one field name ("image") are all kept,
+    # matching form.multi_items() in the ASGI app
+    if request.files:
+        blobs = [f.read() for _, f in request.files.items(multi=True)]
+    else:
+        blobs = [request.get_data()]
+    return [decode_image(blob) for blob in blobs]
+
+
+@app.route('/recognize', methods=['POST'])
+@token_required
+def recognize(current_user):
+    """Recognize faces in one or more images (JPEG/PNG bytes or multipart files)."""
+    images = _decode_images()
+    if not images or any(img is None for img in images):
+        return jsonify({'error': 'Could not decode one or more images'}), 400
+
+    results = get_batcher().recognize(images)
+    return jsonify([{'faces': r.to_dicts()} for r in results])
+
+
+# ---------------- Live Events (SSE) ----------------
+# Each stream holds one gthread worker thread for as long as the client stays
+# connected, so streams per worker are capped to leave threads for the REST
+# routes. Dashboards with many viewers should use the ASGI app (src/api_async.py).
+SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 4))
+_sse_slots = threading.BoundedSemaphore(SSE_MAX_CLIENTS)
+
+
+@app.route('/events/stream', methods=['GET'])
+@token_required(allow_query=True)
+def stream_events(current_user):
+    """Server-sent events for live recognition/attendance.
+
+    ?types=attendance,recognition limits the event types. Each client has its
+    own bounded buffer; a slow client loses its oldest events, never stalls others.
+    Events come from this process's BUS: the video process when the API runs
+    embedded (API.SERVE_WITH_VIDEO), or every camera node when CLUSTER is enabled.
+    """
+    if not _sse_slots.acquire(blocking=False):
+        return jsonify({'error': f'Too many live event streams (max {SSE_MAX_CLIENTS} per worker)'}), 503, \
+            {'Retry-After': '30'}
+
+    types = [t for t in request.args.get('types', '').split(',') if t] or None
+    try:
+        start_bus_relay(BUS)  # multi-node: also stream events from the other camera nodes
+        sub = BUS.subscribe(types=types)
+    except Exception:
+        _sse_slots.release()
+        raise
+
+    def generate():
+        yield "retry: 3000\n\n"
+        while True:
+            event = sub.get(timeout=15)
+            # Comment line keeps proxies from closing an idle connection
+            yield sse_format(event) if event else ": keepalive\n\n"
+
+    released = threading.Event()
+
+    def release():
+        # Called once the response is closed, even if the generator never started
+        if not released.is_set():
+            released.set()
+            sub.close()
+            _sse_slots.release()
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(release)
+    return response
 
 
 @app.route('/')
@@ -0,0 +1,184 @@
+import os
+import time
+import sqlite3
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+
+import jwt
+from werkzeug.security import generate_password_hash, check_password_hash  # noqa: F401
+
+try:
+    from src.database import DB_PATH, connect
+except ImportError:
+    from database import DB_PATH, connect
+
+TOKEN_ALGORITHM = 'HS256'
+TOKEN_LIFETIME = datetime.timedelta(hours=4)
+
+
+def seed_users(conn):
+    """Preload users from environment variables (placeholders for GitHub)."""
+    users = [
+        (os.getenv("EMAIL1", "EMAIL1_PLACEHOLDER"), os.getenv("PWD1", "PWD1_PLACEHOLDER")),
+        (os.getenv("EMAIL2", "EMAIL2_PLACEHOLDER"), os.getenv("PWD2", "PWD2_PLACEHOLDER")),
+        (os.getenv("EMAIL3", "EMAIL3_PLACEHOLDER"), os.getenv("PWD3", "PWD3_PLACEHOLDER")),
+        (os.getenv("EMAIL4", "EMAIL4_PLACEHOLDER"), os.getenv("PWD4", "PWD4_PLACEHOLDER"))
+    ]
+
+    c = conn.cursor()
+    for email, pwd in users:
+        if email and pwd:
+            c.execute("INSERT OR IGNORE INTO users (email, password_hash) VALUES (?, ?)",
+                      (email, generate_password_hash(pwd)))
+    conn.commit()
+
+
+def issue_token(user_id, email, secret):
+    return jwt.encode({
+        'user_id': user_id,
+        'email': email,
+        'exp': datetime.datetime.utcnow() + TOKEN_LIFETIME
+    }, secret, algorithm=TOKEN_ALGORITHM)
+
+
+class TokenCache:
+    """Bounded LRU of already-verified tokens, keyed by SHA-256 of the token.
+
+    Entries are only served until the token's `exp`, so caching never extends
+    a token's life. The LRU is per process; revocations are written to the
+    revoked_tokens table so every API worker sees them. Each process pulls
+    new revocations every `sync_interval` seconds, which bounds how long a
+    logged-out token keeps working on another worker.
+
+    is_revoked() never touches the database or waits on it: the revoked set
+    is replaced as a whole, not mutated, so it is read without a lock. With
+    sync_on_read (threaded servers) the request that finds the set stale
+    refreshes it, unless another thread is already using the connection;
+    an event loop turns that off and calls sync() from its thread pool.
+    """
+
+    def __init__(self, max_size=4096, db_path=DB_PATH, sync_interval=1.0, sync_on_read=True):
+        self.max_size = max_size
+        self.db_path = db_path
+        self.sync_interval = sync_interval
+        self.sync_on_read = sync_on_read
+        self._entries = OrderedDict()  # hash -> (claims, exp)
+        self._revoked = {}  # hash -> exp, mirrored from revoked_tokens; replaced, never mutated
+        self._lock = threading.Lock()  # the LRU and swapping _revoked
+        self._db_lock = threading.Lock()  # the shared connection
+        self._conn = None
+        self._last_sync = 0.0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, claims):
+        exp = claims.get('exp')
+        if exp is None:
+            return  # Never cache tokens without an expiry
+        with self._lock:
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _add_revoked(self, key, exp, now):
+        with self._lock:
+            self._entries.pop(key, None)
+            revoked = {k: e for k, e in self._revoked.items() if e > now}
+            revoked[key] = exp
+            self._revoked = revoked
+
+    def revoke(self, token, exp=None):
+        """Revoke a token in this process at once and in revoked_tokens for the
+        others. Blocks on the database; call it off the event loop."""
+        key = self.key(token)
+        now = time.time()
+        if exp is None:
+            entry = self.get(key, now)
+            exp = entry['exp'] if entry else now + TOKEN_LIFETIME.total_seconds()
+        self._add_revoked(key, exp, now)
+        with self._db_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO revoked_tokens (token_hash, expires_at) VALUES (?, ?)",
+                             (key, exp))
+                # Forget revocations whose tokens have expired on their own
+                conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+        # Again, in case a sync() read the table just before our row was committed
+        self._add_revoked(key, exp, now)
+
+    def sync(self):
+        """Re-read revoked_tokens. Returns at once (keeping the current set) if
+        another thread is using the connection, e.g. a logout write."""
+        if not self._db_lock.acquire(blocking=False):
+            return
+        now = time.time()
+        try:
+            # The table only holds unexpired logouts, so re-reading all of it stays cheap
+            rows = self._connection().execute(
+                "SELECT token_hash, expires_at FROM revoked_tokens WHERE expires_at > ?", (now,)).fetchall()
+            revoked = {bytes(key): exp for key, exp in rows}
+            # Swapped while the connection is still held, so a concurrent revoke() lands after it
+            with self._lock:
+                self._revoked = revoked
+                for key in revoked:
+                    self._entries.pop(key, None)
+        except sqlite3.Error as e:
+            print(f"Could not read revoked tokens: {e}")
+        finally:
+            self._last_sync = now
+            self._db_lock.release()
+
+    def is_revoked(self, key):
+        now = time.time()
+        if self.sync_on_read and now - self._last_sync >= self.sync_interval:
+            self.sync()
+        exp = self._revoked.get(key)
+        return exp is not None and exp > now
+
+
+TOKEN_CACHE = TokenCache(int(os.getenv('TOKEN_CACHE_SIZE', 4096)),
+                         sync_interval=float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', 1.0)))
+
+
+def decode_token(token, secret):
+    """Verified claims of a token. Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError.
+
+    Repeat requests with the same token skip signature verification via TOKEN_CACHE.
+    """
+    key = TokenCache.key(token)
+    if TOKEN_CACHE.is_revoked(key):
+        raise jwt.InvalidTokenError('Token revoked')
+
+    now = time.time()
+    claims = TOKEN_CACHE.get(key, now)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, secret, algorithms=[TOKEN_ALGORITHM])
+    TOKEN_CACHE.put(key, claims)
+    return claims
+
+
+def revoke_token(token):
+    TOKEN_CACHE.revoke(token)
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import argparse
+import multiprocessing as mp
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import load_config
+from src.threads import export_thread_env
+
+# cv2 and numpy (src.frames) are imported where they are used, so the thread
+# budget is exported before either of them loads in this process
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.mpg', '.mpeg', '.ts')
+
+# Each worker holds a full YOLO + DeepFace stack in RAM (and GPU memory)
+DEFAULT_WORKERS = 2
+
+# One FaceRecognizer per worker process, created by _init_worker
+_worker_recognizer = None
+
+
+# ---------------- Input Discovery ----------------
+def find_videos(inputs):
+    """Expand files and directories into a sorted list of video paths."""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for f in files:
+                    if f.lower().endswith(VIDEO_EXTENSIONS):
+                        videos.append(os.path.join(root, f))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"Warning: {path} not found. Skipping.")
+    return sorted(videos)
+
+
+def plan_chunks(videos, chunk_frames):
+    """Split every video into (path, start_frame, end_frame) chunks so a single
+    long recording is still spread across all workers."""
+    import cv2
+    chunks = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"Warning: could not open {path}. Skipping.")
+            continue
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        if total <= 0:
+            # Unknown length (some containers don't report it): one chunk for the whole file
+            chunks.append((path, 0, None))
+            continue
+        for start in range(0, total, chunk_frames):
+            chunks.append((path, start, min(start + chunk_frames, total)))
+    return chunks
+
+
+def recording_start(path, start_override=None):
+    """Wall-clock time of the first frame. Uses --start if given, otherwise the
+    file modification time minus the recording duration."""
+    if start_override:
+        return start_override
+    import cv2
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    total = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    cap.release()
+    duration = total / fps if fps > 0 else 0
+    return datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=duration)
+
+
+# ---------------- Worker ----------------
+def _init_worker(workers):
+    global _worker_recognizer
+    # Workers already run in parallel; split the cores between them instead of
+    # every library in every worker sizing its pool to the whole machine.
+    # The OMP/BLAS variables were exported by the parent and inherited at spawn.
+    from src.threads import apply_thread_budget, configure_worker_thread
+    apply_thread_budget(load_config() or {}, workers, shared_process=False)
+    configure_worker_thread()
+    from src.recognize_faces import FaceRecognizer
+    _worker_recognizer = FaceRecognizer()
+
+
+def _process_chunk(task):
+    import cv2
+    from src.frames import FrameBufferPool
+    path, start_frame, end_frame, stride = task
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    frames = []
+    # Frames aren't kept after recognition, so one reused decode buffer is enough
+    buffers = FrameBufferPool(1, name=os.path.basename(path))
+    frame_idx = start_frame
+    while end_frame is None or frame_idx < end_frame:
+        # Anchored at frame 0 of the video, so chunk boundaries don't shift the sampling
+        if frame_idx % stride != 0:
+            # grab() skips decoding the pixels of frames we don't analyse
+            if not cap.grab():
+                break
+            frame_idx += 1
+            continue
+
+        ret, frame = buffers.read(cap)
+        if not ret:
+            break
+
+        pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if fps > 0:
+            pos_ms = frame_idx * 1000.0 / fps
+
+        results = _worker_recognizer.recognize_face(frame)
+        frames.append({'frame': frame_idx, 'pos_ms': round(pos_ms, 1), 'faces': results.to_dicts()})
+        frame_idx += 1
+
+    cap.release()
+    return path, start_frame, frames
+
+
+# ---------------- Attendance Events ----------------
+def chunk_sightings(path, frames, start):
+    """(timestamp, label, camera, video, frame, distance) for every recognized
+    face in one chunk; only these are kept in memory until the end of the run."""
+    camera = os.path.splitext(os.path.basename(path))[0]
+    sightings = []
+    for fr in frames:
+        ts = start + timedelta(milliseconds=fr['pos_ms'])
+        for face in fr['faces']:
+            if face['label'] != 'Unknown':
+                sightings.append((ts, face['label'], camera, path, fr['frame'], face['distance']))
+    return sightings
+
+
+def build_attendance_events(sightings, cooldown_hours):
+    """Replay recognized labels in recording time order and apply the same
+    cooldown rule as AttendanceManager."""
+    cooldown = timedelta(hours=cooldown_hours)
+    sightings = sorted(sightings, key=lambda s: s[0])
+    last_marked = {}
+    events = []
+    for ts, label, camera, path, frame_idx, distance in sightings:
+        last = last_marked.get(label)
+        if last and (ts - last) < cooldown:
+            continue
+        last_marked[label] = ts
+        events.append({
+            'timestamp': ts.isoformat(timespec='seconds'),
+            'name': label,
+            'camera': camera,
+            'video': path,
+            'frame': frame_idx,
+            'distance': distance,
+        })
+    return events
+
+
+# ---------------- Output ----------------
+def _parquet_schema():
+    import pyarrow as pa
+    # Fixed up front so every chunk's row group matches, even chunks without faces
+    return pa.schema([
+        ('video', pa.string()), ('frame', pa.int64()), ('pos_ms', pa.float64()),
+        ('box', pa.list_(pa.int32())), ('label', pa.string()), ('distance', pa.float64()),
+        ('score', pa.float64()), ('skipped', pa.string()), ('fast_distance', pa.float64()),
+    ])
+
+
+class RecordWriter:
+    """Appends records to JSONL or Parquet as they are produced, so output
+    size doesn't depend on memory. Parquet gets one row group per write()."""
+
+    def __init__(self, output_path, fmt, schema=None):
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.output_path = output_path
+        self.fmt = fmt
+        self.count = 0
+        self._schema = schema
+        self._parquet = None
+        self._file = None
+        if fmt != 'parquet':
+            self._file = open(output_path, 'w', encoding='utf-8')
+
+    def write(self, records):
+        if not records:
+            return
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pylist(records, schema=self._schema)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            for rec in records:
+                self._file.write(json.dumps(rec) + '\n')
+        self.count += len(records)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self.fmt == 'parquet':
+            # No records at all: still leave a valid (empty) file behind
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.Table.from_pylist([], schema=self._schema or pa.schema([])), self.output_path)
+        if self._file is not None:
+            self._file.close()
+        print(f"Wrote {self.count} records to: {self.output_path}")
+
+
+def flatten_frames(path, frames):
+    """One row per detected face (frames without faces keep a single empty row)."""
+    rows = []
+    for fr in frames:
+        if not fr['faces']:
+            rows.append({'video': path, 'frame': fr['frame'], 'pos_ms': fr['pos_ms'],
+                         'box': None, 'label': None, 'distance': None, 'score': None,
+                         'skipped': None, 'fast_distance': None})
+        for face in fr['faces']:
+            rows.append({'video': path, 'frame': fr['frame'], 'pos_ms': fr['pos_ms'], **face})
+    return rows
+
+
+def process_recordings(inputs, output, events_output, fmt='jsonl', workers=None,
+                       chunk_frames=900, stride=1, start=None):
+    config = load_config()
+    if not config:
+        return
+
+    # Every worker loads its own YOLO + DeepFace stack, so more workers cost RAM/GPU memory
+    workers = workers or DEFAULT_WORKERS
+    # Before this process first imports cv2/numpy (pyarrow loads numpy too); spawned
+    # workers inherit the environment, so their pools are sized before anything in them loads
+    export_thread_env(config, workers, shared_process=False)
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Parquet output needs pyarrow: pip install pyarrow (or use --format jsonl).")
+            return
+
+    videos = find_videos(inputs)
+    if not videos:
+        print("No video files found.")
+        return
+    if start and len(videos) > 1:
+        # One wall-clock start would make every recording begin at the same moment
+        print(f"--start applies to a single recording, but {len(videos)} were found. "
+              "Run them one at a time, or omit --start to use each file's modification time.")
+        return
+
+    chunks = plan_chunks(videos, chunk_frames)
+    print(f"Processing {len(videos)} videos in {len(chunks)} chunks with {workers} workers...")
+
+    starts = {path: recording_start(path, start) for path in videos}
+    tasks = [(path, s, e, stride) for path, s, e in chunks]
+    sightings = []
+
+    # Per-frame rows are written as chunks finish; only recognized faces stay in memory
+    frames_out = RecordWriter(output, fmt, _parquet_schema() if fmt == 'parquet' else None)
+    try:
+        # spawn keeps CUDA/TensorFlow state out of forked children
+        ctx = mp.get_context('spawn')
+        with ctx.Pool(processes=workers, initializer=_init_worker, initargs=(workers,)) as pool:
+            # imap (ordered) keeps the output in video/frame order; workers still run ahead
+            for done, (path, _, frames) in enumerate(pool.imap(_process_chunk, tasks), 1):
+                frames_out.write(flatten_frames(path, frames))
+                sightings.extend(chunk_sightings(path, frames, starts[path]))
+                print(f"  [{done}/{len(tasks)}] {os.path.basename(path)}: {len(frames)} frames")
+    finally:
+        frames_out.close()
+
+    att_cfg = config.get('ATTENDANCE', {})
+    events = build_attendance_events(sightings, int(att_cfg.get('COOLDOWN_HOURS', 4)))
+
+    events_out = RecordWriter(events_output, fmt)
+    events_out.write(events)
+    events_out.close()
+    print(f"✅ Done. {len(events)} attendance events.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run face recognition over recorded video files.")
+    parser.add_argument('inputs', nargs='+', help="Video files or directories containing videos")
+    parser.add_argument('--output', default='attendance/batch_frames.jsonl', help="Per-frame results file")
+    parser.add_argument('--events', default='attendance/batch_events.jsonl', help="Attendance events file")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"Worker processes, each loading its own models (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--chunk-frames', type=int, default=900, help="Frames per work unit")
+    parser.add_argument('--stride', type=int, default=1, help="Analyse every Nth frame")
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None,
+                        help="Wall-clock time of the first frame (ISO format, single video only); "
+                             "defaults to file mtime - duration")
+    args = parser.parse_args()
+
+    process_recordings(args.inputs, args.output, args.events, fmt=args.format, workers=args.workers,
+                       chunk_frames=args.chunk_frames, stride=max(1, args.stride), start=args.start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+
+class BatchingRecognizer:
+    """Funnels frames from many request threads into batched
+    FaceRecognizer.recognize_batch calls on a single inference thread.
+
+    A batch is dispatched once `max_batch` frames are waiting or `max_wait_ms`
+    has passed since the first one arrived.
+    """
+
+    def __init__(self, recognizer, max_batch: int = 16, max_wait_ms: float = 10.0):
+        self.recognizer = recognizer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='recognize-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame) -> Future:
+        future = Future()
+        self._queue.put((frame, future))
+        return future
+
+    def recognize(self, frames: List, timeout: float = 30.0):
+        """Blocking helper: FrameResults for each frame, in order."""
+        futures = [self.submit(f) for f in frames]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            try:
+                # Collect more frames until the batch is full or the wait window closes
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            frames = [frame for frame, _ in batch]
+            REGISTRY.observe('recognize_batch_size', len(frames))
+            try:
+                results = self.recognizer.recognize_batch(frames)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def create_batching_recognizer():
+    """FaceRecognizer wrapped in a BatchingRecognizer configured from RECOGNITION_SERVICE."""
+    try:
+        from src.recognize_faces import FaceRecognizer
+    except ImportError:
+        from recognize_faces import FaceRecognizer
+    recognizer = FaceRecognizer()
+    svc_cfg = recognizer.config.get('RECOGNITION_SERVICE', {})
+    return BatchingRecognizer(recognizer,
+                              max_batch=int(svc_cfg.get('MAX_BATCH', 16)),
+                              max_wait_ms=float(svc_cfg.get('MAX_WAIT_MS', 10)))
+
+
+def decode_image(blob: bytes):
+    """BGR image from encoded JPEG/PNG bytes, or None if it can't be decoded."""
+    import cv2
+    import numpy as np
+    if not blob:
+        return None
+    return cv2.imdecode(np.frombuffer(blob, dtype=np.uint8), cv2.IMREAD_COLOR)
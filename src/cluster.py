@@ -0,0 +1,427 @@
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import connect, attendance_row, AttendanceStore
+from src.events import origin
+
+
+def _key(key) -> str:
+    return json.dumps(key, default=str, separators=(',', ':'))
+
+
+# ---------------- Shared State Backends ----------------
+class SqliteSharedState:
+    """Shared cooldown keys, node heartbeats and events in one SQLite file.
+
+    A stand-in for Redis when every node runs on the same host (or in tests);
+    same methods as RedisSharedState. Times are wall-clock so several
+    processes agree on them.
+    """
+
+    EVENT_RETENTION_SECONDS = 3600
+
+    def __init__(self, path: str = 'cluster_state.db'):
+        self._conn = connect(path, check_same_thread=False)
+        self._conn.isolation_level = None  # explicit BEGIN IMMEDIATE below
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS shared_keys (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_shared_keys_expiry ON shared_keys (expires_at);
+            CREATE TABLE IF NOT EXISTS cluster_nodes (
+                node_id TEXT PRIMARY KEY,
+                capacity INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cluster_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+        ''')
+
+    def _prune(self, now):
+        # Expired rows are cleared every so often rather than on every write
+        self._writes += 1
+        if self._writes % 256 == 0:
+            self._conn.execute("DELETE FROM shared_keys WHERE expires_at <= ?", (now,))
+            self._conn.execute("DELETE FROM cluster_events WHERE ts < ?", (now - self.EVENT_RETENTION_SECONDS,))
+
+    def check_and_set(self, group, entries, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        keys = [_key(k) for k, _ in entries]
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                marks = ','.join('?' * len(keys))
+                live = self._conn.execute(
+                    f"SELECT 1 FROM shared_keys WHERE key IN ({marks}) AND expires_at > ? LIMIT 1",
+                    keys + [now]).fetchone()
+                if not live:
+                    self._conn.executemany("INSERT OR REPLACE INTO shared_keys (key, expires_at) VALUES (?, ?)",
+                                           [(k, now + ttl) for k, (_, ttl) in zip(keys, entries)])
+                    self._prune(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                # BEGIN itself fails with "database is locked"; there is nothing to roll back then
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+        return not live
+
+    def is_live(self, group, key, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM shared_keys WHERE key = ? AND expires_at > ?",
+                                      (_key(key), now)).fetchone() is not None
+
+    def set(self, group, entries, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO shared_keys (key, expires_at) VALUES (?, ?)",
+                                   [(_key(k), now + ttl) for k, ttl in entries])
+
+    def heartbeat(self, node_id: str, capacity: int, ttl: float):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cluster_nodes (node_id, capacity, expires_at) VALUES (?, ?, ?)",
+                               (node_id, capacity, time.time() + ttl))
+
+    def remove_node(self, node_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cluster_nodes WHERE node_id = ?", (node_id,))
+
+    def live_nodes(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT node_id, capacity FROM cluster_nodes WHERE expires_at > ?",
+                                           (time.time(),)))
+
+    def publish_event(self, event: dict):
+        with self._lock:
+            self._conn.execute("INSERT INTO cluster_events (ts, payload) VALUES (?, ?)",
+                               (time.time(), json.dumps(event)))
+
+    def read_events(self, after=None, timeout: float = 1.0) -> Tuple[object, List[dict]]:
+        """(cursor, events) published after `after`; None starts from the newest event."""
+        with self._lock:
+            if after is None:
+                row = self._conn.execute("SELECT MAX(event_id) FROM cluster_events").fetchone()
+                return row[0] or 0, []
+            rows = self._conn.execute("SELECT event_id, payload FROM cluster_events WHERE event_id > ? "
+                                      "ORDER BY event_id LIMIT 1000", (after,)).fetchall()
+        if not rows:
+            time.sleep(timeout)
+            return after, []
+        return rows[-1][0], [json.loads(p) for _, p in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+_CHECK_AND_SET_LUA = """
+for i, k in ipairs(KEYS) do
+    if redis.call('EXISTS', k) == 1 then return 0 end
+end
+for i, k in ipairs(KEYS) do
+    redis.call('SET', k, '1', 'PX', ARGV[i])
+end
+return 1
+"""
+
+
+class RedisSharedState:
+    """Shared state in Redis (or anything speaking its protocol).
+
+    Cooldown keys expire via Redis TTLs; check_and_set is one Lua script, and
+    a group's keys share a hash tag so it also works on Redis Cluster.
+    Heartbeats are expiring keys; events go to a capped stream.
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'attendance'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("CLUSTER.BACKEND 'redis' needs the redis package (pip install redis)")
+        self._r = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._cas = self._r.register_script(_CHECK_AND_SET_LUA)
+        self._stream = f"{prefix}:events"
+
+    def _k(self, group, key) -> str:
+        return f"{self._prefix}:seen:{{{_key(group)}}}:{_key(key)}"
+
+    def check_and_set(self, group, entries, now: Optional[float] = None) -> bool:
+        keys = [self._k(group, k) for k, _ in entries]
+        ttls = [max(1, int(ttl * 1000)) for _, ttl in entries]
+        return bool(self._cas(keys=keys, args=ttls))
+
+    def is_live(self, group, key, now: Optional[float] = None) -> bool:
+        return bool(self._r.exists(self._k(group, key)))
+
+    def set(self, group, entries, now: Optional[float] = None):
+        pipe = self._r.pipeline()
+        for key, ttl in entries:
+            pipe.set(self._k(group, key), 1, px=max(1, int(ttl * 1000)))
+        pipe.execute()
+
+    def heartbeat(self, node_id: str, capacity: int, ttl: float):
+        self._r.set(f"{self._prefix}:node:{node_id}", capacity, px=int(ttl * 1000))
+
+    def remove_node(self, node_id: str):
+        self._r.delete(f"{self._prefix}:node:{node_id}")
+
+    def live_nodes(self) -> Dict[str, int]:
+        keys = list(self._r.scan_iter(match=f"{self._prefix}:node:*"))
+        if not keys:
+            return {}
+        values = self._r.mget(keys)
+        offset = len(f"{self._prefix}:node:")
+        return {k.decode()[offset:]: int(v) for k, v in zip(keys, values) if v is not None}
+
+    def publish_event(self, event: dict):
+        self._r.xadd(self._stream, {'payload': json.dumps(event)}, maxlen=10000, approximate=True)
+
+    def read_events(self, after=None, timeout: float = 1.0) -> Tuple[object, List[dict]]:
+        entries = self._r.xread({self._stream: after or '$'}, count=1000, block=int(timeout * 1000))
+        if not entries:
+            return after or '$', []
+        messages = entries[0][1]
+        return messages[-1][0], [json.loads(fields[b'payload']) for _, fields in messages]
+
+    def close(self):
+        self._r.close()
+
+
+def create_shared_state(cluster_cfg: dict):
+    """Backend selected by CLUSTER.BACKEND ('sqlite' or 'redis')."""
+    backend = str(cluster_cfg.get('BACKEND', 'sqlite')).lower()
+    if backend == 'redis':
+        return RedisSharedState(cluster_cfg.get('URL') or 'redis://localhost:6379/0')
+    if backend == 'sqlite':
+        return SqliteSharedState(cluster_cfg.get('URL') or 'cluster_state.db')
+    raise ValueError(f"Unknown CLUSTER.BACKEND: {backend}")
+
+
+# ---------------- Camera Assignment ----------------
+def _camera_name(cam: dict) -> str:
+    return str(cam.get('name', cam.get('source', 'camera')))
+
+
+def assign_cameras(cameras: List[dict], nodes: Dict[str, int]) -> Dict[str, List[dict]]:
+    """Spread cameras over nodes with weighted rendezvous hashing.
+
+    Every node computes the same answer from the same live-node list, so no
+    leader is needed; when a node joins or leaves only the cameras it gains or
+    loses move. A node's weight is its capacity.
+    """
+    assignment = {node_id: [] for node_id in nodes}
+    for cam in cameras:
+        name = _camera_name(cam)
+        best, best_score = None, -math.inf
+        for node_id, capacity in sorted(nodes.items()):
+            digest = hashlib.sha1(f"{node_id}|{name}".encode()).digest()
+            u = (int.from_bytes(digest[:8], 'big') + 1) / (2 ** 64 + 2)  # uniform in (0, 1)
+            score = max(capacity, 1) / -math.log(u)
+            if score > best_score:
+                best, best_score = node_id, score
+        if best is not None:
+            assignment[best].append(cam)
+    return assignment
+
+
+def default_node_id() -> str:
+    return origin()
+
+
+class NodeAgent:
+    """Keeps this node's heartbeat alive and starts/stops the cameras the
+    shared assignment gives it.
+
+    A node that stops heartbeating drops out after `node_ttl` seconds and its
+    cameras are picked up by the others on their next tick. During a handover
+    two nodes may briefly run the same camera; the shared dedupe state keeps
+    that from double-counting. With `is_running`, a camera this node owns
+    whose thread has died is restarted on the next tick.
+    """
+
+    def __init__(self, state, cameras: List[dict], start_camera: Callable[[dict], None],
+                 stop_camera: Callable[[dict], None], node_id: Optional[str] = None, capacity: int = 1,
+                 heartbeat_interval: float = 5.0, node_ttl: float = 15.0,
+                 is_running: Optional[Callable[[dict], bool]] = None):
+        self.state = state
+        self.cameras = cameras
+        self.start_camera = start_camera
+        self.stop_camera = stop_camera
+        self.is_running = is_running
+        self.node_id = node_id or default_node_id()
+        self.capacity = capacity
+        self.heartbeat_interval = heartbeat_interval
+        self.node_ttl = node_ttl
+        self.running: Dict[str, dict] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cluster-agent', daemon=True)
+
+    def start(self):
+        self.tick()
+        self._thread.start()
+
+    def tick(self):
+        self.state.heartbeat(self.node_id, self.capacity, self.node_ttl)
+        nodes = self.state.live_nodes()
+        nodes[self.node_id] = self.capacity
+        mine = {_camera_name(c): c for c in assign_cameras(self.cameras, nodes)[self.node_id]}
+
+        for name in [n for n in self.running if n not in mine]:
+            print(f"🔀 [{self.node_id}] Releasing camera {name}")
+            self.stop_camera(self.running.pop(name))
+        for name, cam in mine.items():
+            if name not in self.running:
+                print(f"🔀 [{self.node_id}] Taking camera {name} ({len(nodes)} nodes live)")
+                self.running[name] = cam
+                self.start_camera(cam)
+            elif self.is_running is not None and not self.is_running(cam):
+                # The camera loop exited (stream error, camera unreachable); still ours, so retry
+                print(f"🔁 [{self.node_id}] Camera {name} stopped, restarting")
+                self.start_camera(cam)
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Cluster heartbeat failed: {e}")
+
+    def stop(self):
+        """Release every camera and leave the cluster so others take over at once."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        for cam in list(self.running.values()):
+            self.stop_camera(cam)
+        self.running.clear()
+        try:
+            self.state.remove_node(self.node_id)
+        except Exception as e:
+            print(f"Could not deregister node {self.node_id}: {e}")
+
+
+# ---------------- Event Relay ----------------
+class EventRelay:
+    """Reads events published by the camera nodes and republishes them on a
+    local EventBus (for SSE) and/or writes attendance rows to a database."""
+
+    def __init__(self, state, bus=None, db_path: Optional[str] = None):
+        self.state = state
+        self.bus = bus
+        self.store = AttendanceStore(db_path) if db_path else None
+        self._camera_ids: Dict[str, int] = {}
+        self._thread = threading.Thread(target=self._run, name='cluster-relay', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _camera_id(self, event) -> int:
+        source = str(event.get('camera_source', event.get('camera')))
+        if source not in self._camera_ids:
+            self._camera_ids[source] = self.store.get_or_create_camera(source)
+        return self._camera_ids[source]
+
+    def handle(self, events: List[dict]):
+        if self.bus is not None:
+            local = origin()
+            for event in events:
+                if event.get('origin') == local:
+                    continue  # already on this process's bus
+                data = {k: v for k, v in event.items() if k not in ('type', 'ts', 'origin')}
+                self.bus.publish(event['type'], **data)
+        if self.store is not None:
+            rows = [attendance_row(e['roll_no'], self._camera_id(e),
+                                   datetime.strptime(e['detected_time'], "%Y-%m-%d %H:%M:%S"))
+                    for e in events if e.get('type') == 'attendance']
+            if rows:
+                self.store.write_batch(rows)
+
+    def _run(self):
+        cursor, _ = self.state.read_events(None)
+        while True:
+            try:
+                cursor, events = self.state.read_events(cursor)
+                if events:
+                    self.handle(events)
+            except Exception as e:
+                print(f"Event relay error: {e}")
+                time.sleep(1)
+
+
+_bus_relay = None
+_bus_relay_checked = False
+_bus_relay_lock = threading.Lock()
+
+
+def start_bus_relay(bus, config=None):
+    """When CLUSTER is enabled, relay the camera nodes' events onto `bus` (once
+    per process) so the API's /events/stream sees every node. Returns the
+    relay, or None in single-node mode. The config is read only on the first
+    call; later calls return the cached result."""
+    global _bus_relay, _bus_relay_checked
+    if not _bus_relay_checked:
+        with _bus_relay_lock:
+            if not _bus_relay_checked:
+                if config is None:
+                    from src.utils import load_config
+                    config = load_config() or {}
+                cluster_cfg = config.get('CLUSTER', {}) or {}
+                if cluster_cfg.get('ENABLED', False):
+                    _bus_relay = EventRelay(create_shared_state(cluster_cfg), bus=bus).start()
+                _bus_relay_checked = True
+    return _bus_relay
+
+
+def main():
+    try:
+        from src.utils import load_config
+    except ImportError:
+        from utils import load_config
+
+    parser = argparse.ArgumentParser(description="Inspect the camera cluster or relay its events.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help="Show live nodes and which cameras each one runs")
+    relay = sub.add_parser('relay', help="Write attendance events from all nodes into one database")
+    relay.add_argument('--db', default=None, help="Database to write (default: ATTENDANCE.DATABASE)")
+    args = parser.parse_args()
+
+    config = load_config() or {}
+    state = create_shared_state(config.get('CLUSTER', {}))
+
+    if args.command == 'status':
+        nodes = state.live_nodes()
+        if not nodes:
+            print("No live nodes.")
+        for node_id, cams in assign_cameras(config.get('CAMERA_SOURCES', []), nodes).items():
+            print(f"{node_id} (capacity {nodes[node_id]}): {', '.join(_camera_name(c) for c in cams) or '-'}")
+    else:
+        db_path = args.db or config.get('ATTENDANCE', {}).get('DATABASE')
+        EventRelay(state, db_path=db_path).start()
+        print(f"📡 Relaying cluster attendance events into {db_path}. Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
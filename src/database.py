@@ -1,20 +1,101 @@
+import io
+import csv
+import json
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_PATH = "attendance_system.db"
 
-def init_db():
-    """Initialize the database and create tables."""
-    conn = sqlite3.connect(DB_PATH)
+
+# ---------------- Connection & Schema ----------------
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """Open a connection in WAL mode so readers don't block the attendance writer."""
+    # timeout doubles as the busy timeout; cached_statements keeps prepared
+    # statements around for the lifetime of pooled connections
+    conn = sqlite3.connect(db_path, timeout=10, check_same_thread=check_same_thread,
+                           cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class PoolExhaustedError(RuntimeError):
+    """No pooled connection became free within the pool's timeout; the API
+    answers 503 so clients retry instead of seeing a bare 500."""
+
+
+class ConnectionPool:
+    """Reuses SQLite connections across requests/threads.
+
+    Connections are handed out one thread at a time; up to `max_size` are kept
+    open, and callers wait up to `timeout` seconds if all of them are in use,
+    then get PoolExhaustedError.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_size=8, timeout=30.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return connect(self.db_path, check_same_thread=False)
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhaustedError(f"All {self.max_size} database connections busy for {self.timeout:.0f}s")
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+def create_schema(conn):
+    """Create all tables and indexes. Safe to call on an existing database."""
     c = conn.cursor()
 
-    # --- Create Tables ---
     c.execute('''
         CREATE TABLE IF NOT EXISTS students (
             roll_no TEXT PRIMARY KEY,
-            name TEXT NOT NULL
+            name TEXT NOT NULL,
+            dataset_folder TEXT
         )
     ''')
+    # dataset/<folder> the student's face images live in (added after the first release)
+    columns = [row[1] for row in c.execute("PRAGMA table_info(students)")]
+    if 'dataset_folder' not in columns:
+        c.execute("ALTER TABLE students ADD COLUMN dataset_folder TEXT")
 
     c.execute('''
         CREATE TABLE IF NOT EXISTS cameras (
@@ -35,28 +116,191 @@ def init_db():
         )
     ''')
 
-    # --- Preload Student Data (updated order) ---
-    students_data = [
-        ("7376241CS146", "Boomika S"),
-        ("7376241CS405", "Sri Midhuna S K"),
-        ("7376242AD328", "Thiyanesh D"),
-        ("7376242IT333", "Varshini S"),
-        ("7376241CS472", "Varun S"),
-        ("7376241CS465", "Vihashini S V"),
-        ("7376241CS476", "Yuvashri M")
-    ]
+    # One row per student per camera per day; INSERT OR IGNORE relies on this.
+    # Created as an index so databases made before the constraint existed get it too;
+    # those may hold duplicates, which are dropped first (the earliest row is kept).
+    duplicates_removed = 0
+    if not c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_attendance_unique'").fetchone():
+        c.execute('''
+            DELETE FROM attendance WHERE attendance_id NOT IN (
+                SELECT MIN(attendance_id) FROM attendance GROUP BY roll_no, camera_id, date
+            )
+        ''')
+        duplicates_removed = c.rowcount
+        if duplicates_removed > 0:
+            print(f"Removed {duplicates_removed} duplicate attendance rows before adding the unique index")
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_unique
+        ON attendance (roll_no, camera_id, date)
+    ''')
+
+    # Range scans for the dashboard: by day, and per student over time
+    c.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date_roll ON attendance (date, roll_no)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_attendance_roll_date ON attendance (roll_no, date)")
+
+    # Integer id per enrolled student; the face gallery stores these so the
+    # recognition loop maps a match straight to roll_no without string lookups
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS identities (
+            identity_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            roll_no TEXT NOT NULL UNIQUE,
+            FOREIGN KEY (roll_no) REFERENCES students (roll_no)
+        )
+    ''')
+
+    # Weekly timetable for SCHEDULE.SOURCE: "database" (weekday 0 = Monday,
+    # times "HH:MM", camera_name "*" = every camera)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS camera_schedule (
+            schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            camera_name TEXT NOT NULL DEFAULT '*',
+            weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            mode TEXT NOT NULL DEFAULT 'full' CHECK (mode IN ('off', 'detect', 'low', 'full'))
+        )
+    ''')
+
+    create_summary_schema(c)
+    if duplicates_removed > 0:
+        # Summaries built from the duplicated rows over-count
+        rebuild_summaries(c)
+
+    # Logged-out tokens (SHA-256 of the JWT), shared by every API worker process
+    # until the token would have expired anyway
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            token_hash BLOB PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+    ''')
 
-    for roll_no, name in students_data:
-        c.execute("INSERT OR IGNORE INTO students (roll_no, name) VALUES (?, ?)", (roll_no, name))
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL
+        )
+    ''')
 
     conn.commit()
+
+
+def create_summary_schema(c):
+    """Aggregate tables kept current by triggers on attendance inserts, so reports
+    scale with the number of days rather than the number of detections."""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily_student (
+            date TEXT NOT NULL,
+            roll_no TEXT NOT NULL,
+            cameras INTEGER NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (date, roll_no)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_student_roll ON attendance_daily_student (roll_no, date)")
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily_camera (
+            date TEXT NOT NULL,
+            camera_id INTEGER NOT NULL,
+            students INTEGER NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (date, camera_id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily (
+            date TEXT PRIMARY KEY,
+            present INTEGER NOT NULL
+        )
+    ''')
+
+    # attendance is unique per (roll_no, camera_id, date), so every insert is a
+    # new camera for that student and a new student for that camera.
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary AFTER INSERT ON attendance
+        BEGIN
+            INSERT INTO attendance_daily (date, present)
+            SELECT NEW.date, 1
+            WHERE NOT EXISTS (SELECT 1 FROM attendance_daily_student
+                              WHERE date = NEW.date AND roll_no = NEW.roll_no)
+            ON CONFLICT (date) DO UPDATE SET present = present + 1;
+
+            INSERT INTO attendance_daily_student (date, roll_no, cameras, first_seen, last_seen)
+            VALUES (NEW.date, NEW.roll_no, 1, NEW.detected_time, NEW.detected_time)
+            ON CONFLICT (date, roll_no) DO UPDATE SET
+                cameras = cameras + 1,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen);
+
+            INSERT INTO attendance_daily_camera (date, camera_id, students, first_seen, last_seen)
+            VALUES (NEW.date, NEW.camera_id, 1, NEW.detected_time, NEW.detected_time)
+            ON CONFLICT (date, camera_id) DO UPDATE SET
+                students = students + 1,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen);
+        END
+    ''')
+
+    # Backfill databases that already had attendance before the summaries existed
+    has_summary = c.execute("SELECT 1 FROM attendance_daily LIMIT 1").fetchone()
+    has_attendance = c.execute("SELECT 1 FROM attendance LIMIT 1").fetchone()
+    if has_attendance and not has_summary:
+        rebuild_summaries(c)
+
+
+def rebuild_summaries(c):
+    """Recompute all summary tables from the attendance table."""
+    c.execute("DELETE FROM attendance_daily_student")
+    c.execute("DELETE FROM attendance_daily_camera")
+    c.execute("DELETE FROM attendance_daily")
+    c.execute('''
+        INSERT INTO attendance_daily_student (date, roll_no, cameras, first_seen, last_seen)
+        SELECT date, roll_no, COUNT(*), MIN(detected_time), MAX(detected_time)
+        FROM attendance GROUP BY date, roll_no
+    ''')
+    c.execute('''
+        INSERT INTO attendance_daily_camera (date, camera_id, students, first_seen, last_seen)
+        SELECT date, camera_id, COUNT(*), MIN(detected_time), MAX(detected_time)
+        FROM attendance GROUP BY date, camera_id
+    ''')
+    c.execute('''
+        INSERT INTO attendance_daily (date, present)
+        SELECT date, COUNT(*) FROM attendance_daily_student GROUP BY date
+    ''')
+
+
+def init_db():
+    """Initialize the database and create tables."""
+    conn = connect()
+    create_schema(conn)
+
+    # --- Preload Student Data (updated order) ---
+    students_data = [
+        {'roll_no': "7376241CS146", 'name': "Boomika S", 'dataset_folder': "boomika"},
+        {'roll_no': "7376241CS405", 'name': "Sri Midhuna S K", 'dataset_folder': "midhuna"},
+        {'roll_no': "7376242AD328", 'name': "Thiyanesh D", 'dataset_folder': "thiyanesh"},
+        {'roll_no': "7376242IT333", 'name': "Varshini S", 'dataset_folder': "varshini"},
+        {'roll_no': "7376241CS472", 'name': "Varun S", 'dataset_folder': "varun"},
+        {'roll_no': "7376241CS465", 'name': "Vihashini S V", 'dataset_folder': "vihashini"},
+        {'roll_no': "7376241CS476", 'name': "Yuvashri M", 'dataset_folder': "yuvashree"}
+    ]
+    bulk_insert_students(conn, students_data)
+    # Link seed students created before dataset_folder existed
+    with conn:
+        conn.executemany("UPDATE students SET dataset_folder = ? WHERE roll_no = ? AND dataset_folder IS NULL",
+                         [(s['dataset_folder'], s['roll_no']) for s in students_data])
     conn.close()
     print("✅ Database initialized and student data inserted successfully (updated order).")
 
 
 def add_camera(ip_address):
     """Register a new camera."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     c = conn.cursor()
     c.execute("INSERT INTO cameras (ip_address) VALUES (?)", (ip_address,))
     conn.commit()
@@ -64,33 +308,297 @@ def add_camera(ip_address):
     print(f"📸 Camera added: {ip_address}")
 
 
+# ---------------- Bulk Import ----------------
+def _existing(conn, table, column, values):
+    """Subset of values already present in table.column (queried in chunks)."""
+    found = set()
+    values = list(values)
+    for i in range(0, len(values), 500):
+        chunk = values[i:i + 500]
+        marks = ','.join('?' * len(chunk))
+        found.update(r[0] for r in conn.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({marks})", chunk))
+    return found
+
+
+def bulk_insert_students(conn, records, update_existing=False):
+    """Insert many students in one transaction.
+
+    records: dicts with roll_no, name and optional dataset_folder.
+    Returns one status dict per input record, in order: inserted, updated,
+    exists, linked (existing student without a dataset_folder that got this
+    record's folder), duplicate (repeated within this import) or error.
+    """
+    statuses, rows, seen = [], [], set()
+    for rec in records:
+        roll_no = str(rec.get('roll_no') or '').strip()
+        name = str(rec.get('name') or '').strip()
+        folder = str(rec.get('dataset_folder') or '').strip() or None
+        if not roll_no or not name:
+            statuses.append({'roll_no': roll_no or None, 'status': 'error', 'error': 'Missing fields'})
+        elif roll_no in seen:
+            statuses.append({'roll_no': roll_no, 'status': 'duplicate'})
+        else:
+            seen.add(roll_no)
+            rows.append((roll_no, name, folder))
+            statuses.append({'roll_no': roll_no, 'status': None})
+
+    existing = _existing(conn, 'students', 'roll_no', seen)
+    if update_existing:
+        sql = '''INSERT INTO students (roll_no, name, dataset_folder) VALUES (?, ?, ?)
+                 ON CONFLICT (roll_no) DO UPDATE SET
+                     name = excluded.name,
+                     dataset_folder = COALESCE(excluded.dataset_folder, dataset_folder)'''
+        linked = set()
+    else:
+        sql = "INSERT OR IGNORE INTO students (roll_no, name, dataset_folder) VALUES (?, ?, ?)"
+        # Existing students are left alone, except that a missing folder is filled in (as init_db does)
+        unlinked = {r[0] for r in conn.execute("SELECT roll_no FROM students WHERE dataset_folder IS NULL")}
+        linked = {roll_no for roll_no, _, folder in rows if folder and roll_no in unlinked}
+    with conn:
+        conn.executemany(sql, rows)
+        if linked:
+            conn.executemany("UPDATE students SET dataset_folder = ? WHERE roll_no = ? AND dataset_folder IS NULL",
+                             [(folder, roll_no) for roll_no, _, folder in rows if roll_no in linked])
+
+    for st in statuses:
+        if st['status'] is None:
+            if st['roll_no'] in linked:
+                st['status'] = 'linked'
+            elif st['roll_no'] in existing:
+                st['status'] = 'updated' if update_existing else 'exists'
+            else:
+                st['status'] = 'inserted'
+    return statuses
+
+
+def bulk_insert_cameras(conn, records):
+    """Insert many cameras (dicts with ip_address) in one transaction, skipping
+    addresses that are already registered. Returns per-record status with camera_id."""
+    statuses, seen = [], {}  # dict keeps insertion order for stable camera_ids
+    for rec in records:
+        ip_address = str(rec.get('ip_address') or '').strip()
+        if not ip_address:
+            statuses.append({'ip_address': None, 'status': 'error', 'error': 'Missing IP address'})
+        elif ip_address in seen:
+            statuses.append({'ip_address': ip_address, 'status': 'duplicate'})
+        else:
+            seen[ip_address] = None
+            statuses.append({'ip_address': ip_address, 'status': None})
+
+    existing = _existing(conn, 'cameras', 'ip_address', seen)
+    new = [(ip,) for ip in seen if ip not in existing]
+    with conn:
+        conn.executemany("INSERT INTO cameras (ip_address) VALUES (?)", new)
+
+    ids = {}
+    values = list(seen)
+    for i in range(0, len(values), 500):
+        chunk = values[i:i + 500]
+        marks = ','.join('?' * len(chunk))
+        ids.update((ip, cid) for cid, ip in conn.execute(
+            f"SELECT camera_id, ip_address FROM cameras WHERE ip_address IN ({marks})", chunk))
+
+    for st in statuses:
+        if st['status'] is None:
+            st['status'] = 'exists' if st['ip_address'] in existing else 'inserted'
+            st['camera_id'] = ids.get(st['ip_address'])
+    return statuses
+
+
+def parse_import_rows(body, content_type=''):
+    """Rows for the bulk endpoints from a JSON array or CSV text (with a header row)."""
+    if isinstance(body, bytes):
+        body = body.decode('utf-8-sig')
+    if 'json' in content_type or body.lstrip().startswith('['):
+        rows = json.loads(body)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError('Expected a JSON array of objects')
+        return rows
+    return list(csv.DictReader(io.StringIO(body)))
+
+
+# ---------------- Attendance ----------------
+INSERT_ATTENDANCE = '''
+    INSERT OR IGNORE INTO attendance (roll_no, camera_id, detected_time, date)
+    VALUES (?, ?, ?, ?)
+'''
+
+
+def attendance_row(roll_no, camera_id, when=None):
+    """(roll_no, camera_id, detected_time, date) tuple for INSERT_ATTENDANCE."""
+    when = when or datetime.now()
+    return (roll_no, camera_id, when.strftime("%Y-%m-%d %H:%M:%S"), when.strftime("%Y-%m-%d"))
+
+
+def insert_attendance(conn, rows):
+    """Bulk insert attendance rows in one transaction. Rows already present for
+    the same (roll_no, camera_id, date) are skipped. Returns rows inserted."""
+    with conn:
+        cur = conn.executemany(INSERT_ATTENDANCE, rows)
+    # rowcount excludes the summary-table writes done by triggers
+    return cur.rowcount
+
+
 def log_attendance(roll_no, camera_id):
     """Log student's attendance if not already marked for today."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    now = datetime.now()
-    date = now.strftime("%Y-%m-%d")
-    detected_time = now.strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect()
+    row = attendance_row(roll_no, camera_id)
+    inserted = insert_attendance(conn, [row])
+    conn.close()
 
-    # Avoid duplicate entries in the same day
-    c.execute('''
-        SELECT * FROM attendance 
-        WHERE roll_no=? AND date=? AND camera_id=?
-    ''', (roll_no, date, camera_id))
-    
-    if c.fetchone():
-        conn.close()
+    if not inserted:
         print(f"⚠️ Attendance already marked today for {roll_no}")
-        return
+        return False
+    print(f"✅ Attendance logged: {roll_no} from Camera {camera_id} at {row[2]}")
+    return True
 
-    c.execute('''
-        INSERT INTO attendance (roll_no, camera_id, detected_time, date)
-        VALUES (?, ?, ?, ?)
-    ''', (roll_no, camera_id, detected_time, date))
 
-    conn.commit()
-    conn.close()
-    print(f"✅ Attendance logged: {roll_no} from Camera {camera_id} at {detected_time}")
+# ---------------- Gallery Identities ----------------
+UNKNOWN_IDENTITY = -1
+
+
+def resolve_identities(conn, folders):
+    """identity_id for each dataset folder, in order (UNKNOWN_IDENTITY when no
+    student is linked to the folder). Ids are created on first enrollment and
+    stay fixed afterwards."""
+    roll_by_folder = dict(conn.execute(
+        "SELECT dataset_folder, roll_no FROM students WHERE dataset_folder IS NOT NULL"))
+    linked = [roll_by_folder[f] for f in folders if f in roll_by_folder]
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO identities (roll_no) VALUES (?)", [(r,) for r in linked])
+    id_by_roll = dict(conn.execute("SELECT roll_no, identity_id FROM identities"))
+    return [id_by_roll.get(roll_by_folder.get(f), UNKNOWN_IDENTITY) for f in folders]
+
+
+def identity_roll_numbers(conn):
+    """{identity_id: roll_no} for every enrolled identity."""
+    return dict(conn.execute("SELECT identity_id, roll_no FROM identities"))
+
+
+# ---------------- Camera Schedule ----------------
+def schedule_windows(conn):
+    """(camera_name, weekday, start_time, end_time, mode) rows of the timetable."""
+    return conn.execute("SELECT camera_name, weekday, start_time, end_time, mode "
+                        "FROM camera_schedule ORDER BY camera_name, weekday, start_time").fetchall()
+
+
+# ---------------- Read Queries (shared by the Flask and ASGI APIs) ----------------
+MAX_PAGE_SIZE = 10000
+
+
+def _where(clauses):
+    return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+def date_range_clause(args, column='date'):
+    clauses, params = [], []
+    if args.get('date_from'):
+        clauses.append(f"{column} >= ?")
+        params.append(args['date_from'])
+    if args.get('date_to'):
+        clauses.append(f"{column} <= ?")
+        params.append(args['date_to'])
+    return clauses, params
+
+
+def attendance_record(r):
+    return {'attendance_id': r[0], 'roll_no': r[1], 'camera_id': r[2],
+            'detected_time': r[3], 'date': r[4]}
+
+
+def attendance_query(args):
+    """(query, params, limit) for GET /attendance filters. Raises ValueError on bad input."""
+    clauses, params = date_range_clause(args)
+    if args.get('roll_no'):
+        clauses.append("roll_no = ?")
+        params.append(args['roll_no'])
+    try:
+        if args.get('camera_id'):
+            clauses.append("camera_id = ?")
+            params.append(int(args['camera_id']))
+        if args.get('after_id'):
+            clauses.append("attendance_id > ?")
+            params.append(int(args['after_id']))
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        raise ValueError('camera_id, after_id and limit must be integers')
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    query = ("SELECT attendance_id, roll_no, camera_id, detected_time, date FROM attendance"
+             + _where(clauses) + " ORDER BY attendance_id")
+    return query, params, limit
+
+
+def daily_summary_query(args):
+    """(query, params, to_record) for students present per day."""
+    clauses, params = date_range_clause(args)
+    query = "SELECT date, present FROM attendance_daily" + _where(clauses) + " ORDER BY date"
+    return query, params, lambda r: {'date': r[0], 'present': r[1]}
+
+
+def student_summary_query(args):
+    """Per student: days present and first/last sighting over the range.
+    With daily=1 (or a roll_no filter) returns the per-day rows instead."""
+    clauses, params = date_range_clause(args)
+    if args.get('roll_no'):
+        clauses.append("roll_no = ?")
+        params.append(args['roll_no'])
+
+    if args.get('daily') or args.get('roll_no'):
+        query = ("SELECT date, roll_no, cameras, first_seen, last_seen FROM attendance_daily_student"
+                 + _where(clauses) + " ORDER BY roll_no, date")
+        return query, params, lambda r: {'date': r[0], 'roll_no': r[1], 'cameras': r[2],
+                                         'first_seen': r[3], 'last_seen': r[4]}
+
+    query = ("SELECT roll_no, COUNT(*), MIN(first_seen), MAX(last_seen) FROM attendance_daily_student"
+             + _where(clauses) + " GROUP BY roll_no ORDER BY roll_no")
+    return query, params, lambda r: {'roll_no': r[0], 'days_present': r[1],
+                                     'first_seen': r[2], 'last_seen': r[3]}
+
+
+def camera_summary_query(args):
+    """(query, params, to_record) for students seen per camera per day."""
+    clauses, params = date_range_clause(args)
+    if args.get('camera_id'):
+        clauses.append("camera_id = ?")
+        params.append(args['camera_id'])
+    query = ("SELECT date, camera_id, students, first_seen, last_seen FROM attendance_daily_camera"
+             + _where(clauses) + " ORDER BY date, camera_id")
+    return query, params, lambda r: {'date': r[0], 'camera_id': r[1], 'students': r[2],
+                                     'first_seen': r[3], 'last_seen': r[4]}
+
+
+class AttendanceStore:
+    """Long-lived connection used by the recognition pipeline's writer thread."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        # Shared by the background writer and camera threads registering cameras;
+        # the lock keeps them from interleaving transactions on it
+        self.conn = connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        create_schema(self.conn)
+
+    def get_or_create_camera(self, ip_address):
+        """camera_id for a source address, registering it on first use."""
+        with self._lock:
+            row = self.conn.execute("SELECT camera_id FROM cameras WHERE ip_address=?",
+                                    (ip_address,)).fetchone()
+            if row:
+                return row[0]
+            with self.conn:
+                cur = self.conn.execute("INSERT INTO cameras (ip_address) VALUES (?)", (ip_address,))
+            return cur.lastrowid
+
+    def write_batch(self, rows):
+        with self._lock:
+            return insert_attendance(self.conn, rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
 
 
 # --- Run directly to initialize DB ---
@@ -0,0 +1,120 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import DB_PATH, connect, create_schema, bulk_insert_students, parse_import_rows
+
+
+def folder_candidates(name, folders):
+    """dataset/ folders equal to one of the name's words (case-insensitive),
+    e.g. "Sri Midhuna S K" -> ["midhuna"]."""
+    by_lower = {f.lower(): f for f in folders}
+    candidates = []
+    for token in name.lower().split():
+        folder = by_lower.get(token)
+        if folder is not None and folder not in candidates:
+            candidates.append(folder)
+    return candidates
+
+
+def match_folder(name, folders):
+    """The single dataset/ folder matching a student name, or None when no
+    folder or more than one folder matches."""
+    candidates = folder_candidates(name, folders)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _roll_no(row):
+    # Same normalisation as bulk_insert_students, so statuses can be matched up
+    return str(row.get('roll_no') or '').strip()
+
+
+def enroll_roster(roster_path, dataset_dir='dataset', db_path=DB_PATH, update=False):
+    """Insert the roster's students and link each to its dataset/<folder>.
+
+    The roster is a CSV with roll_no,name and an optional dataset_folder column.
+    Students whose name matches several folders, or whose folder another
+    student's name also matches, are left unlinked and reported as ambiguous.
+    Returns the per-row statuses from bulk_insert_students ('ambiguous' lists
+    the candidate folders).
+    """
+    with open(roster_path, 'rb') as f:
+        rows = parse_import_rows(f.read(), 'text/csv')
+
+    folders = [f.name for f in os.scandir(dataset_dir) if f.is_dir()] if os.path.isdir(dataset_dir) else []
+    # roll_no -> candidate folders, for names matching several folders or a
+    # folder that another roster row names or also matches
+    ambiguous = {}
+    claimed = {}  # folder -> rows naming or matching it
+    matches = []
+    for row in rows:
+        folder = (row.get('dataset_folder') or '').strip()
+        if folder and folder not in folders:
+            print(f"Warning: {row.get('roll_no')}: dataset/{folder} does not exist.")
+        if folder:
+            claimed.setdefault(folder, []).append(row)
+            continue
+        candidates = folder_candidates(row.get('name') or '', folders)
+        for candidate in candidates:
+            claimed.setdefault(candidate, []).append(row)
+        matches.append((row, candidates))
+    for row, candidates in matches:
+        row['dataset_folder'] = None
+        if len(candidates) > 1:
+            ambiguous[_roll_no(row)] = candidates
+        elif candidates and len(claimed[candidates[0]]) > 1:
+            ambiguous[_roll_no(row)] = candidates
+        elif candidates:
+            row['dataset_folder'] = candidates[0]
+
+    conn = connect(db_path)
+    create_schema(conn)
+    statuses = bulk_insert_students(conn, rows, update_existing=update)
+    conn.close()
+
+    for st in statuses:
+        if st['roll_no'] in ambiguous:
+            st['ambiguous'] = ambiguous[st['roll_no']]
+    unlinked = [st['roll_no'] for st, row in zip(statuses, rows)
+                if st['status'] in ('inserted', 'updated', 'exists', 'linked') and not row.get('dataset_folder')
+                and st['roll_no'] not in ambiguous]
+    counts = {}
+    for st in statuses:
+        counts[st['status']] = counts.get(st['status'], 0) + 1
+    print(f"✅ Roster imported: " + ", ".join(f"{v} {k}" for k, v in sorted(counts.items())))
+    for st in statuses:
+        if st['status'] == 'error':
+            print(f"   ✗ {st['roll_no']}: {st['error']}")
+    for st in statuses:
+        if 'ambiguous' not in st:
+            continue
+        if len(st['ambiguous']) > 1:
+            reason = f"name matches {', '.join(st['ambiguous'])}"
+        else:
+            reason = f"dataset/{st['ambiguous'][0]} also belongs to another roster row"
+        print(f"   ? {st['roll_no']}: ambiguous dataset folder ({reason}); set dataset_folder in the roster")
+    if unlinked:
+        print(f"⚠️ {len(unlinked)} students have no dataset folder: {', '.join(unlinked)}")
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll students from a roster CSV (roll_no,name[,dataset_folder]).")
+    parser.add_argument('roster', help="Roster CSV file")
+    parser.add_argument('--dataset', default='dataset', help="Dataset directory with one folder per student")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--update', action='store_true', help="Overwrite names/folders of existing students")
+    parser.add_argument('--embed', action='store_true', help="Rebuild face embeddings afterwards")
+    args = parser.parse_args()
+
+    enroll_roster(args.roster, args.dataset, args.db, args.update)
+
+    if args.embed:
+        from src.precompute_embeddings import precompute_embeddings
+        precompute_embeddings()
+
+
+if __name__ == "__main__":
+    main()
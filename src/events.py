@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+from collections import deque
+from typing import Optional
+
+
+class Subscription:
+    """One consumer's bounded buffer. When the consumer falls behind, the
+    oldest events are dropped rather than blocking the publisher."""
+
+    def __init__(self, bus: "EventBus", max_events: int, types=None):
+        self._bus = bus
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self.types = set(types) if types else None
+        self.dropped = 0
+        # (loop, asyncio.Event) of a consumer parked in get_async()
+        self._waiter = None
+
+    def _push(self, event: dict):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            try:
+                # Publishers run on camera/worker threads; wake the loop from there
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if nothing arrived within timeout."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """get() for asyncio consumers: awaits the next event without
+        blocking the event loop or polling."""
+        ready = asyncio.Event()
+        with self._cond:
+            if self._events:
+                return self._events.popleft()
+            self._waiter = (asyncio.get_running_loop(), ready)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiter = None
+        with self._cond:
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """In-process publish/subscribe for recognition and attendance events."""
+
+    def __init__(self, max_events_per_subscriber: int = 256):
+        self.max_events = max_events_per_subscriber
+        self._subs = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, types=None, max_events: Optional[int] = None) -> Subscription:
+        sub = Subscription(self, max_events or self.max_events, types)
+        with self._lock:
+            self._subs = self._subs + [sub]
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subs)
+
+    def publish(self, event_type: str, **data):
+        # Copy-on-write list: publishers never take the lock
+        subs = self._subs
+        if not subs:
+            return
+        event = {'type': event_type, 'ts': time.time(), **data}
+        for sub in subs:
+            if sub.types is None or event_type in sub.types:
+                sub._push(event)
+
+
+def origin() -> str:
+    """<hostname>-<pid> of this process; tags events shared between processes."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def sse_format(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+# Shared bus for the recognition pipeline and the API
+BUS = EventBus()
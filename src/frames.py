@@ -0,0 +1,38 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+
+class FrameBufferPool:
+    """Ring of preallocated frame buffers for one camera.
+
+    `read(cap)` decodes the next frame straight into the next buffer via
+    cap.read(buf), so a steady stream allocates nothing per frame. A frame
+    stays valid until the ring wraps around (`size` reads later); keep a copy
+    if it must live longer. The ring is (re)built from the first frame and
+    whenever the stream's resolution changes.
+    """
+
+    def __init__(self, size: int = 3, name: str = ''):
+        self.size = max(1, size)
+        self.name = name
+        self._buffers = []
+        self._next = 0
+
+    def read(self, cap) -> Tuple[bool, Optional[np.ndarray]]:
+        buf = self._buffers[self._next] if self._buffers else None
+        ret, frame = cap.read(buf) if buf is not None else cap.read()
+        if not ret:
+            return False, None
+        if frame is not buf:
+            # OpenCV allocated a new array: first frame or a resolution/format change
+            self._buffers = [frame] + [np.empty_like(frame) for _ in range(self.size - 1)]
+            self._next = 0
+            REGISTRY.inc('frame_buffer_allocations_total', camera=self.name)
+        self._next = (self._next + 1) % self.size
+        return True, frame
@@ -0,0 +1,183 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantiles(samples: List[float]) -> List[float]:
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return [ordered[min(last, int(round(q * last)))] for q in QUANTILES]
+
+
+def _escape(value: str) -> str:
+    # Prometheus text format: backslash, double quote and newline are escaped in label values
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_str(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in labels) + '}'
+
+
+class _Summary:
+    """Running sum/count plus a window of recent samples for quantiles."""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Minimal in-process metrics store rendered in Prometheus text format.
+
+    Stage latencies are summaries (p50/p95/p99 over the last `window` samples),
+    counters only go up, gauges hold the last value set.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._summaries: Dict[Tuple[str, tuple], _Summary] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._gauges: Dict[Tuple[str, tuple], float] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary(self.window)
+            summary.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def timer(self, stage: str, **labels):
+        """Record the duration of the enclosed block under face_stage_seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('face_stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge (0 if never recorded)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0.0))
+
+    def quantiles(self, name: str, **labels) -> Dict[str, float]:
+        """p50/p95/p99 of one summary over its recent window ({} if empty)."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            samples = list(summary.samples) if summary else []
+        return dict(zip(('p50', 'p95', 'p99'), _quantiles(samples))) if samples else {}
+
+    def snapshot(self) -> dict:
+        """Quantiles per summary, e.g. for periodic logging."""
+        out = {}
+        with self._lock:
+            for (name, labels), s in self._summaries.items():
+                if not s.samples:
+                    continue
+                q = _quantiles(list(s.samples))
+                out[name + _label_str(labels)] = dict(zip(('p50', 'p95', 'p99'), q))
+        return out
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            summaries = {k: (list(v.samples), v.total, v.count) for k, v in self._summaries.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        def header(name, kind, seen):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        seen = set()
+        for (name, labels), (samples, total, count) in sorted(summaries.items()):
+            header(name, 'summary', seen)
+            if samples:
+                for q, v in zip(QUANTILES, _quantiles(samples)):
+                    lines.append(f"{name}{_label_str(labels + (('quantile', str(q)),))} {v:.6f}")
+            lines.append(f"{name}_sum{_label_str(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_label_str(labels)} {count}")
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter', seen)
+            lines.append(f"{name}{_label_str(labels)} {value:g}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge', seen)
+            lines.append(f"{name}{_label_str(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry for the recognition pipeline
+REGISTRY = MetricsRegistry()
+REGISTRY.describe('face_stage_seconds', 'Latency of each pipeline stage in seconds')
+REGISTRY.describe('faces_detected_total', 'Faces returned by the detector')
+REGISTRY.describe('faces_recognized_total', 'Faces matched to a known person')
+REGISTRY.describe('faces_unknown_total', 'Faces with no match under the threshold')
+REGISTRY.describe('frames_processed_total', 'Frames run through recognition')
+REGISTRY.describe('frames_dropped_total', 'Frames that could not be read or decoded')
+REGISTRY.describe('frames_skipped_total', 'Frames deliberately not processed (webcam skip, low-rate schedule)')
+REGISTRY.describe('camera_fps', 'Processed frames per second per camera')
+REGISTRY.describe('recognize_batch_size', 'Frames per batched recognition call')
+
+
+# ---------------- /metrics Endpoint ----------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood stdout
+
+
+def start_metrics_server(port: int = 9100, host: str = '0.0.0.0'):
+    """Serve REGISTRY on http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
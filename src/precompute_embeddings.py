@@ -1,10 +1,17 @@
 import os
+import cv2
 import numpy as np
 import faiss
 from tqdm import tqdm
 from PIL import Image
 from deepface import DeepFace
-from utils import load_config, save_faiss_data 
+
+try:
+    from src.utils import load_config, save_faiss_data, l2_normalize
+    from src.database import DB_PATH, connect, create_schema, resolve_identities
+except ImportError:
+    from utils import load_config, save_faiss_data, l2_normalize
+    from database import DB_PATH, connect, create_schema, resolve_identities
 
 
 def precompute_embeddings():
@@ -14,12 +21,15 @@ def precompute_embeddings():
 
     dataset_dir = config['PATHS']['DATASET_DIR']
     embedding_model = config['RECOGNITION']['EMBEDDING_MODEL']
+    # Recognition cascade: the fast model's gallery is built in the same pass
+    cascade_cfg = config['RECOGNITION'].get('CASCADE', {}) or {}
+    fast_model = cascade_cfg.get('FAST_MODEL', 'SFace') if cascade_cfg.get('ENABLED') else None
+    models = [embedding_model] + ([fast_model] if fast_model else [])
     
-    
-    print(f"Initializing DeepFace with model: {embedding_model}...")
+    print(f"Initializing DeepFace with model(s): {', '.join(models)}...")
     
 
-    all_embeddings = []
+    all_embeddings = {model: [] for model in models}
     all_labels = []
 
     
@@ -41,24 +51,34 @@ def precompute_embeddings():
 
         
         
-        person_embeddings = []
+        person_embeddings = {model: [] for model in models}
         
         for image_name in image_files:
             image_path = os.path.join(person_dir, image_name)
             try:
-                
-                representations = DeepFace.represent(
-                    img_path=image_path, 
-                    model_name=embedding_model, 
-                    enforce_detection=False,
-                    detector_backend='opencv',
-                    # action='all' is an older parameter, just use defaults
-                )
-                
-                
-                if representations:
-                    embedding = representations[0]['embedding']
-                    person_embeddings.append(np.array(embedding))
+                # Decode once; every model embeds the same pixels
+                image = cv2.imread(image_path)
+                if image is None:
+                    print(f"Could not read {image_path}. Skipping.")
+                    continue
+
+                embeddings = {}
+                for model in models:
+                    representations = DeepFace.represent(
+                        img_path=image,
+                        model_name=model,
+                        enforce_detection=False,
+                        detector_backend='opencv',
+                        # action='all' is an older parameter, just use defaults
+                    )
+                    if not representations:
+                        break
+                    embeddings[model] = np.array(representations[0]['embedding'])
+
+                # An image only counts if every model embedded it, so the galleries stay row-aligned
+                if len(embeddings) == len(models):
+                    for model, embedding in embeddings.items():
+                        person_embeddings[model].append(embedding)
                 else:
                     print(f"Could not detect face in {image_path}. Skipping.")
                     
@@ -66,19 +86,18 @@ def precompute_embeddings():
                 print(f"Error processing {image_path}: {e}")
                 continue
         
-        if person_embeddings:
-            mean_embedding = np.mean(person_embeddings, axis=0)
-            
-            all_embeddings.append(mean_embedding)
+        if person_embeddings[embedding_model]:
+            for model in models:
+                all_embeddings[model].append(np.mean(person_embeddings[model], axis=0))
             all_labels.append(person_name)
 
 
     
-    if not all_embeddings:
+    if not all_labels:
         print("No embeddings were generated. FAISS index not created.")
         return
 
-    embeddings_matrix = np.array(all_embeddings).astype('float32')
+    embeddings_matrix = np.array(all_embeddings[embedding_model]).astype('float32')
     dimension = embeddings_matrix.shape[1]
     
     
@@ -90,8 +109,26 @@ def precompute_embeddings():
     faiss_index.add(embeddings_matrix) 
     print(f"Total embeddings added to FAISS: {faiss_index.ntotal}")
 
-    
-    save_faiss_data(faiss_index, all_labels, config)
+    fast_index = None
+    if fast_model:
+        # Cosine similarity on unit vectors, so the cascade thresholds are cosine distances
+        fast_matrix = l2_normalize(np.array(all_embeddings[fast_model]))
+        fast_index = faiss.IndexFlatIP(fast_matrix.shape[1])
+        fast_index.add(fast_matrix)
+        print(f"Fast FAISS index ({fast_model}, dimension {fast_matrix.shape[1]}): {fast_index.ntotal} embeddings")
+
+
+    # Link each gallery row to its student's identity id (students.dataset_folder)
+    conn = connect(config.get('ATTENDANCE', {}).get('DATABASE') or DB_PATH)
+    create_schema(conn)
+    identity_ids = resolve_identities(conn, all_labels)
+    conn.close()
+    unlinked = [label for label, i in zip(all_labels, identity_ids) if i < 0]
+    if unlinked:
+        print(f"Warning: no student has dataset_folder set for {unlinked}. "
+              "Enroll them (src/enroll_roster.py) and re-run to record their attendance.")
+
+    save_faiss_data(faiss_index, all_labels, config, identity_ids, fast_index, fast_model)
 
 
 if __name__ == "__main__":
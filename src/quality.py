@@ -0,0 +1,68 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+try:
+    from src.results import SKIP_NONE, SKIP_LOW_CONFIDENCE, SKIP_TOO_SMALL, SKIP_POSE, SKIP_BLURRY
+except ImportError:
+    from results import SKIP_NONE, SKIP_LOW_CONFIDENCE, SKIP_TOO_SMALL, SKIP_POSE, SKIP_BLURRY
+
+
+def blur_score(face_crop: np.ndarray) -> float:
+    """Variance of the Laplacian; sharp faces score high, motion blur scores low."""
+    gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY) if face_crop.ndim == 3 else face_crop
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def yaw_score(keypoints: Optional[np.ndarray]) -> Optional[float]:
+    """Rough head yaw from YOLO-face keypoints (left eye, right eye, nose, ...):
+    0 when the nose sits midway between the eyes, 1 when it's level with one eye."""
+    if keypoints is None or len(keypoints) < 3:
+        return None
+    left_eye, right_eye, nose = keypoints[0], keypoints[1], keypoints[2]
+    eye_span = right_eye[0] - left_eye[0]
+    if abs(eye_span) < 1e-6:
+        return 1.0
+    return float(min(1.0, abs((nose[0] - left_eye[0]) / eye_span - 0.5) * 2))
+
+
+class QualityGate:
+    """Decides which detected faces are worth embedding.
+
+    Checks run cheapest first (detector confidence, box size, pose from
+    keypoints, then blur); `check` returns the first failing reason code or
+    SKIP_NONE. Any threshold set to None is not checked.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = 0.5, min_face_size: Optional[int] = 40,
+                 max_yaw: Optional[float] = 0.6, min_blur_score: Optional[float] = 40.0):
+        self.min_confidence = min_confidence
+        self.min_face_size = min_face_size
+        self.max_yaw = max_yaw
+        self.min_blur_score = min_blur_score
+
+    @classmethod
+    def from_config(cls, config) -> Optional["QualityGate"]:
+        q_cfg = config.get('QUALITY', {}) or {}
+        if not q_cfg.get('ENABLED', True):
+            return None
+        return cls(min_confidence=q_cfg.get('MIN_CONFIDENCE', 0.5),
+                   min_face_size=q_cfg.get('MIN_FACE_SIZE', 40),
+                   max_yaw=q_cfg.get('MAX_YAW', 0.6),
+                   min_blur_score=q_cfg.get('MIN_BLUR_SCORE', 40.0))
+
+    def check(self, face_crop: np.ndarray, width: int, height: int, confidence: float,
+              keypoints: Optional[np.ndarray] = None) -> int:
+        """width/height are the unpadded detector box; face_crop is what would be embedded."""
+        if self.min_confidence is not None and confidence < self.min_confidence:
+            return SKIP_LOW_CONFIDENCE
+        if self.min_face_size is not None and min(width, height) < self.min_face_size:
+            return SKIP_TOO_SMALL
+        if self.max_yaw is not None:
+            yaw = yaw_score(keypoints)
+            if yaw is not None and yaw > self.max_yaw:
+                return SKIP_POSE
+        if self.min_blur_score is not None and blur_score(face_crop) < self.min_blur_score:
+            return SKIP_BLURRY
+        return SKIP_NONE
@@ -1,58 +1,117 @@
 import os
+import time
 import cv2
 import numpy as np
-from deepface import DeepFace
-from ultralytics import YOLO 
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 
 try:
-    from src.utils import load_config, load_faiss_data, get_device
+    from src.utils import load_config, load_faiss_data, load_fast_index, load_identities, get_device, l2_normalize
+    from src.metrics import REGISTRY
+    from src.results import FrameResults, SKIP_NONE, SKIP_REASONS
+    from src.quality import QualityGate
+    from src.threads import configure as configure_threads
 except ImportError:
-    from utils import load_config, load_faiss_data, get_device
+    from utils import load_config, load_faiss_data, load_fast_index, load_identities, get_device, l2_normalize
+    from metrics import REGISTRY
+    from results import FrameResults, SKIP_NONE, SKIP_REASONS
+    from quality import QualityGate
+    from threads import configure as configure_threads
+
+
+# deepface (TensorFlow) and ultralytics (torch) take seconds to import, so they
+# are imported by the loaders below; FaceRecognizer runs them while the gallery loads.
+def _load_gallery(config, fast_model: Optional[str]):
+    faiss_index, labels = load_faiss_data(config)
+    if faiss_index is None:
+        raise Exception("FAISS index not loaded. Run precompute_embeddings.py first.")
+    # Gallery row -> identity_id (int32), identity_id -> roll_no
+    identity_ids, roll_numbers = load_identities(config, labels)
+    fast_index = load_fast_index(config, faiss_index, labels, fast_model) if fast_model else None
+    return faiss_index, labels, identity_ids, roll_numbers, fast_index
+
+
+def _load_detector(model_path, device):
+    from ultralytics import YOLO
+    configure_threads('torch')
+    # The YOLOv8 model is loaded onto the correct device for faster inference
+    return YOLO(model_path).to(device)
+
+
+def _load_embedder(model_name):
+    from deepface import DeepFace
+    configure_threads('tensorflow')  # before the first model creates TF's thread pools
+    # Build the model now instead of inside the first represent() call
+    DeepFace.build_model(model_name)
+    return DeepFace
 
 
 class FaceRecognizer:
-    def __init__(self):
+    def __init__(self, warmup: Optional[bool] = None):
         try:
+            started = time.perf_counter()
             print("Step 1: Loading configuration...")
             self.config = load_config()
             if not self.config:
                 raise Exception("Failed to load project configuration.")
             print("✓ Configuration loaded")
-                
-            print("Step 2: Getting device...")
-            self.device = get_device(self.config)
-            print(f"✓ Device set to: {self.device}")
 
-            print("Step 3: Loading FAISS Index and Labels...")
-            # 1. Load FAISS Index and Labels
+            # DeepFace Model Configuration (Used for generating the embedding)
+            self.embedding_model_name = self.config['RECOGNITION']['EMBEDDING_MODEL']
+            self.recognition_threshold = self.config['RECOGNITION']['VERIFICATION_THRESHOLD']
+            self.distance_metric = self.config['RECOGNITION']['DISTANCE_METRIC']
+            # Drops tiny / blurry / profile / low-confidence faces before embedding
+            self.quality_gate = QualityGate.from_config(self.config)
 
+            # Cascade: a small model + gallery decides clear matches/non-matches, and only
+            # faces in the ambiguous band between the two thresholds reach the main model
+            cascade_cfg = self.config['RECOGNITION'].get('CASCADE', {}) or {}
+            self.fast_model_name = cascade_cfg.get('FAST_MODEL', 'SFace') if cascade_cfg.get('ENABLED') else None
+            self.cascade_accept = float(cascade_cfg.get('ACCEPT_THRESHOLD', 0.45))
+            self.cascade_reject = float(cascade_cfg.get('REJECT_THRESHOLD', 0.75))
 
-            self.faiss_index, self.labels = load_faiss_data(self.config)
-            if self.faiss_index is None:
-                raise Exception("FAISS index not loaded. Run precompute_embeddings.py first.")
-            print(f"✓ FAISS index loaded with {len(self.labels)} persons: {self.labels}")
+            # The gallery is plain file I/O, so it loads in the background; the models are
+            # built one after another, since TF/Keras model construction isn't thread-safe
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='gallery-load') as pool:
+                print("Step 2: Loading FAISS index in the background, then DeepFace and YOLOv8...")
+                gallery = pool.submit(_load_gallery, self.config, self.fast_model_name)
 
-            print("Step 4: Loading YOLOv8 Face Detector...")
-            # 2. Load YOLOv8 Face Detector (For bounding box on live/new images)
-            yolo_model_path = self.config['PATHS']['YOLO_FACE_MODEL']
-            print(f"   Loading from: {yolo_model_path}")
+                self._deepface = _load_embedder(self.embedding_model_name)
+                print(f"✓ DeepFace Embedding Model: {self.embedding_model_name}")
+                if self.fast_model_name:
+                    _load_embedder(self.fast_model_name)
 
-            # The YOLOv8 model is loaded onto the correct device for faster inference
-            self.yolo_model = YOLO(yolo_model_path).to(self.device)
-            print(f"✓ YOLOv8 Face Detector loaded on {self.device}")
-            print("Step 5: Configuring DeepFace...")
+                self.device = get_device(self.config)
+                print(f"✓ Device set to: {self.device}")
+                yolo_model_path = self.config['PATHS']['YOLO_FACE_MODEL']
+                print(f"   Loading YOLOv8 Face Detector from: {yolo_model_path}")
+                self.yolo_model = _load_detector(yolo_model_path, self.device)
+                print(f"✓ YOLOv8 Face Detector loaded on {self.device}")
+
+                (self.faiss_index, self.labels, self.identity_ids, self.roll_numbers,
+                 self.fast_index) = gallery.result()
+                print(f"✓ FAISS index loaded with {len(self.labels)} persons: {self.labels}")
+                print(f"✓ {int((self.identity_ids >= 0).sum())} gallery identities linked to students")
+                if self.fast_model_name:
+                    if self.fast_index is None:
+                        print("⚠️ Cascade disabled: no matching fast-model gallery")
+                        self.fast_model_name = None
+                    else:
+                        print(f"✓ Cascade fast model: {self.fast_model_name} "
+                              f"(accept <= {self.cascade_accept}, reject > {self.cascade_reject})")
+
+            if warmup is None:
+                warmup = self.config['RECOGNITION'].get('WARMUP', True)
+            if warmup:
+                print("Step 3: Warming up models...")
+                self.warmup()
+                print("✓ Warm-up done")
+
+            elapsed = time.perf_counter() - started
+            REGISTRY.set('recognizer_startup_seconds', elapsed)
+            print(f"\n✓✓✓ FaceRecognizer initialized successfully in {elapsed:.1f}s! ✓✓✓\n")
 
-            # 3. DeepFace Model Configuration (Used for generating the embedding)
-            self.embedding_model_name = self.config['RECOGNITION']['EMBEDDING_MODEL']
-            self.recognition_threshold = self.config['RECOGNITION']['VERIFICATION_THRESHOLD']
-            self.distance_metric = self.config['RECOGNITION']['DISTANCE_METRIC']
-            
-            
-            print(f"✓ DeepFace Embedding Model: {self.embedding_model_name}")
-            print("\n✓✓✓ FaceRecognizer initialized successfully! ✓✓✓\n")
-            
         except Exception as e:
             import traceback
             print(f"\n❌ Error during initialization at one of the steps:")
@@ -61,86 +120,181 @@ class FaceRecognizer:
             traceback.print_exc()
             raise
 
+    def warmup(self, frame_size=(480, 640)):
+        """Run every stage once on dummy input so CUDA kernels, TensorFlow graphs
+        and allocator pools are set up before the first real frame."""
+        frame = np.zeros((*frame_size, 3), dtype=np.uint8)
+        self.yolo_model([frame], verbose=False, device=self.device)
+        crop = np.zeros((160, 160, 3), dtype=np.uint8)
+        embedding = self._embed(crop)
+        if embedding is not None:
+            self.faiss_index.search(embedding[None, :], 1)
+        if self.fast_model_name:
+            embedding = self._embed(crop, self.fast_model_name, 'embed_fast')
+            if embedding is not None:
+                self.fast_index.search(l2_normalize(embedding[None, :]), 1)
 
-    def recognize_face(self, frame: np.ndarray):
+    def recognize_face(self, frame: np.ndarray) -> FrameResults:
+        return self.recognize_batch([frame])[0]
 
-        results = []
-        
-        
-        yolo_output = self.yolo_model(frame, verbose=False, device=self.device)
-        
-        for r in yolo_output:
-            
-            for box in r.boxes.xyxy: 
+    def detect_faces(self, frame: np.ndarray) -> FrameResults:
+        """Boxes and detector scores only; every face is left Unknown."""
+        return self.recognize_batch([frame], embed=False)[0]
+
+    def recognize_batch(self, frames: List[np.ndarray], embed: bool = True) -> List[FrameResults]:
+        """Recognize faces in several frames at once: one YOLO call for all
+        frames and one FAISS search for all faces found. embed=False stops
+        after detection."""
+
+        with REGISTRY.timer('detect'):
+            yolo_output = self.yolo_model(list(frames), verbose=False, device=self.device)
+
+        batch_results = []
+        owners, crops = [], []
+        for frame, r in zip(frames, yolo_output):
+            xyxy = r.boxes.xyxy.cpu().numpy()
+            results = FrameResults.allocate(len(xyxy), self.labels)
+            results.scores[:] = r.boxes.conf.cpu().numpy()
+            # YOLOv8-face also predicts 5 landmarks (eyes, nose, mouth corners)
+            keypoints = r.keypoints.xy.cpu().numpy() if getattr(r, 'keypoints', None) is not None else None
+
+            for i, box in enumerate(xyxy):
                 x1, y1, x2, y2 = map(int, box)
-                
-                
+                box_w, box_h = x2 - x1, y2 - y1
+
                 padding = 10 
                 x1 = max(0, x1 - padding)
                 y1 = max(0, y1 - padding)
                 x2 = min(frame.shape[1], x2 + padding)
                 y2 = min(frame.shape[0], y2 + padding)
-                
-                
+                results.boxes[i] = (x1, y1, x2 - x1, y2 - y1) # (x, y, w, h) format
+                if not embed:
+                    continue
                 face_crop = frame[y1:y2, x1:x2]
-                
-                
-                person_name = "Unknown"
-                min_distance = float('inf')
-                
-                try:
-                    
-                    representations = DeepFace.represent(
-                        img_path=face_crop,
-                        model_name=self.embedding_model_name,
-                        enforce_detection=False 
-                    )
-                    
-                    if representations:
-                        query_embedding = np.array(representations[0]['embedding']).astype('float32')
-                        
-    
-                        
-                        k = 1 
-                        
-                        distances, indices = self.faiss_index.search(query_embedding[np.newaxis, :], k)
-                        
-                    
-                        min_distance = distances[0][0]
-                        best_match_index = indices[0][0]
-
-                        # Check against the verification threshold
-                        if min_distance <= self.recognition_threshold:
-                            person_name = self.labels[best_match_index]
-                            
-                        
-                        
-                except Exception as e:
-                    pass # Keep label as "Unknown"
-
-            
-                results.append({
-                    'box': (x1, y1, x2 - x1, y2 - y1), # (x, y, w, h) format
-                    'label': person_name,
-                    'distance': min_distance
-                })
-                
-        return results
-
-
-def draw_results(frame, recognition_results):
-    for result in recognition_results:
-        x, y, w, h = result['box']
-        label = result['label']
-        distance = result['distance']
-
-        color = (0, 255, 0) if label != "Unknown" else (0, 0, 255) # Green for known, Red for unknown
+
+                if self.quality_gate is not None:
+                    reason = self.quality_gate.check(face_crop, box_w, box_h, results.scores[i],
+                                                     keypoints[i] if keypoints is not None else None)
+                    if reason != SKIP_NONE:
+                        results.skipped[i] = reason
+                        REGISTRY.inc('faces_skipped_total', reason=SKIP_REASONS[reason])
+                        continue
+
+                # Crops stay views into the frame until the embedder reads them
+                owners.append((results, i))
+                crops.append(face_crop)
+
+            batch_results.append(results)
+
+        if crops:
+            if self.fast_model_name:
+                self._match_cascade(owners, crops)
+            else:
+                self._assign(owners, *self._search(crops), self.recognition_threshold)
+
+        return batch_results
+
+    def match_crops(self, crops):
+        """Embed face crops with the main model and search the gallery, as
+        recognize_batch does: (positions, distances, indices) for the crops
+        that produced an embedding."""
+        return self._search(crops)
+
+    def _search(self, crops, model_name=None, index=None, stage='embed', cosine=False):
+        """(positions, distances, indices) for the crops that produced an embedding,
+        one index search for all of them. cosine=True searches an inner-product
+        index with L2-normalised queries and returns cosine distances (1 - similarity)."""
+        positions, embeddings = [], []
+        for p, crop in enumerate(crops):
+            embedding = self._embed(crop, model_name, stage)
+            if embedding is not None:
+                positions.append(p)
+                embeddings.append(embedding)
+        if not embeddings:
+            return [], [], []
+        queries = np.stack(embeddings)
+        if cosine:
+            queries = l2_normalize(queries)
+        with REGISTRY.timer('search'):
+            distances, indices = (index or self.faiss_index).search(queries, 1)
+        if cosine:
+            distances = 1.0 - distances
+        return positions, distances[:, 0], indices[:, 0]
+
+    @staticmethod
+    def _assign(owners, positions, distances, indices, threshold):
+        for p, distance, index in zip(positions, distances, indices):
+            results, i = owners[p]
+            results.distances[i] = distance
+
+            # Check against the verification threshold
+            if distance <= threshold:
+                results.label_ids[i] = index
+
+    def _match_cascade(self, owners, crops):
+        positions, distances, indices = self._search(crops, self.fast_model_name, self.fast_index, 'embed_fast',
+                                                     cosine=True)
+        # Crops the fast model couldn't embed go to the main model as well
+        escalate = sorted(set(range(len(crops))) - set(positions))
+        accepted = rejected = 0
+        for p, distance, index in zip(positions, distances, indices):
+            results, i = owners[p]
+            # Fast-model distances have their own column; `distances` stays main-model only
+            results.fast_distances[i] = distance
+            if distance <= self.cascade_accept:
+                results.label_ids[i] = index
+                accepted += 1
+            elif distance > self.cascade_reject:
+                rejected += 1
+            else:
+                escalate.append(p)
+
+        REGISTRY.inc('cascade_faces_total', accepted, outcome='accepted')
+        REGISTRY.inc('cascade_faces_total', rejected, outcome='rejected')
+        REGISTRY.inc('cascade_faces_total', len(escalate), outcome='escalated')
+        if escalate:
+            self._assign([owners[p] for p in escalate], *self._search([crops[p] for p in escalate]),
+                         self.recognition_threshold)
+
+    def identities(self, results: FrameResults) -> np.ndarray:
+        """identity_id of every recognized face in results (unknown faces excluded)."""
+        return self.identity_ids[results.label_ids[results.known_mask()]]
+
+    def _embed(self, face_crop: np.ndarray, model_name: Optional[str] = None,
+               stage: str = 'embed') -> Optional[np.ndarray]:
+        try:
+            with REGISTRY.timer(stage):
+                representations = self._deepface.represent(
+                    img_path=face_crop,
+                    model_name=model_name or self.embedding_model_name,
+                    enforce_detection=False 
+                )
+        except Exception as e:
+            return None # Keep label as "Unknown"
+
+        if not representations:
+            return None
+        return np.asarray(representations[0]['embedding'], dtype='float32')
+
+
+def draw_results(frame, recognition_results: FrameResults):
+    for i in range(len(recognition_results)):
+        x, y, w, h = recognition_results.boxes[i]
+        label = recognition_results.label(i)
+        distance = recognition_results.distances[i]
+        fast_distance = recognition_results.fast_distances[i]
+
+        color = (0, 255, 0) if recognition_results.label_ids[i] >= 0 else (0, 0, 255) # Green for known, Red for unknown
         
         # Draw bounding box
         cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
         
         # Draw label text
-        text = f"{label} ({distance:.2f})"
+        if np.isfinite(distance) or not np.isfinite(fast_distance):
+            text = f"{label} ({distance:.2f})"
+        else:
+            # Decided by the cascade's fast model alone
+            text = f"{label} (fast {fast_distance:.2f})"
         cv2.putText(frame, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
         
     return frame
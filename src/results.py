@@ -0,0 +1,135 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+UNKNOWN_ID = -1
+UNKNOWN_LABEL = "Unknown"
+
+# Why a face was not embedded (FrameResults.skipped); 0 means it was
+SKIP_REASONS = ('', 'low_confidence', 'too_small', 'pose', 'blurry')
+SKIP_NONE, SKIP_LOW_CONFIDENCE, SKIP_TOO_SMALL, SKIP_POSE, SKIP_BLURRY = range(len(SKIP_REASONS))
+
+# Row layout used for batch writes to storage / Parquet
+RESULT_DTYPE = np.dtype([
+    ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+    ('label_id', np.int32),
+    ('distance', np.float32),
+    ('score', np.float32),
+    ('skipped', np.uint8),
+    ('fast_distance', np.float32),
+])
+
+
+class FaceResult:
+    """View of a single face inside a FrameResults. The label string is only
+    looked up when `.label` is accessed."""
+
+    __slots__ = ('box', 'label_id', 'distance', 'score', 'skipped', 'fast_distance', '_labels')
+
+    def __init__(self, box, label_id: int, distance: float, score: float, labels: Sequence[str],
+                 skipped: int = SKIP_NONE, fast_distance: float = float('inf')):
+        self.box = box  # (x, y, w, h)
+        self.label_id = label_id
+        self.distance = distance
+        self.score = score
+        self.skipped = skipped
+        self.fast_distance = fast_distance
+        self._labels = labels
+
+    @property
+    def label(self) -> str:
+        return self._labels[self.label_id] if self.label_id >= 0 else UNKNOWN_LABEL
+
+    @property
+    def is_known(self) -> bool:
+        return self.label_id >= 0
+
+    def to_dict(self) -> dict:
+        return {
+            'box': [int(v) for v in self.box],
+            'label': self.label,
+            'distance': float(self.distance) if np.isfinite(self.distance) else None,
+            'score': float(self.score),
+            'skipped': SKIP_REASONS[self.skipped] or None,
+            'fast_distance': float(self.fast_distance) if np.isfinite(self.fast_distance) else None,
+        }
+
+
+class FrameResults:
+    """Recognition output for one frame, stored column-wise in NumPy arrays.
+
+    boxes:     (N, 4) int32, (x, y, w, h)
+    label_ids: (N,)   int32, index into `labels` or UNKNOWN_ID
+    distances: (N,)   float32, nearest gallery distance (inf if no embedding)
+    scores:    (N,)   float32, detector confidence
+    skipped:   (N,)   uint8, SKIP_* reason the face wasn't embedded (SKIP_NONE if it was)
+    fast_distances: (N,) float32, cascade fast-model cosine distance (inf if the fast
+               model didn't run); `distances` only ever holds main-model distances
+    """
+
+    __slots__ = ('boxes', 'label_ids', 'distances', 'scores', 'skipped', 'fast_distances', '_labels')
+
+    def __init__(self, boxes: np.ndarray, label_ids: np.ndarray, distances: np.ndarray,
+                 scores: np.ndarray, labels: Sequence[str], skipped: Optional[np.ndarray] = None,
+                 fast_distances: Optional[np.ndarray] = None):
+        self.boxes = boxes
+        self.label_ids = label_ids
+        self.distances = distances
+        self.scores = scores
+        self.skipped = skipped if skipped is not None else np.zeros(len(label_ids), dtype=np.uint8)
+        self.fast_distances = (fast_distances if fast_distances is not None
+                               else np.full(len(label_ids), np.inf, dtype=np.float32))
+        self._labels = labels
+
+    @classmethod
+    def allocate(cls, n: int, labels: Sequence[str]) -> "FrameResults":
+        """Arrays for n faces, initialised to Unknown / inf distance."""
+        return cls(
+            np.zeros((n, 4), dtype=np.int32),
+            np.full(n, UNKNOWN_ID, dtype=np.int32),
+            np.full(n, np.inf, dtype=np.float32),
+            np.zeros(n, dtype=np.float32),
+            labels,
+            np.zeros(n, dtype=np.uint8),
+            np.full(n, np.inf, dtype=np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.label_ids)
+
+    def __getitem__(self, i: int) -> FaceResult:
+        return FaceResult(self.boxes[i], int(self.label_ids[i]), float(self.distances[i]),
+                          float(self.scores[i]), self._labels, int(self.skipped[i]),
+                          float(self.fast_distances[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def label(self, i: int) -> str:
+        label_id = self.label_ids[i]
+        return self._labels[label_id] if label_id >= 0 else UNKNOWN_LABEL
+
+    @property
+    def labels(self) -> List[str]:
+        return [self.label(i) for i in range(len(self))]
+
+    def known_mask(self) -> np.ndarray:
+        return self.label_ids >= 0
+
+    def to_dicts(self) -> List[dict]:
+        """JSON-friendly list for API responses."""
+        return [face.to_dict() for face in self]
+
+    def to_structured(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Pack into a RESULT_DTYPE structured array (one row per face)."""
+        if out is None:
+            out = np.empty(len(self), dtype=RESULT_DTYPE)
+        out['x'], out['y'], out['w'], out['h'] = self.boxes.T
+        out['label_id'] = self.label_ids
+        out['distance'] = self.distances
+        out['score'] = self.scores
+        out['skipped'] = self.skipped
+        out['fast_distance'] = self.fast_distances
+        return out
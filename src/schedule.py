@@ -0,0 +1,172 @@
+import time
+from datetime import datetime, date, time as dtime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# How much work a camera gets, least to most
+MODE_OFF = 'off'          # capture released, nothing decoded
+MODE_DETECT = 'detect'    # detector only (occupancy), at LOW_RATE_FPS
+MODE_LOW = 'low'          # full recognition + attendance, at LOW_RATE_FPS
+MODE_FULL = 'full'        # every frame recognized; attendance cooldown ends with the window
+MODES = (MODE_OFF, MODE_DETECT, MODE_LOW, MODE_FULL)
+
+ALL_CAMERAS = '*'
+_DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def parse_days(days) -> frozenset:
+    """Weekdays as 0 (Monday) .. 6; accepts names ("mon"), numbers, or None/"*" for every day."""
+    if days is None or days == ALL_CAMERAS:
+        return frozenset(range(7))
+    if isinstance(days, (str, int)):
+        days = [days]
+    parsed = set()
+    for d in days:
+        if isinstance(d, int):
+            parsed.add(d % 7)
+        else:
+            parsed.add(_DAYS.index(str(d).strip().lower()[:3]))
+    return frozenset(parsed)
+
+
+def parse_time(value) -> dtime:
+    """"HH:MM" -> time. YAML reads an unquoted 09:00 as 540 (minutes), which is accepted too."""
+    if isinstance(value, dtime):
+        return value
+    if isinstance(value, int):
+        return dtime(value // 60 % 24, value % 60)
+    hours, minutes = str(value).strip().split(':')[:2]
+    return dtime(int(hours) % 24, int(minutes))
+
+
+class Window:
+    """A weekly time window in which `camera` runs in `mode`. END at or before
+    START means the window runs past midnight (e.g. 20:00-07:00), and `days`
+    are the days it starts on."""
+
+    __slots__ = ('camera', 'days', 'start', 'end', 'mode')
+
+    def __init__(self, camera: str, days, start, end, mode: str = MODE_FULL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown schedule mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.camera = str(camera)
+        self.days = parse_days(days)
+        self.start = parse_time(start)
+        self.end = parse_time(end)
+        self.mode = mode
+
+    def occurrences(self, day: date):
+        """(start, end) datetimes of the window if it starts on `day`."""
+        if day.weekday() not in self.days:
+            return None
+        start = datetime.combine(day, self.start)
+        end = datetime.combine(day, self.end)
+        if end <= start:
+            end += timedelta(days=1)
+        return start, end
+
+
+class CameraSchedule:
+    """Weekly per-camera schedule deciding how much work each camera gets.
+
+    Windows for a camera name, plus the ALL_CAMERAS ("*") windows, are
+    checked; where several cover the same moment the most active mode wins.
+    Outside every window a camera runs in `default_mode`. With a `loader`
+    the windows are re-read every `reload_seconds`, so timetable edits in
+    the database apply without a restart.
+    """
+
+    def __init__(self, windows: List[Window], default_mode: str = MODE_LOW, low_rate_fps: float = 1.0,
+                 loader: Optional[Callable[[], List[Window]]] = None, reload_seconds: float = 300):
+        if default_mode not in MODES:
+            raise ValueError(f"Unknown schedule mode {default_mode!r}")
+        self.default_mode = default_mode
+        self.low_rate_fps = max(0.01, float(low_rate_fps))
+        self._loader = loader
+        self._reload_seconds = reload_seconds
+        self._loaded_at = time.monotonic()
+        self._windows = self._group(windows)
+
+    @staticmethod
+    def _group(windows) -> Dict[str, List[Window]]:
+        grouped: Dict[str, List[Window]] = {}
+        for w in windows:
+            grouped.setdefault(w.camera, []).append(w)
+        return grouped
+
+    def _maybe_reload(self):
+        if self._loader is None or time.monotonic() - self._loaded_at < self._reload_seconds:
+            return
+        self._loaded_at = time.monotonic()
+        try:
+            # Swapping the dict is atomic, so camera threads never see a half-built schedule
+            self._windows = self._group(self._loader())
+        except Exception as e:
+            print(f"Could not reload camera schedule, keeping the current one: {e}")
+
+    def mode_at(self, camera: str, now: Optional[datetime] = None) -> Tuple[str, datetime]:
+        """(mode, until): the camera's mode at `now` and the next moment any of
+        its windows starts or ends, when the mode has to be re-evaluated."""
+        self._maybe_reload()
+        now = now or datetime.now()
+        windows = self._windows.get(camera, []) + self._windows.get(ALL_CAMERAS, [])
+        active, until = [], now + timedelta(days=1)
+        # Yesterday's windows may run past midnight; a week ahead finds the next change
+        for offset in range(-1, 8):
+            day = now.date() + timedelta(days=offset)
+            for w in windows:
+                span = w.occurrences(day)
+                if span is None:
+                    continue
+                start, end = span
+                if start <= now < end:
+                    active.append(w.mode)
+                for boundary in span:
+                    if now < boundary < until:
+                        until = boundary
+        mode = max(active, key=MODES.index) if active else self.default_mode
+        return mode, until
+
+
+def windows_from_config(entries) -> List[Window]:
+    return [Window(e.get('CAMERA', ALL_CAMERAS), e.get('DAYS'), e['START'], e['END'],
+                   str(e.get('MODE', MODE_FULL)).lower())
+            for e in entries or []]
+
+
+def windows_from_db(db_path) -> List[Window]:
+    try:
+        from src.database import connect, schedule_windows
+    except ImportError:
+        from database import connect, schedule_windows
+    conn = connect(db_path)
+    try:
+        return [Window(camera, weekday, start, end, mode)
+                for camera, weekday, start, end, mode in schedule_windows(conn)]
+    finally:
+        conn.close()
+
+
+def load_schedule(config) -> Optional[CameraSchedule]:
+    """CameraSchedule from the SCHEDULE section, or None when scheduling is off
+    (every camera runs at full rate around the clock)."""
+    s_cfg = config.get('SCHEDULE', {}) or {}
+    if not s_cfg.get('ENABLED', False):
+        return None
+
+    loader = None
+    if str(s_cfg.get('SOURCE', 'config')).lower() == 'database':
+        db_path = (config.get('ATTENDANCE', {}) or {}).get('DATABASE') or 'attendance_system.db'
+        loader = lambda: windows_from_db(db_path)
+        windows = loader()
+    else:
+        windows = windows_from_config(s_cfg.get('WINDOWS'))
+
+    schedule = CameraSchedule(windows,
+                              default_mode=str(s_cfg.get('DEFAULT_MODE', MODE_LOW)).lower(),
+                              low_rate_fps=float(s_cfg.get('LOW_RATE_FPS', 1.0)),
+                              loader=loader,
+                              reload_seconds=float(s_cfg.get('RELOAD_SECONDS', 300)))
+    print(f"🗓️ Camera schedule: {len(windows)} window(s) from {s_cfg.get('SOURCE', 'config')}, "
+          f"{schedule.default_mode} outside them")
+    return schedule
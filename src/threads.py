@@ -0,0 +1,167 @@
+import os
+import sys
+from typing import Dict, List, Optional
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+
+# Environment variables the native thread pools read once, when the library
+# is first imported; they must be set before numpy/cv2/torch/faiss load
+_ENV = {
+    'OMP_NUM_THREADS': 'omp',
+    'MKL_NUM_THREADS': 'omp',
+    'OPENBLAS_NUM_THREADS': 'omp',
+    'TF_NUM_INTRAOP_THREADS': 'tf_intra_op',
+    'TF_NUM_INTEROP_THREADS': 'tf_inter_op',
+}
+_NATIVE_MODULES = ('numpy', 'cv2', 'torch', 'faiss', 'tensorflow')
+
+_budget: Optional[Dict[str, int]] = None
+_configured = set()
+
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on (honours taskset/cgroup affinity)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_budget(config, workers: int, shared_process: bool = True) -> Dict[str, int]:
+    """Thread counts per library for `workers` concurrent inference workers.
+
+    shared_process=True: workers are threads of one process (camera loops).
+    OpenMP gives every calling thread its own team, so OpenMP-backed pools
+    (torch intra-op, FAISS, BLAS) get cores // workers each, while
+    TensorFlow's intra/inter-op pools are single process-wide pools shared
+    by all workers and get the whole machine / one slot per worker.
+
+    shared_process=False: workers are separate processes (batch pool), each
+    with private copies of every pool, so everything gets cores // workers.
+
+    Anything set under THREADS overrides the computed value.
+    """
+    t_cfg = config.get('THREADS', {}) or {}
+    cores = int(t_cfg.get('CPU_COUNT') or len(available_cores()))
+    workers = max(1, int(t_cfg.get('WORKERS') or workers))
+    per_worker = max(1, cores // workers)
+
+    def pick(key, default):
+        value = t_cfg.get(key)
+        return max(1, int(value)) if value else default
+
+    return {
+        'cores': cores,
+        'workers': workers,
+        'shared_process': shared_process,
+        'torch_intra_op': pick('TORCH_INTRA_OP', per_worker),
+        'torch_inter_op': pick('TORCH_INTER_OP', 1),
+        'tf_intra_op': pick('TF_INTRA_OP', cores if shared_process else per_worker),
+        'tf_inter_op': pick('TF_INTER_OP', min(workers, cores) if shared_process else 1),
+        'faiss': pick('FAISS', per_worker),
+        'opencv': pick('OPENCV', 1),
+        'omp': pick('OMP', per_worker),
+        'pin_cores': bool(t_cfg.get('PIN_CORES', False)),
+    }
+
+
+def export_thread_env(config, workers: int, shared_process: bool = True) -> Optional[Dict[str, int]]:
+    """Plan the budget and export it as OMP/MKL/OpenBLAS/TF environment
+    variables. Call from the entry point before anything imports numpy, cv2,
+    torch or faiss (child processes spawned afterwards inherit the variables).
+    Returns the budget, or None when THREADS.ENABLED is false."""
+    global _budget
+    if not (config.get('THREADS', {}) or {}).get('ENABLED', True):
+        return None
+
+    _budget = plan_budget(config, workers, shared_process)
+    changed = False
+    for var, key in _ENV.items():
+        value = str(_budget[key])
+        changed |= os.environ.get(var) != value
+        os.environ[var] = value
+    loaded = [m for m in _NATIVE_MODULES if m in sys.modules]
+    if changed and loaded:
+        print(f"⚠️ Thread budget exported after {', '.join(loaded)} was imported; "
+              "their OpenMP/BLAS pools keep their old size. Call export_thread_env() earlier.")
+    return _budget
+
+
+def apply_thread_budget(config, workers: int, shared_process: bool = True) -> Optional[Dict[str, int]]:
+    """Apply what can be set at runtime: OpenCV's pool size and the
+    thread_budget gauges. Uses the budget exported by the entry point, or
+    plans (and exports) one now. torch and TensorFlow are configured by
+    configure() from the loaders that import them, FAISS per inference
+    thread by configure_worker_thread()."""
+    if _budget is None and export_thread_env(config, workers, shared_process) is None:
+        return None
+
+    import cv2
+    cv2.setNumThreads(_budget['opencv'])
+
+    for key, value in _budget.items():
+        if key not in ('cores', 'workers', 'shared_process', 'pin_cores'):
+            REGISTRY.set('thread_budget', value, library=key)
+    print(f"🧵 Thread budget: {_budget['cores']} cores / {_budget['workers']} workers -> "
+          f"torch {_budget['torch_intra_op']}+{_budget['torch_inter_op']}, "
+          f"TF {_budget['tf_intra_op']}+{_budget['tf_inter_op']}, FAISS {_budget['faiss']}, "
+          f"OpenCV {_budget['opencv']}, OpenMP {_budget['omp']}"
+          + (", worker threads pinned" if _budget['pin_cores'] else ""))
+    return _budget
+
+
+def configure(library: str):
+    """Apply the budget's process-wide settings right after a library is
+    imported ('torch' or 'tensorflow'). No-op when no budget was applied."""
+    if _budget is None or library in _configured:
+        return
+    _configured.add(library)
+    try:
+        if library == 'torch':
+            import torch
+            torch.set_num_threads(_budget['torch_intra_op'])
+            torch.set_num_interop_threads(_budget['torch_inter_op'])
+        elif library == 'tensorflow':
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(_budget['tf_intra_op'])
+            tf.config.threading.set_inter_op_parallelism_threads(_budget['tf_inter_op'])
+    except (RuntimeError, ValueError) as e:
+        # The library's pools were already running; the environment variables still apply
+        print(f"Thread budget for {library} not applied: {e}")
+
+
+def worker_cores(index: int) -> Optional[List[int]]:
+    """Cores worker `index` should be pinned to, or None if pinning is off."""
+    if _budget is None or not _budget['pin_cores']:
+        return None
+    cores = available_cores()[:_budget['cores']]
+    per_worker = max(1, len(cores) // _budget['workers'])
+    start = (index % _budget['workers']) * per_worker
+    return cores[start:start + per_worker] or cores
+
+
+def configure_worker_thread(index: Optional[int] = None):
+    """Per-thread setup, called at the start of every inference thread.
+
+    omp_set_num_threads only affects the calling thread, so FAISS's team
+    size is set here rather than once at load time. With THREADS.PIN_CORES
+    and an `index`, the calling thread is pinned to that worker's cores
+    (Linux only); OpenMP teams it starts afterwards (FAISS, torch) inherit
+    the pinning, TensorFlow's shared pools and other libraries' threads
+    created elsewhere do not.
+    """
+    if _budget is None:
+        return
+    if 'faiss' in sys.modules:
+        sys.modules['faiss'].omp_set_num_threads(_budget['faiss'])
+
+    cores = worker_cores(index) if index is not None else None
+    if cores is None:
+        return
+    if not hasattr(os, 'sched_setaffinity'):
+        print("Core pinning is only supported on Linux; ignoring THREADS.PIN_CORES.")
+        return
+    os.sched_setaffinity(0, cores)  # 0 = the calling thread on Linux
@@ -1,13 +1,24 @@
 import yaml
 import os
-import faiss
+import numbers
 import pickle
-import torch
 import time
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict
 import csv
+import queue
+import atexit
+import threading
 from datetime import datetime, timedelta
 
+try:
+    from src.database import (DB_PATH, AttendanceStore, attendance_row, connect, create_schema,
+                              resolve_identities, identity_roll_numbers)
+    from src.events import BUS, origin
+except ImportError:
+    from database import (DB_PATH, AttendanceStore, attendance_row, connect, create_schema,
+                          resolve_identities, identity_roll_numbers)
+    from events import BUS, origin
+
 
 def load_config(config_path='config.yaml'):
     
@@ -19,8 +30,38 @@ def load_config(config_path='config.yaml'):
         print(f"Error loading config file: {e}")
         return None
 
-def save_faiss_data(faiss_index, labels, config):
-    
+def _identities_path(config):
+    return os.path.join(config['PATHS']['EMBEDDINGS_DIR'],
+                        config['PATHS'].get('IDENTITIES_FILE', 'identity_ids.npy'))
+
+
+# faiss, numpy and torch are imported inside the functions that need them so
+# that importing this module (load_config, AttendanceManager) stays cheap.
+def _fast_index_path(config):
+    return os.path.join(config['PATHS']['EMBEDDINGS_DIR'],
+                        config['PATHS'].get('FAST_FAISS_INDEX_FILE', 'faiss_index_fast.bin'))
+
+
+def _fast_meta_path(config):
+    return _fast_index_path(config) + '.meta.pkl'
+
+
+def gallery_fingerprint(faiss_index, labels) -> str:
+    """Content hash of the main gallery (vectors and labels). The fast index
+    records the fingerprint it was built with, so a gallery rebuilt without
+    it (even with the same number of rows) is detected."""
+    import hashlib
+    import faiss
+
+    digest = hashlib.sha256(faiss.serialize_index(faiss_index).tobytes())
+    digest.update(pickle.dumps(list(labels)))
+    return digest.hexdigest()
+
+
+def save_faiss_data(faiss_index, labels, config, identity_ids=None, fast_index=None, fast_model=None):
+    import faiss
+    import numpy as np
+
     try:
         os.makedirs(config['PATHS']['EMBEDDINGS_DIR'], exist_ok=True)
         index_path = os.path.join(config['PATHS']['EMBEDDINGS_DIR'], config['PATHS']['FAISS_INDEX_FILE'])
@@ -35,12 +76,44 @@ def save_faiss_data(faiss_index, labels, config):
             pickle.dump(labels, f)
         print(f"Labels saved to: {labels_path}")
 
+        # 3. Save identity ids (one per gallery row, aligned with labels)
+        if identity_ids is not None:
+            np.save(_identities_path(config), np.asarray(identity_ids, dtype=np.int32))
+            print(f"Identity ids saved to: {_identities_path(config)}")
+
+        # 4. Save the cascade's fast-model index (same rows as faiss_index)
+        if fast_index is not None:
+            faiss.write_index(fast_index, _fast_index_path(config))
+            with open(_fast_meta_path(config), 'wb') as f:
+                pickle.dump({'fingerprint': gallery_fingerprint(faiss_index, labels), 'model': fast_model}, f)
+            print(f"Fast FAISS index saved to: {_fast_index_path(config)}")
+
     except Exception as e:
         print(f"Error saving FAISS data: {e}")
 
 
+def l2_normalize(vectors):
+    """Rows scaled to unit length (float32), so inner product = cosine similarity."""
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _read_index(index_path, config):
+    import faiss
+
+    if config.get('RECOGNITION', {}).get('MMAP_INDEX', False):
+        # Memory-mapped and read-only, so several server workers share one copy in the page cache
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            print(f"Memory-mapping not supported for this index ({e}); loading normally.")
+    return faiss.read_index(index_path)
+
+
 def load_faiss_data(config):
-    
     index_path = os.path.join(config['PATHS']['EMBEDDINGS_DIR'], config['PATHS']['FAISS_INDEX_FILE'])
     labels_path = os.path.join(config['PATHS']['EMBEDDINGS_DIR'], config['PATHS']['LABELS_FILE'])
 
@@ -50,7 +123,7 @@ def load_faiss_data(config):
 
     try:
         # 1. Load FAISS Index
-        index = faiss.read_index(index_path)
+        index = _read_index(index_path, config)
         print(f"FAISS index loaded from: {index_path}")
 
         # 2. Load Labels
@@ -64,9 +137,72 @@ def load_faiss_data(config):
         print(f"Error loading FAISS data: {e}")
         return None, None
 
+
+def load_fast_index(config, faiss_index, labels, model=None):
+    """The cascade's fast-model index, or None if missing or built for a
+    different main gallery (or fast model)."""
+    path = _fast_index_path(config)
+    if not os.path.exists(path):
+        print(f"Fast FAISS index not found at {path}. Re-run precompute_embeddings.py with the cascade enabled.")
+        return None
+    import faiss
+
+    index = _read_index(path, config)
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        # Galleries from before the cascade used cosine similarity held raw L2 vectors
+        print(f"Fast FAISS index at {path} is not a cosine (inner-product) index; re-run precompute_embeddings.py.")
+        return None
+    meta = {}
+    if os.path.exists(_fast_meta_path(config)):
+        with open(_fast_meta_path(config), 'rb') as f:
+            meta = pickle.load(f)
+    # Row counts alone miss a roster edit that swaps one student for another
+    if meta.get('fingerprint') != gallery_fingerprint(faiss_index, labels):
+        print(f"Fast FAISS index at {path} was not built with the current gallery; re-run precompute_embeddings.py.")
+        return None
+    if model is not None and meta.get('model') not in (None, model):
+        print(f"Fast FAISS index was built with {meta['model']}, not {model}; re-run precompute_embeddings.py.")
+        return None
+    print(f"Fast FAISS index loaded from: {path}")
+    return index
+
+
+def load_identities(config, labels):
+    """(identity_ids, roll_numbers) for the gallery.
+
+    identity_ids is an int32 array aligned with `labels` (-1 for folders not
+    linked to a student); roll_numbers maps identity_id -> roll_no. Galleries
+    built before identity ids existed are resolved from the database here.
+    """
+    import numpy as np
+
+    identity_ids = None
+    ids_path = _identities_path(config)
+    if os.path.exists(ids_path):
+        identity_ids = np.load(ids_path)
+        if len(identity_ids) != len(labels):
+            print(f"Identity ids in {ids_path} don't match the labels; re-resolving from the database.")
+            identity_ids = None
+
+    conn = connect(config.get('ATTENDANCE', {}).get('DATABASE') or DB_PATH)
+    try:
+        create_schema(conn)
+        if identity_ids is None:
+            identity_ids = np.asarray(resolve_identities(conn, labels), dtype=np.int32)
+        roll_numbers = identity_roll_numbers(conn)
+    finally:
+        conn.close()
+
+    unlinked = [label for label, i in zip(labels, identity_ids) if i < 0]
+    if unlinked:
+        print(f"Warning: no student linked to dataset folders {unlinked}; their attendance won't be recorded.")
+    return identity_ids, roll_numbers
+
+
 # Device Management
 def get_device(config):
-    
+    import torch
+
     requested_device = (
         str(config.get('DEVICE', None) or config.get('HARDWARE_SETTINGS', {}).get('DEVICE', 'cuda'))
         .lower()
@@ -83,80 +219,493 @@ def get_device(config):
 
 
 
+class _TimingWheel:
+    """Keys with expiry times, bucketed by expiry tick so expired keys are
+    dropped a bucket at a time instead of by scanning everything."""
+
+    __slots__ = ('resolution', 'expiry', 'slots', 'tick')
+
+    def __init__(self, resolution: float, num_slots: int):
+        self.resolution = resolution
+        self.expiry: Dict = {}
+        self.slots = [set() for _ in range(num_slots)]
+        self.tick = None
+
+    def _slot(self, expires_at: float) -> set:
+        # The tick after the expiry tick, so the key is certainly expired when its slot is swept
+        return self.slots[(int(expires_at // self.resolution) + 1) % len(self.slots)]
+
+    def advance(self, now: float):
+        tick = int(now // self.resolution)
+        if self.tick is None:
+            self.tick = tick
+            return
+        # Sweep each slot passed since the last call (at most one full turn)
+        for t in range(self.tick + 1, self.tick + 1 + min(tick - self.tick, len(self.slots))):
+            slot = self.slots[t % len(self.slots)]
+            if slot:
+                expired = [k for k in slot if self.expiry[k] <= now]
+                for k in expired:
+                    del self.expiry[k]
+                slot.difference_update(expired)
+        self.tick = max(self.tick, tick)
+
+    def is_live(self, key, now: float) -> bool:
+        expires_at = self.expiry.get(key)
+        return expires_at is not None and expires_at > now
+
+    def set(self, key, expires_at: float):
+        old = self.expiry.get(key)
+        if old is not None:
+            self._slot(old).discard(key)
+        self.expiry[key] = expires_at
+        self._slot(expires_at).add(key)
+
+    def evict_soonest(self, count: int):
+        """Drop the `count` keys closest to expiry (used when the wheel is full)."""
+        for t in range(self.tick + 1, self.tick + 1 + len(self.slots)):
+            if count <= 0:
+                return
+            slot = self.slots[t % len(self.slots)]
+            if slot:
+                victims = sorted(slot, key=self.expiry.__getitem__)[:count]
+                for k in victims:
+                    del self.expiry[k]
+                slot.difference_update(victims)
+                count -= len(victims)
+
+
+class TimedKeyStore:
+    """Thread-safe set of keys that expire after a TTL, with bounded memory.
+
+    Keys are grouped (e.g. by person); each group hashes to one of `stripes`
+    timing wheels with its own lock, so camera threads rarely contend and all
+    keys of a group can be checked and set atomically. Each stripe holds at
+    most `max_entries // stripes` keys; beyond that the keys closest to
+    expiry are evicted early.
+    """
+
+    def __init__(self, max_ttl: float, stripes: int = 16, max_entries: int = 100_000,
+                 num_slots: int = 256):
+        resolution = max(max_ttl / (num_slots - 1), 0.001)
+        self._wheels = [_TimingWheel(resolution, num_slots) for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._max_per_stripe = max(1, max_entries // stripes)
+
+    def _stripe(self, group) -> int:
+        return hash(group) % len(self._wheels)
+
+    def _make_room(self, wheel: _TimingWheel, entries):
+        # Evict only as many keys as the new ones need, before any of them is set
+        new = sum(1 for key, _ in entries if key not in wheel.expiry)
+        over = len(wheel.expiry) + new - self._max_per_stripe
+        if over > 0:
+            wheel.evict_soonest(over)
+
+    def check_and_set(self, group, entries, now: Optional[float] = None) -> bool:
+        """entries: [(key, ttl_seconds)]. If none of the keys is live, set all
+        of them to expire ttl from now and return True; otherwise change nothing
+        and return False."""
+        now = time.monotonic() if now is None else now
+        i = self._stripe(group)
+        wheel = self._wheels[i]
+        with self._locks[i]:
+            wheel.advance(now)
+            if any(wheel.is_live(key, now) for key, _ in entries):
+                return False
+            self._make_room(wheel, entries)
+            for key, ttl in entries:
+                wheel.set(key, now + ttl)
+            return True
+
+    def is_live(self, group, key, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        i = self._stripe(group)
+        with self._locks[i]:
+            self._wheels[i].advance(now)
+            return self._wheels[i].is_live(key, now)
+
+    def set(self, group, entries, now: Optional[float] = None):
+        """Set keys unconditionally (entries as in check_and_set)."""
+        now = time.monotonic() if now is None else now
+        i = self._stripe(group)
+        wheel = self._wheels[i]
+        with self._locks[i]:
+            wheel.advance(now)
+            self._make_room(wheel, entries)
+            for key, ttl in entries:
+                wheel.set(key, now + ttl)
+
+    def __len__(self) -> int:
+        return sum(len(w.expiry) for w in self._wheels)
+
+
+class FallbackKeyStore:
+    """A shared key store (src/cluster.py) backed by a local TimedKeyStore.
+
+    Every key set on the shared store is mirrored locally. While the shared
+    backend is failing (Redis unreachable, SQLite locked), calls are answered
+    from the local copy instead of raising into the camera loop, so a camera
+    keeps deduplicating on its own until the backend is back.
+    """
+
+    def __init__(self, shared, max_ttl: float, max_entries: int = 100_000, name: str = 'shared state'):
+        self.shared = shared
+        self.local = TimedKeyStore(max_ttl, max_entries=max_entries)
+        self.name = name
+        self._failing = False
+
+    def _failed(self, e):
+        # Logged once per outage, not once per sighting
+        if not self._failing:
+            self._failing = True
+            print(f"⚠️ {self.name} unavailable, deduplicating locally: {e}")
+
+    def _recovered(self):
+        if self._failing:
+            self._failing = False
+            print(f"✓ {self.name} reachable again")
+
+    def check_and_set(self, group, entries, now: Optional[float] = None) -> bool:
+        try:
+            ok = self.shared.check_and_set(group, entries)
+        except Exception as e:
+            self._failed(e)
+            return self.local.check_and_set(group, entries, now)
+        self._recovered()
+        if ok:
+            self.local.set(group, entries, now)
+        return ok
+
+    def is_live(self, group, key, now: Optional[float] = None) -> bool:
+        try:
+            live = self.shared.is_live(group, key)
+        except Exception as e:
+            self._failed(e)
+            return self.local.is_live(group, key, now)
+        self._recovered()
+        return live
+
+    def set(self, group, entries, now: Optional[float] = None):
+        self.local.set(group, entries, now)
+        try:
+            self.shared.set(group, entries)
+        except Exception as e:
+            self._failed(e)
+            return
+        self._recovered()
+
+
+def _is_unknown(label) -> bool:
+    return label is None or label == 'Unknown' or label == '' or (isinstance(label, numbers.Integral) and label < 0)
+
+
 class DedupeManager:
-    
+    """Suppresses repeat sightings of the same person: per camera for
+    `same_camera_cooldown` seconds and across cameras for `cross_camera_cooldown`.
+
+    `label` is anything hashable identifying the person (roll_no or name).
+    `store` replaces the in-process TimedKeyStore with a shared backend
+    (src/cluster.py) so several nodes dedupe against each other; labels must
+    then mean the same person on every node (roll_no, not identity_id). If
+    the backend fails, sightings are deduplicated locally until it recovers.
+    """
+
     def __init__(self, same_camera_cooldown: int = 15, cross_camera_cooldown: int = 30,
-                 max_accepted_distance: Optional[float] = None):
+                 max_accepted_distance: Optional[float] = None, max_entries: int = 100_000,
+                 store=None):
         self.same_camera_cooldown = same_camera_cooldown
         self.cross_camera_cooldown = cross_camera_cooldown
         self.max_accepted_distance = max_accepted_distance
+        max_ttl = max(same_camera_cooldown, cross_camera_cooldown, 1)
+        if store is not None:
+            self._seen = FallbackKeyStore(store, max_ttl, max_entries=max_entries, name='Shared dedupe state')
+        else:
+            self._seen = TimedKeyStore(max_ttl, max_entries=max_entries)
 
-        
-        self._seen_per_cam: Dict[Tuple[str, str], float] = {}
-        self._seen_global: Dict[str, float] = {}
+    def _entries(self, label, camera_name):
+        # (label, None) is the cross-camera key
+        return [((label, camera_name), self.same_camera_cooldown),
+                ((label, None), self.cross_camera_cooldown)]
 
-    def should_count(self, label: str, camera_name: str, distance: Optional[float] = None) -> bool:
-        
-        now = time.time()
-        if not label or label == 'Unknown':
+    def check_and_mark(self, label, camera_name: str, distance: Optional[float] = None) -> bool:
+        """True (and the sighting is recorded) if it should be counted; atomic across threads."""
+        if _is_unknown(label):
             return False
-
         if self.max_accepted_distance is not None and distance is not None:
             if distance > self.max_accepted_distance:
                 return False
+        return self._seen.check_and_set(label, self._entries(label, camera_name))
 
-        last_cam_key = (label, camera_name)
-        last_cam_seen = self._seen_per_cam.get(last_cam_key, 0.0)
-        if now - last_cam_seen < self.same_camera_cooldown:
+    def should_count(self, label, camera_name: str, distance: Optional[float] = None) -> bool:
+        if _is_unknown(label):
             return False
+        if self.max_accepted_distance is not None and distance is not None:
+            if distance > self.max_accepted_distance:
+                return False
+        return not (self._seen.is_live(label, (label, camera_name)) or self._seen.is_live(label, (label, None)))
 
-        last_global_seen = self._seen_global.get(label, 0.0)
-        if now - last_global_seen < self.cross_camera_cooldown:
-            return False
+    def update_seen(self, label, camera_name: str):
+        if _is_unknown(label):
+            return
+        self._seen.set(label, self._entries(label, camera_name))
 
-        return True
 
-    def update_seen(self, label: str, camera_name: str):
-        now = time.time()
-        if not label or label == 'Unknown':
-            return
-        self._seen_per_cam[(label, camera_name)] = now
-        self._seen_global[label] = now
+_STOP = object()
+
+
+class AsyncBatchWriter:
+    """Collects rows from any thread and hands them to `write_batch` from a
+    single background thread, in batches.
+
+    A batch is flushed when it reaches `batch_size` rows or when the oldest
+    queued row is `flush_interval` seconds old, whichever comes first.
+    `close()` drains everything still queued before returning; put() after
+    close raises RuntimeError, flush() after close just waits for the drain.
+    """
+
+    def __init__(self, write_batch, batch_size: int = 64, flush_interval: float = 1.0,
+                 name: str = 'attendance-writer'):
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        # Makes "check closed + enqueue" atomic with close(), so nothing is
+        # queued behind _STOP where the writer thread would never see it
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, row):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+            self._queue.put(row)
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        done = threading.Event()
+        with self._lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put(done)
+        if queued:
+            done.wait()
+        else:
+            # Queued behind _STOP the event would never be set; wait for close()'s drain instead
+            self._thread.join()
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        # Every caller returns only once the queue is drained
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        stop = False
+        while not stop:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stop = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (stop or waiters or due or len(batch) >= self.batch_size):
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    print(f"Error writing attendance batch ({len(batch)} rows): {e}")
+                batch = []
+                deadline = None
+            for w in waiters:
+                w.set()
+            waiters = []
+
+
+
+class CsvBatchSink:
+    """Appends batches of rows to a CSV file, keeping the handle open.
+
+    fsync: 'never' leaves durability to the OS, 'batch' fsyncs after every
+    written batch.
+    """
+
+    def __init__(self, path: str, header, fsync: str = 'batch'):
+        self.path = path
+        self.fsync = fsync
+        log_dir = os.path.dirname(path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
+        new_file = not os.path.exists(path)
+        self._file = open(path, mode='a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(header)
+            self._file.flush()
+
+    def __call__(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        if self.fsync == 'batch':
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
 
 
 class AttendanceManager:
     
-    def __init__(self, cooldown_hours: int = 4, log_file: Optional[str] = None):
+    def __init__(self, cooldown_hours: int = 4, log_file: Optional[str] = None,
+                 db_path: Optional[str] = None, roll_numbers: Optional[Dict[int, str]] = None,
+                 batch_size: int = 64, flush_interval: float = 1.0, fsync: str = 'batch',
+                 shared_state=None):
         self.cooldown = timedelta(hours=cooldown_hours)
         self.log_file = log_file
-        self._last_marked: Dict[str, datetime] = {}
-
-        
-        if self.log_file:
-            log_dir = os.path.dirname(self.log_file)
-            if log_dir and not os.path.exists(log_dir):
-                os.makedirs(log_dir, exist_ok=True)
-            # Create header file
-            if not os.path.exists(self.log_file):
-                with open(self.log_file, mode='w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["timestamp", "name", "camera"])  # header
-
-    def should_mark(self, name: str) -> bool:
-        if not name or name == 'Unknown':
+        self.roll_numbers = roll_numbers or {}
+        # roll_no -> marked, expiring after the cooldown (thread-safe, bounded)
+        self._cooldown_seconds = self.cooldown.total_seconds()
+        if shared_state is not None:
+            self._last_marked = FallbackKeyStore(shared_state, max(self._cooldown_seconds, 1),
+                                                 name='Shared cooldown state')
+        else:
+            self._last_marked = TimedKeyStore(max(self._cooldown_seconds, 1))
+        # Cluster mode: cooldowns are shared and events also go to the other nodes
+        self._shared = shared_state
+        self._camera_ids: Dict[str, int] = {}
+        self._camera_sources: Dict[str, str] = {}
+        self._store = AttendanceStore(db_path) if db_path else None
+        self._csv = CsvBatchSink(log_file, ["timestamp", "name", "camera"], fsync=fsync) if log_file else None
+        self._writer = None
+        # Guards _writer: close() detaches it under the lock, so a camera thread
+        # still marking during shutdown never puts into a closed writer
+        self._writer_lock = threading.Lock()
+        self._closed = False
+
+        # Rows are written by a background thread so camera loops never wait on disk
+        if self._store or self._csv:
+            self._writer = AsyncBatchWriter(self._write_batch, batch_size=batch_size, flush_interval=flush_interval)
+
+    def register_camera(self, camera_name: str, source) -> Optional[int]:
+        """Map a camera name to its database camera_id (created on first use)."""
+        self._camera_sources[camera_name] = str(source)
+        if not self._store:
+            return None
+        camera_id = self._store.get_or_create_camera(str(source))
+        self._camera_ids[camera_name] = camera_id
+        return camera_id
+
+    def roll_no(self, identity_id: int) -> Optional[str]:
+        return self.roll_numbers.get(identity_id)
+
+    def should_mark(self, identity_id: int) -> bool:
+        roll_no = self.roll_numbers.get(identity_id)
+        if roll_no is None:
+            return False
+        return not self._last_marked.is_live(roll_no, self._key(roll_no))
+
+    @staticmethod
+    def _key(roll_no: str):
+        # Keyed by roll_no, not identity_id: identity ids are assigned per database,
+        # so only roll_no names the same person on every cluster node
+        return ('attendance', roll_no)
+
+    def try_mark(self, identity_id: int, camera_name: str, name: Optional[str] = None,
+                 cooldown_seconds: Optional[float] = None) -> bool:
+        """should_mark + mark as one atomic step, so two cameras seeing the same
+        person at once record them only once. Returns True if marked.
+
+        `cooldown_seconds` shortens the cooldown for this mark (never beyond
+        COOLDOWN_HOURS), e.g. to the next timetable mode change."""
+        roll_no = self.roll_numbers.get(identity_id)
+        if roll_no is None:
             return False
-        now = datetime.now()
-        last = self._last_marked.get(name)
-        if last and (now - last) < self.cooldown:
+        ttl = self._cooldown_seconds
+        if cooldown_seconds is not None:
+            ttl = max(1.0, min(ttl, cooldown_seconds))
+        if not self._last_marked.check_and_set(roll_no, [(self._key(roll_no), ttl)]):
             return False
+        self._record(identity_id, camera_name, name)
         return True
 
-    def mark(self, name: str, camera_name: str):
-        if not name or name == 'Unknown':
+    def mark(self, identity_id: int, camera_name: str, name: Optional[str] = None):
+        """Record a sighting of a gallery identity; `name` is only used for the CSV/event."""
+        roll_no = self.roll_numbers.get(identity_id)
+        if roll_no is None:
+            return
+        self._last_marked.set(roll_no, [(self._key(roll_no), self._cooldown_seconds)])
+        self._record(identity_id, camera_name, name)
+
+    def _record(self, identity_id: int, camera_name: str, name: Optional[str]):
+        roll_no = self.roll_numbers[identity_id]
+        row = (datetime.now(), roll_no, name or roll_no, camera_name)
+        with self._writer_lock:
+            if self._writer:
+                # Announced by _write_batch once the row is committed, so a client
+                # refreshing on the event reads a count that includes it
+                self._writer.put(row)
+                return
+            closed = self._closed
+        if closed:
+            print(f"Attendance for {roll_no} ({camera_name}) not written: shutting down")
             return
-        now = datetime.now()
-        self._last_marked[name] = now
-        if self.log_file:
-            with open(self.log_file, mode='a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([now.isoformat(timespec='seconds'), name, camera_name])
\ No newline at end of file
+        self._publish([row])
+
+    def _publish(self, rows):
+        for ts, roll_no, name, camera_name in rows:
+            event = dict(name=name, roll_no=roll_no, camera=camera_name,
+                         detected_time=ts.strftime("%Y-%m-%d %H:%M:%S"), source='recognizer')
+            BUS.publish('attendance', **event)
+            if self._shared is not None:
+                try:
+                    self._shared.publish_event({'type': 'attendance', 'ts': time.time(), 'origin': origin(),
+                                                'camera_source': self._camera_sources.get(camera_name), **event})
+                except Exception as e:
+                    print(f"Could not publish attendance event to the cluster: {e}")
+
+    def _write_batch(self, rows):
+        try:
+            if self._store:
+                self._store.write_batch([
+                    attendance_row(roll_no, self._camera_ids.get(camera, 0), ts)
+                    for ts, roll_no, _, camera in rows
+                ])
+            if self._csv:
+                self._csv([[ts.isoformat(timespec='seconds'), name, camera] for ts, _, name, camera in rows])
+        finally:
+            self._publish(rows)
+
+    def flush(self):
+        writer = self._writer
+        if writer:
+            writer.flush()
+
+    def close(self):
+        """Write out any queued rows and close the database and CSV export.
+        Marks made after this are logged and dropped."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            self._closed = True
+        if writer:
+            writer.close()
+            if self._store:
+                self._store.close()
+            if self._csv:
+                self._csv.close()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the modules as src.<name>, like the entry points do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import connect, create_schema  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A fresh attendance database with the full schema."""
+    conn = connect(str(tmp_path / 'attendance.db'))
+    create_schema(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,65 @@
+import pytest
+
+from src.database import connect
+from src.events import BUS
+from src.utils import AttendanceManager
+
+ROLLS = {1: 'A1', 2: 'B2'}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'attendance.db')
+
+
+@pytest.fixture
+def manager(db_path, tmp_path):
+    manager = AttendanceManager(cooldown_hours=4, log_file=str(tmp_path / 'attendance.csv'), db_path=db_path,
+                                roll_numbers=ROLLS, flush_interval=60)
+    manager.register_camera('gate', 'rtsp://gate')
+    yield manager
+    manager.close()
+
+
+def _attendance(db_path):
+    conn = connect(db_path)
+    try:
+        return conn.execute("SELECT roll_no FROM attendance ORDER BY attendance_id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_try_mark_once_per_cooldown(manager, db_path):
+    assert manager.try_mark(1, 'gate')
+    assert not manager.try_mark(1, 'gate')
+    assert not manager.should_mark(1)
+    assert manager.try_mark(2, 'gate')
+    # Identities without a roll number are never marked
+    assert not manager.try_mark(99, 'gate')
+    manager.flush()
+    assert _attendance(db_path) == [('A1',), ('B2',)]
+
+
+def test_event_is_published_after_the_row_is_written(manager, db_path):
+    sub = BUS.subscribe(types=['attendance'])
+    try:
+        manager.try_mark(1, 'gate', name='Asha')
+        # Still queued in the writer: nothing announced yet
+        assert sub.get(timeout=0) is None
+        manager.flush()
+        event = sub.get(timeout=0)
+        assert event is not None
+        assert (event['roll_no'], event['name'], event['camera']) == ('A1', 'Asha', 'gate')
+        assert _attendance(db_path) == [('A1',)]
+    finally:
+        sub.close()
+
+
+def test_marks_after_close_are_dropped(manager, db_path, tmp_path):
+    manager.try_mark(1, 'gate')
+    manager.close()
+    manager.try_mark(2, 'gate')
+    assert _attendance(db_path) == [('A1',)]
+    with open(tmp_path / 'attendance.csv', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 2  # header + A1
+
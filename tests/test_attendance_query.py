@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from src.database import (MAX_PAGE_SIZE, attendance_query, attendance_record, attendance_row,
+                          insert_attendance)
+
+
+@pytest.fixture
+def rows(conn):
+    # 3 students x 2 cameras x 3 days
+    rows = [attendance_row(roll, cam, datetime(2024, 5, day, 9, cam))
+            for day in (1, 2, 3) for roll in ('A1', 'B2', 'C3') for cam in (1, 2)]
+    insert_attendance(conn, rows)
+    return rows
+
+
+def _fetch(conn, args):
+    query, params, limit = attendance_query(args)
+    if limit is not None:
+        query, params = query + " LIMIT ?", params + [limit]
+    return [attendance_record(r) for r in conn.execute(query, params)]
+
+
+def test_pages_cover_every_row_once_in_id_order(conn, rows):
+    seen = []
+    args = {'limit': '4'}
+    while True:
+        page = _fetch(conn, args)
+        seen.extend(page)
+        if len(page) < 4:
+            break
+        args = {'limit': '4', 'after_id': str(page[-1]['attendance_id'])}
+    ids = [r['attendance_id'] for r in seen]
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids)) == len(rows)
+
+
+def test_filters_combine_with_pagination(conn, rows):
+    first = _fetch(conn, {'roll_no': 'B2', 'date_from': '2024-05-02', 'limit': '2'})
+    assert [(r['date'], r['camera_id']) for r in first] == [('2024-05-02', 1), ('2024-05-02', 2)]
+    rest = _fetch(conn, {'roll_no': 'B2', 'date_from': '2024-05-02', 'limit': '2',
+                         'after_id': str(first[-1]['attendance_id'])})
+    assert [(r['date'], r['camera_id']) for r in rest] == [('2024-05-03', 1), ('2024-05-03', 2)]
+    assert all(r['roll_no'] == 'B2' for r in first + rest)
+
+
+def test_date_range_and_camera(conn, rows):
+    result = _fetch(conn, {'date_from': '2024-05-02', 'date_to': '2024-05-02', 'camera_id': '2'})
+    assert {r['roll_no'] for r in result} == {'A1', 'B2', 'C3'}
+    assert {(r['date'], r['camera_id']) for r in result} == {('2024-05-02', 2)}
+
+
+def test_no_limit_returns_everything(conn, rows):
+    assert attendance_query({})[2] is None
+    assert len(_fetch(conn, {})) == len(rows)
+
+
+@pytest.mark.parametrize('args', [
+    {'camera_id': 'front'},
+    {'after_id': '1.5'},
+    {'limit': 'ten'},
+    {'limit': '0'},
+    {'limit': str(MAX_PAGE_SIZE + 1)},
+])
+def test_bad_arguments_raise_value_error(args):
+    with pytest.raises(ValueError):
+        attendance_query(args)
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from src.utils import AsyncBatchWriter
+
+
+class _Recorder:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.batches.append(list(batch))
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def test_flush_writes_everything_queued():
+    sink = _Recorder()
+    writer = AsyncBatchWriter(sink, batch_size=100, flush_interval=60)
+    for i in range(5):
+        writer.put(i)
+    writer.flush()
+    assert sink.rows == [0, 1, 2, 3, 4]
+    writer.close()
+
+
+def test_batches_are_capped_at_batch_size():
+    sink = _Recorder()
+    writer = AsyncBatchWriter(sink, batch_size=3, flush_interval=60)
+    for i in range(7):
+        writer.put(i)
+    writer.close()
+    assert sink.rows == list(range(7))
+    assert all(len(batch) <= 3 for batch in sink.batches)
+
+
+def test_close_drains_the_queue():
+    sink = _Recorder()
+    writer = AsyncBatchWriter(sink, batch_size=1000, flush_interval=60)
+    for i in range(50):
+        writer.put(i)
+    writer.close()
+    assert sink.rows == list(range(50))
+
+
+def test_put_after_close_raises():
+    writer = AsyncBatchWriter(_Recorder())
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.put('late')
+
+
+def test_flush_and_close_after_close_return():
+    sink = _Recorder()
+    writer = AsyncBatchWriter(sink, flush_interval=60)
+    writer.put('row')
+    writer.close()
+    writer.flush()
+    writer.close()
+    assert sink.rows == ['row']
+
+
+def test_write_errors_do_not_stop_the_writer():
+    written = []
+
+    def write_batch(batch):
+        if 'bad' in batch:
+            raise ValueError('disk full')
+        written.extend(batch)
+
+    writer = AsyncBatchWriter(write_batch, batch_size=1, flush_interval=60)
+    writer.put('bad')
+    writer.flush()
+    writer.put('good')
+    writer.close()
+    assert written == ['good']
+
+
+def test_concurrent_puts_and_close_lose_nothing():
+    sink = _Recorder()
+    writer = AsyncBatchWriter(sink, batch_size=16, flush_interval=0.01)
+    accepted = []
+    accepted_lock = threading.Lock()
+
+    def producer(n):
+        for i in range(200):
+            try:
+                writer.put((n, i))
+            except RuntimeError:
+                return
+            with accepted_lock:
+                accepted.append((n, i))
+
+    threads = [threading.Thread(target=producer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    writer.close()
+    for t in threads:
+        t.join()
+    assert sorted(sink.rows) == sorted(accepted)
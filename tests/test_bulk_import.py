@@ -0,0 +1,113 @@
+import pytest
+
+from src.database import bulk_insert_cameras, bulk_insert_students, connect, parse_import_rows
+from src.enroll_roster import enroll_roster, folder_candidates, match_folder
+
+
+def _students(conn):
+    return conn.execute("SELECT roll_no, name, dataset_folder FROM students ORDER BY roll_no").fetchall()
+
+
+# ---------------- bulk_insert_students ----------------
+def test_statuses_follow_input_order(conn):
+    bulk_insert_students(conn, [{'roll_no': 'A1', 'name': 'Asha'}])
+    statuses = bulk_insert_students(conn, [
+        {'roll_no': 'B2', 'name': 'Bala'},
+        {'roll_no': 'A1', 'name': 'Asha K'},
+        {'roll_no': 'B2', 'name': 'Bala again'},
+        {'roll_no': '', 'name': 'Nobody'},
+    ])
+    assert [s['status'] for s in statuses] == ['inserted', 'exists', 'duplicate', 'error']
+    assert _students(conn) == [('A1', 'Asha', None), ('B2', 'Bala', None)]
+
+
+def test_existing_student_without_folder_gets_linked(conn):
+    bulk_insert_students(conn, [{'roll_no': 'A1', 'name': 'Asha'},
+                                {'roll_no': 'B2', 'name': 'Bala', 'dataset_folder': 'bala'}])
+    statuses = bulk_insert_students(conn, [{'roll_no': 'A1', 'name': 'Asha K', 'dataset_folder': 'asha'},
+                                           {'roll_no': 'B2', 'name': 'Bala', 'dataset_folder': 'other'}])
+    assert [s['status'] for s in statuses] == ['linked', 'exists']
+    # Without update_existing, names and existing folders are kept
+    assert _students(conn) == [('A1', 'Asha', 'asha'), ('B2', 'Bala', 'bala')]
+
+
+def test_update_existing_overwrites_names_and_keeps_folders(conn):
+    bulk_insert_students(conn, [{'roll_no': 'A1', 'name': 'Asha', 'dataset_folder': 'asha'}])
+    statuses = bulk_insert_students(conn, [{'roll_no': 'A1', 'name': 'Asha K'}], update_existing=True)
+    assert statuses[0]['status'] == 'updated'
+    assert _students(conn) == [('A1', 'Asha K', 'asha')]
+
+
+def test_cameras_get_ids_and_skip_known_addresses(conn):
+    first = bulk_insert_cameras(conn, [{'ip_address': '10.0.0.1'}])
+    statuses = bulk_insert_cameras(conn, [{'ip_address': '10.0.0.2'}, {'ip_address': '10.0.0.1'},
+                                          {'ip_address': '10.0.0.2'}, {}])
+    assert [s['status'] for s in statuses] == ['inserted', 'exists', 'duplicate', 'error']
+    assert statuses[1]['camera_id'] == first[0]['camera_id']
+    assert statuses[0]['camera_id'] not in (None, first[0]['camera_id'])
+
+
+def test_parse_import_rows():
+    assert parse_import_rows(b'\xef\xbb\xbfroll_no,name\nA1,Asha\n') == [{'roll_no': 'A1', 'name': 'Asha'}]
+    assert parse_import_rows('[{"roll_no": "A1"}]', 'application/json') == [{'roll_no': 'A1'}]
+    with pytest.raises(ValueError):
+        parse_import_rows('{"roll_no": "A1"}', 'application/json')
+
+
+# ---------------- Roster Enrollment ----------------
+FOLDERS = ['midhuna', 'varun', 'Boomika', 'sri']
+
+
+def test_folder_matching():
+    assert folder_candidates('Boomika S', FOLDERS) == ['Boomika']
+    assert match_folder('Sri Midhuna S K', FOLDERS) is None
+    assert folder_candidates('Sri Midhuna S K', FOLDERS) == ['sri', 'midhuna']
+    assert match_folder('Varun S', FOLDERS) == 'varun'
+    assert match_folder('Yuvashri M', FOLDERS) is None
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    for folder in ('boomika', 'varun', 'kumar'):
+        (tmp_path / 'dataset' / folder).mkdir(parents=True)
+    return tmp_path / 'dataset'
+
+
+def _enroll(tmp_path, dataset, roster, **kwargs):
+    path = tmp_path / 'roster.csv'
+    path.write_text(roster)
+    db_path = str(tmp_path / 'attendance.db')
+    statuses = enroll_roster(str(path), str(dataset), db_path, **kwargs)
+    conn = connect(db_path)
+    try:
+        return statuses, dict(conn.execute("SELECT roll_no, dataset_folder FROM students"))
+    finally:
+        conn.close()
+
+
+def test_roster_links_unique_matches(tmp_path, dataset):
+    statuses, folders = _enroll(tmp_path, dataset, "roll_no,name\nA1,Boomika S\nA2,Varun S\nA3,Yuvashri M\n")
+    assert [s['status'] for s in statuses] == ['inserted'] * 3
+    assert folders == {'A1': 'boomika', 'A2': 'varun', 'A3': None}
+
+
+def test_roster_leaves_shared_folders_unlinked(tmp_path, dataset):
+    statuses, folders = _enroll(tmp_path, dataset,
+                                "roll_no,name,dataset_folder\nA1,Arun Kumar,\nA2,Kumar R,\nA3,Varun Boomika,\n"
+                                "A4,Someone,varun\n")
+    assert folders == {'A1': None, 'A2': None, 'A3': None, 'A4': 'varun'}
+    by_roll = {s['roll_no']: s for s in statuses}
+    assert by_roll['A1']['ambiguous'] == ['kumar']
+    assert by_roll['A3']['ambiguous'] == ['varun', 'boomika']
+    assert 'ambiguous' not in by_roll['A4']
+
+
+def test_roster_links_students_enrolled_earlier(tmp_path, dataset):
+    _enroll(tmp_path, dataset, "roll_no,name\nA1,Boomika\n")
+    conn = connect(str(tmp_path / 'attendance.db'))
+    with conn:
+        conn.execute("UPDATE students SET dataset_folder = NULL")
+    conn.close()
+    statuses, folders = _enroll(tmp_path, dataset, "roll_no,name\nA1,Boomika S\n")
+    assert statuses[0]['status'] == 'linked'
+    assert folders == {'A1': 'boomika'}
@@ -0,0 +1,154 @@
+import sqlite3
+
+import pytest
+
+from src.cluster import NodeAgent, SqliteSharedState, assign_cameras
+from src.utils import DedupeManager, FallbackKeyStore
+
+CAMERAS = [{'name': f'cam{i}'} for i in range(40)]
+
+
+def _owners(assignment):
+    return {cam['name']: node for node, cams in assignment.items() for cam in cams}
+
+
+# ---------------- Rendezvous Assignment ----------------
+def test_every_camera_has_exactly_one_owner():
+    assignment = assign_cameras(CAMERAS, {'n1': 1, 'n2': 1, 'n3': 1})
+    assert sorted(c['name'] for cams in assignment.values() for c in cams) == sorted(c['name'] for c in CAMERAS)
+    assert all(assignment.values())
+
+
+def test_assignment_does_not_depend_on_node_order():
+    a = assign_cameras(CAMERAS, {'n1': 1, 'n2': 2, 'n3': 1})
+    b = assign_cameras(CAMERAS, {'n3': 1, 'n1': 1, 'n2': 2})
+    assert _owners(a) == _owners(b)
+
+
+def test_only_the_leaving_nodes_cameras_move():
+    before = _owners(assign_cameras(CAMERAS, {'n1': 1, 'n2': 1, 'n3': 1}))
+    after = _owners(assign_cameras(CAMERAS, {'n1': 1, 'n2': 1}))
+    moved = {name for name in before if before[name] != after[name]}
+    assert moved == {name for name, node in before.items() if node == 'n3'}
+
+
+def test_a_joining_node_only_takes_cameras():
+    before = _owners(assign_cameras(CAMERAS, {'n1': 1, 'n2': 1}))
+    after = _owners(assign_cameras(CAMERAS, {'n1': 1, 'n2': 1, 'n3': 1}))
+    assert all(after[name] in (before[name], 'n3') for name in before)
+
+
+def test_capacity_weights_the_share():
+    cameras = [{'name': f'cam{i}'} for i in range(400)]
+    assignment = assign_cameras(cameras, {'small': 1, 'big': 3})
+    assert len(assignment['big']) > 2 * len(assignment['small'])
+
+
+def test_no_nodes_assigns_nothing():
+    assert assign_cameras(CAMERAS, {}) == {}
+
+
+# ---------------- Shared State ----------------
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'cluster_state.db')
+
+
+def test_sqlite_state_is_shared_between_nodes(state_path):
+    a, b = SqliteSharedState(state_path), SqliteSharedState(state_path)
+    try:
+        assert a.check_and_set('A1', [(('A1', None), 30)], now=100.0)
+        assert not b.check_and_set('A1', [(('A1', None), 30)], now=110.0)
+        assert b.is_live('A1', ('A1', None), now=129.0)
+        assert b.check_and_set('A1', [(('A1', None), 30)], now=131.0)
+    finally:
+        a.close()
+        b.close()
+
+
+class _BrokenState:
+    def __init__(self):
+        self.broken = True
+        self.keys = {}
+
+    def _check(self):
+        if self.broken:
+            raise sqlite3.OperationalError('database is locked')
+
+    def check_and_set(self, group, entries):
+        self._check()
+        if any(k in self.keys for k, _ in entries):
+            return False
+        self.keys.update(entries)
+        return True
+
+    def is_live(self, group, key):
+        self._check()
+        return key in self.keys
+
+    def set(self, group, entries):
+        self._check()
+        self.keys.update(entries)
+
+
+def test_fallback_store_dedupes_locally_while_shared_state_fails():
+    shared = _BrokenState()
+    dedupe = DedupeManager(same_camera_cooldown=60, cross_camera_cooldown=60, store=shared)
+    assert dedupe.check_and_mark('A1', 'gate')
+    assert not dedupe.check_and_mark('A1', 'gate')
+    assert not dedupe.should_count('A1', 'hall')
+
+
+def test_fallback_store_mirrors_shared_keys():
+    shared = _BrokenState()
+    shared.broken = False
+    store = FallbackKeyStore(shared, max_ttl=60)
+    assert store.check_and_set('A1', [('k', 30)], now=0.0)
+    shared.broken = True
+    # Still known locally after the backend goes away
+    assert store.is_live('A1', 'k', now=10.0)
+    assert not store.check_and_set('A1', [('k', 30)], now=10.0)
+    shared.broken = False
+    assert store.is_live('A1', 'k')
+
+
+# ---------------- Node Agent ----------------
+def _agent(state, node_id, alive=None):
+    started, stopped = [], []
+    agent = NodeAgent(state, CAMERAS, started.append, stopped.append, node_id=node_id,
+                      is_running=(lambda cam: alive.get(cam['name'], True)) if alive is not None else None)
+    return agent, started, stopped
+
+
+def test_agents_split_cameras_and_take_over_on_leave(state_path):
+    state = SqliteSharedState(state_path)
+    try:
+        a, a_started, _ = _agent(state, 'n1')
+        b, b_started, b_stopped = _agent(state, 'n2')
+        a.tick()
+        b.tick()
+        a.tick()
+        assert set(a.running).isdisjoint(b.running)
+        assert set(a.running) | set(b.running) == {c['name'] for c in CAMERAS}
+
+        # n1 leaves; n2 picks up its cameras on the next tick
+        a.stop()
+        b.tick()
+        assert set(b.running) == {c['name'] for c in CAMERAS}
+        assert not b_stopped
+    finally:
+        state.close()
+
+
+def test_agent_restarts_dead_camera_threads(state_path):
+    state = SqliteSharedState(state_path)
+    try:
+        alive = {}
+        agent, started, _ = _agent(state, 'n1', alive)
+        agent.tick()
+        assert len(started) == len(CAMERAS)
+        alive['cam3'] = False
+        agent.tick()
+        assert [c['name'] for c in started[len(CAMERAS):]] == ['cam3']
+    finally:
+        state.close()
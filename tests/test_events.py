@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from src.events import EventBus, sse_format
+
+
+def test_subscribers_get_matching_events_in_order():
+    bus = EventBus()
+    everything = bus.subscribe()
+    attendance = bus.subscribe(types=['attendance'])
+    bus.publish('recognition', label='A1')
+    bus.publish('attendance', roll_no='A1')
+    assert [e['type'] for e in (everything.get(0), everything.get(0))] == ['recognition', 'attendance']
+    assert attendance.get(0)['roll_no'] == 'A1'
+    assert attendance.get(0) is None
+
+
+def test_slow_subscriber_drops_oldest():
+    bus = EventBus()
+    sub = bus.subscribe(max_events=2)
+    for i in range(5):
+        bus.publish('recognition', n=i)
+    assert [sub.get(0)['n'], sub.get(0)['n']] == [3, 4]
+    assert sub.dropped == 3
+
+
+def test_closed_subscription_stops_receiving():
+    bus = EventBus()
+    sub = bus.subscribe()
+    sub.close()
+    assert not bus.has_subscribers
+    bus.publish('recognition')
+    assert sub.get(0) is None
+
+
+def test_get_async_wakes_on_publish_from_another_thread():
+    bus = EventBus()
+    sub = bus.subscribe()
+
+    async def consume():
+        timer = threading.Timer(0.05, bus.publish, args=('attendance',), kwargs={'roll_no': 'A1'})
+        timer.start()
+        try:
+            return await sub.get_async(timeout=5)
+        finally:
+            timer.join()
+
+    assert asyncio.run(consume())['roll_no'] == 'A1'
+
+
+def test_get_async_times_out_with_none():
+    sub = EventBus().subscribe()
+    assert asyncio.run(sub.get_async(timeout=0.01)) is None
+
+
+def test_sse_format():
+    assert sse_format({'type': 'attendance', 'roll_no': 'A1'}) == \
+        'event: attendance\ndata: {"type": "attendance", "roll_no": "A1"}\n\n'
@@ -0,0 +1,68 @@
+from src.utils import DedupeManager, TimedKeyStore
+
+
+def test_keys_expire_after_their_ttl():
+    store = TimedKeyStore(max_ttl=60)
+    assert store.check_and_set('p', [('k', 10)], now=100.0)
+    assert store.is_live('p', 'k', now=109.9)
+    assert not store.is_live('p', 'k', now=110.0)
+    assert not store.is_live('p', 'k', now=500.0)
+
+
+def test_check_and_set_is_all_or_nothing():
+    store = TimedKeyStore(max_ttl=60)
+    assert store.check_and_set('p', [('cam1', 5)], now=0.0)
+    # One live key blocks the whole group and sets nothing
+    assert not store.check_and_set('p', [('cam1', 5), ('any', 30)], now=1.0)
+    assert not store.is_live('p', 'any', now=1.0)
+    assert store.check_and_set('p', [('cam1', 5), ('any', 30)], now=6.0)
+    assert store.is_live('p', 'any', now=35.0)
+
+
+def test_set_overwrites_expiry():
+    store = TimedKeyStore(max_ttl=60)
+    store.set('p', [('k', 50)], now=0.0)
+    store.set('p', [('k', 5)], now=0.0)
+    assert not store.is_live('p', 'k', now=10.0)
+
+
+def test_expiry_survives_long_idle_gaps():
+    store = TimedKeyStore(max_ttl=10, num_slots=8)
+    store.set('p', [('short', 1), ('long', 10)], now=0.0)
+    # More than a full turn of the wheel later
+    assert not store.is_live('p', 'short', now=1000.0)
+    assert not store.is_live('p', 'long', now=1000.0)
+    store.set('p', [('k', 10)], now=1000.0)
+    assert store.is_live('p', 'k', now=1009.0)
+
+
+def test_full_store_evicts_keys_closest_to_expiry():
+    store = TimedKeyStore(max_ttl=100, stripes=1, max_entries=3)
+    store.set('g', [('a', 10), ('b', 50), ('c', 90)], now=0.0)
+    assert store.check_and_set('g', [('d', 60)], now=1.0)
+    assert not store.is_live('g', 'a', now=1.0)
+    assert all(store.is_live('g', k, now=1.0) for k in ('b', 'c', 'd'))
+
+
+def test_eviction_makes_room_for_the_whole_batch_only():
+    store = TimedKeyStore(max_ttl=100, stripes=1, max_entries=4)
+    store.set('g', [('a', 10), ('b', 20), ('c', 30), ('d', 40)], now=0.0)
+    store.set('g', [('e', 50), ('f', 60)], now=0.0)
+    live = [k for k in 'abcdef' if store.is_live('g', k, now=0.0)]
+    assert live == ['c', 'd', 'e', 'f']
+
+
+def test_dedupe_per_camera_and_across_cameras():
+    dedupe = DedupeManager(same_camera_cooldown=60, cross_camera_cooldown=60)
+    assert dedupe.check_and_mark('A1', 'gate')
+    assert not dedupe.check_and_mark('A1', 'gate')
+    assert not dedupe.check_and_mark('A1', 'hall')
+    assert dedupe.check_and_mark('B2', 'hall')
+
+
+def test_dedupe_ignores_unknown_and_distant_matches():
+    dedupe = DedupeManager(max_accepted_distance=0.5)
+    assert not dedupe.check_and_mark('Unknown', 'gate')
+    assert not dedupe.check_and_mark(-1, 'gate')
+    assert not dedupe.check_and_mark('A1', 'gate', distance=0.8)
+    assert dedupe.check_and_mark('A1', 'gate', distance=0.3)
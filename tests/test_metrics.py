@@ -0,0 +1,41 @@
+from src.metrics import MetricsRegistry
+
+
+def test_counters_gauges_and_values():
+    registry = MetricsRegistry()
+    registry.inc('frames_processed_total', camera='gate')
+    registry.inc('frames_processed_total', 2, camera='gate')
+    registry.set('camera_fps', 12.5, camera='gate')
+    registry.set('camera_fps', 10, camera='gate')
+    assert registry.value('frames_processed_total', camera='gate') == 3
+    assert registry.value('camera_fps', camera='gate') == 10
+    assert registry.value('frames_processed_total', camera='hall') == 0
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.describe('frames_skipped_total', 'Frames deliberately not processed')
+    registry.inc('frames_skipped_total', camera='gate', reason='scheduled')
+    for v in (0.1, 0.2, 0.3):
+        registry.observe('face_stage_seconds', v, stage='detect')
+    lines = registry.render().splitlines()
+    assert '# HELP frames_skipped_total Frames deliberately not processed' in lines
+    assert '# TYPE frames_skipped_total counter' in lines
+    assert 'frames_skipped_total{camera="gate",reason="scheduled"} 1' in lines
+    assert '# TYPE face_stage_seconds summary' in lines
+    assert 'face_stage_seconds{stage="detect",quantile="0.5"} 0.200000' in lines
+    assert 'face_stage_seconds_count{stage="detect"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc('frames_processed_total', camera='Lab "B"\\2\nnorth')
+    assert 'frames_processed_total{camera="Lab \\"B\\"\\\\2\\nnorth"} 1' in registry.render().splitlines()
+
+
+def test_quantiles_over_recent_window():
+    registry = MetricsRegistry(window=3)
+    for v in (100.0, 1.0, 2.0, 3.0):
+        registry.observe('face_stage_seconds', v, stage='embed')
+    assert registry.quantiles('face_stage_seconds', stage='embed') == {'p50': 2.0, 'p95': 3.0, 'p99': 3.0}
+    assert registry.quantiles('face_stage_seconds', stage='detect') == {}
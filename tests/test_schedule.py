@@ -0,0 +1,88 @@
+from datetime import datetime, time as dtime
+
+import pytest
+
+from src.schedule import (MODE_DETECT, MODE_FULL, MODE_LOW, MODE_OFF, CameraSchedule, Window,
+                          parse_days, parse_time, windows_from_config, windows_from_db)
+
+# 2024-05-06 is a Monday
+MON = datetime(2024, 5, 6)
+
+
+def at(day_offset, hour, minute=0):
+    return MON.replace(day=MON.day + day_offset, hour=hour, minute=minute)
+
+
+def test_inside_a_window_until_it_ends():
+    schedule = CameraSchedule([Window('gate', 'mon', '09:00', '10:00', MODE_FULL)], default_mode=MODE_OFF)
+    assert schedule.mode_at('gate', at(0, 9, 30)) == (MODE_FULL, at(0, 10))
+
+
+def test_outside_windows_default_until_next_start():
+    schedule = CameraSchedule([Window('gate', ['mon', 'wed'], '09:00', '10:00')], default_mode=MODE_OFF)
+    assert schedule.mode_at('gate', at(0, 8)) == (MODE_OFF, at(0, 9))
+    assert schedule.mode_at('gate', at(1, 23)) == (MODE_OFF, at(2, 9))
+    # Re-evaluated at least once a day, even with the next window further away
+    assert schedule.mode_at('gate', at(0, 10)) == (MODE_OFF, at(1, 10))
+
+
+def test_window_past_midnight_belongs_to_its_start_day():
+    schedule = CameraSchedule([Window('gate', 'fri', '20:00', '07:00', MODE_DETECT)], default_mode=MODE_OFF)
+    assert schedule.mode_at('gate', at(5, 3)) == (MODE_DETECT, at(5, 7))
+    # Thursday night is not covered
+    assert schedule.mode_at('gate', at(4, 3))[0] == MODE_OFF
+
+
+def test_most_active_overlapping_mode_wins():
+    schedule = CameraSchedule([Window('*', None, '08:00', '18:00', MODE_LOW),
+                               Window('gate', 'mon', '09:00', '10:00', MODE_FULL)], default_mode=MODE_OFF)
+    assert schedule.mode_at('gate', at(0, 8, 30)) == (MODE_LOW, at(0, 9))
+    assert schedule.mode_at('gate', at(0, 9, 30)) == (MODE_FULL, at(0, 10))
+    assert schedule.mode_at('gate', at(0, 10, 30)) == (MODE_LOW, at(0, 18))
+    # Camera-specific windows don't apply to other cameras
+    assert schedule.mode_at('hall', at(0, 9, 30)) == (MODE_LOW, at(0, 18))
+
+
+def test_without_windows_reevaluates_daily():
+    schedule = CameraSchedule([], default_mode=MODE_FULL)
+    assert schedule.mode_at('gate', at(0, 12)) == (MODE_FULL, at(1, 12))
+
+
+def test_windows_reload_from_loader():
+    windows = [Window('gate', None, '00:00', '12:00', MODE_FULL)]
+    schedule = CameraSchedule([], default_mode=MODE_OFF, loader=lambda: windows, reload_seconds=0)
+    assert schedule.mode_at('gate', at(0, 9))[0] == MODE_FULL
+
+
+def test_failed_reload_keeps_current_windows():
+    def broken():
+        raise OSError('database is locked')
+    schedule = CameraSchedule([Window('gate', None, '00:00', '12:00', MODE_FULL)], default_mode=MODE_OFF,
+                              loader=broken, reload_seconds=0)
+    assert schedule.mode_at('gate', at(0, 9))[0] == MODE_FULL
+
+
+def test_parsing():
+    assert parse_days(None) == parse_days('*') == frozenset(range(7))
+    assert parse_days(['Mon', 'friday', 6]) == frozenset({0, 4, 6})
+    # YAML reads an unquoted 09:30 as minutes
+    assert parse_time(570) == parse_time('09:30') == dtime(9, 30)
+    with pytest.raises(ValueError):
+        Window('gate', None, '09:00', '10:00', 'turbo')
+    with pytest.raises(ValueError):
+        CameraSchedule([], default_mode='turbo')
+
+
+def test_windows_from_config():
+    windows = windows_from_config([{'START': '09:00', 'END': '10:00', 'DAYS': ['mon'], 'MODE': 'LOW'},
+                                   {'CAMERA': 'gate', 'START': 480, 'END': '08:30'}])
+    assert [(w.camera, w.mode, w.start) for w in windows] == [('*', MODE_LOW, dtime(9)),
+                                                              ('gate', MODE_FULL, dtime(8))]
+
+
+def test_windows_from_db(conn, tmp_path):
+    with conn:
+        conn.execute("INSERT INTO camera_schedule (camera_name, weekday, start_time, end_time, mode) "
+                     "VALUES ('gate', 0, '09:00', '10:00', 'full')")
+    schedule = CameraSchedule(windows_from_db(str(tmp_path / 'attendance.db')), default_mode=MODE_OFF)
+    assert schedule.mode_at('gate', at(0, 9, 15)) == (MODE_FULL, at(0, 10))
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from src.database import (attendance_row, create_schema, daily_summary_query, insert_attendance,
+                          rebuild_summaries)
+
+
+def _table(conn, name, order):
+    return conn.execute(f"SELECT * FROM {name} ORDER BY {order}").fetchall()
+
+
+def _snapshot(conn):
+    return (_table(conn, 'attendance_daily', 'date'),
+            _table(conn, 'attendance_daily_student', 'date, roll_no'),
+            _table(conn, 'attendance_daily_camera', 'date, camera_id'))
+
+
+def test_triggers_maintain_all_summaries(conn):
+    insert_attendance(conn, [
+        attendance_row('A1', 1, datetime(2024, 5, 1, 9, 0)),
+        attendance_row('A1', 2, datetime(2024, 5, 1, 8, 30)),
+        attendance_row('B2', 1, datetime(2024, 5, 1, 10, 0)),
+        attendance_row('B2', 1, datetime(2024, 5, 2, 9, 0)),
+    ])
+    daily, students, cameras = _snapshot(conn)
+    assert daily == [('2024-05-01', 2), ('2024-05-02', 1)]
+    assert students == [
+        ('2024-05-01', 'A1', 2, '2024-05-01 08:30:00', '2024-05-01 09:00:00'),
+        ('2024-05-01', 'B2', 1, '2024-05-01 10:00:00', '2024-05-01 10:00:00'),
+        ('2024-05-02', 'B2', 1, '2024-05-02 09:00:00', '2024-05-02 09:00:00'),
+    ]
+    assert cameras == [
+        ('2024-05-01', 1, 2, '2024-05-01 09:00:00', '2024-05-01 10:00:00'),
+        ('2024-05-01', 2, 1, '2024-05-01 08:30:00', '2024-05-01 08:30:00'),
+        ('2024-05-02', 1, 1, '2024-05-02 09:00:00', '2024-05-02 09:00:00'),
+    ]
+
+
+def test_ignored_duplicates_do_not_count_twice(conn):
+    row = attendance_row('A1', 1, datetime(2024, 5, 1, 9, 0))
+    assert insert_attendance(conn, [row]) == 1
+    assert insert_attendance(conn, [attendance_row('A1', 1, datetime(2024, 5, 1, 11, 0))]) == 0
+    daily, students, cameras = _snapshot(conn)
+    assert daily == [('2024-05-01', 1)]
+    assert students[0][2] == 1 and students[0][4] == '2024-05-01 09:00:00'
+    assert cameras[0][2] == 1
+
+
+def test_rebuild_matches_triggers(conn):
+    insert_attendance(conn, [attendance_row(roll, cam, datetime(2024, 5, day, 8 + cam, day))
+                             for day in (1, 2) for roll in ('A1', 'B2', 'C3') for cam in (1, 2, 3)
+                             if (day + cam + len(roll)) % 4])
+    maintained = _snapshot(conn)
+    rebuild_summaries(conn.cursor())
+    assert _snapshot(conn) == maintained
+
+
+def test_existing_attendance_is_backfilled(conn):
+    insert_attendance(conn, [attendance_row('A1', 1, datetime(2024, 5, 1, 9, 0)),
+                             attendance_row('B2', 1, datetime(2024, 5, 1, 9, 5))])
+    expected = _snapshot(conn)
+    # A database from before the summaries existed
+    with conn:
+        conn.execute("DROP TRIGGER trg_attendance_summary")
+        for name in ('attendance_daily', 'attendance_daily_student', 'attendance_daily_camera'):
+            conn.execute(f"DROP TABLE {name}")
+    create_schema(conn)
+    assert _snapshot(conn) == expected
+
+
+def test_daily_summary_query(conn):
+    insert_attendance(conn, [attendance_row('A1', 1, datetime(2024, 5, d, 9, 0)) for d in (1, 2, 3)])
+    query, params, to_record = daily_summary_query({'date_from': '2024-05-02'})
+    assert [to_record(r) for r in conn.execute(query, params)] == [
+        {'date': '2024-05-02', 'present': 1}, {'date': '2024-05-03', 'present': 1}]
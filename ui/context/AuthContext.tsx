@@ -1,5 +1,5 @@
 import React, { createContext, useState, useContext, useEffect, ReactNode } from 'react';
-import { login as apiLogin } from '../services/api';
+import { login as apiLogin, logout as apiLogout } from '../services/api';
 
 interface AuthContextType {
   token: string | null;
@@ -31,6 +31,7 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
   };
 
   const logout = () => {
+    apiLogout();
     localStorage.removeItem('authToken');
     setToken(null);
   };
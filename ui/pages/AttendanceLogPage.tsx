@@ -1,26 +1,56 @@
+import React, { useEffect, useState, useMemo, useCallback } from 'react';
+import { getAttendancePage, getStudents } from '../services/api';
+import { AttendanceRecordWithName } from '../types';
 
-import React, { useEffect, useState, useMemo } from 'react';
-import { getAttendance, getStudents } from '../services/api';
-import { AttendanceRecordWithName, Student } from '../types';
+const PAGE_SIZE = 500;
+
+const isoDate = (d: Date) => d.toISOString().split('T')[0];
 
 const AttendanceLogPage: React.FC = () => {
     const [attendance, setAttendance] = useState<AttendanceRecordWithName[]>([]);
+    const [studentNames, setStudentNames] = useState<Map<string, string> | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState('');
     const [filterName, setFilterName] = useState('');
     const [filterRoll, setFilterRoll] = useState('');
+    // Only a date range is fetched (last 7 days by default), one page at a time
+    const [dateFrom, setDateFrom] = useState(() => {
+        const d = new Date();
+        d.setDate(d.getDate() - 6);
+        return isoDate(d);
+    });
+    const [dateTo, setDateTo] = useState(() => isoDate(new Date()));
+    const [nextAfterId, setNextAfterId] = useState<number | null>(null);
+
+    useEffect(() => {
+        getStudents()
+            .then(students => setStudentNames(new Map(students.map(s => [s.roll_no, s.name]))))
+            .catch(err => {
+                setError(err instanceof Error ? err.message : 'Failed to fetch students');
+                setLoading(false);
+            });
+    }, []);
+
+    const fetchPage = useCallback(async (afterId?: number) => {
+        const page = await getAttendancePage({ date_from: dateFrom, date_to: dateTo, after_id: afterId, limit: PAGE_SIZE });
+        const withNames = page.records.map(record => ({
+            ...record,
+            name: studentNames?.get(record.roll_no) || 'Unknown Student'
+        }));
+        setNextAfterId(page.nextAfterId);
+        return withNames;
+    }, [dateFrom, dateTo, studentNames]);
+
+    const byNewest = (records: AttendanceRecordWithName[]) =>
+        records.sort((a, b) => new Date(b.detected_time).getTime() - new Date(a.detected_time).getTime());
 
     useEffect(() => {
+        if (studentNames === null) return;
         const fetchData = async () => {
             try {
                 setLoading(true);
-                const [attendanceData, studentsData] = await Promise.all([getAttendance(), getStudents()]);
-                const studentsMap = new Map<string, string>(studentsData.map(s => [s.roll_no, s.name]));
-                const attendanceWithNames = attendanceData.map(record => ({
-                    ...record,
-                    name: studentsMap.get(record.roll_no) || 'Unknown Student'
-                }));
-                setAttendance(attendanceWithNames.sort((a, b) => new Date(b.detected_time).getTime() - new Date(a.detected_time).getTime()));
+                setAttendance(byNewest(await fetchPage()));
             } catch (err) {
                 setError(err instanceof Error ? err.message : 'Failed to fetch data');
             } finally {
@@ -28,7 +58,20 @@ const AttendanceLogPage: React.FC = () => {
             }
         };
         fetchData();
-    }, []);
+    }, [fetchPage, studentNames]);
+
+    const loadMore = async () => {
+        if (nextAfterId === null) return;
+        try {
+            setLoadingMore(true);
+            const more = await fetchPage(nextAfterId);
+            setAttendance(prev => byNewest([...prev, ...more]));
+        } catch (err) {
+            setError(err instanceof Error ? err.message : 'Failed to fetch data');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
     
     const filteredAttendance = useMemo(() => {
         return attendance.filter(record => {
@@ -48,6 +91,20 @@ const AttendanceLogPage: React.FC = () => {
                 <div className="flex flex-col md:flex-row justify-between items-center mb-4 gap-4">
                     <h2 className="text-xl font-semibold text-gray-700">Attendance Records</h2>
                     <div className="flex flex-col md:flex-row gap-4 w-full md:w-auto">
+                        <input
+                            type="date"
+                            value={dateFrom}
+                            max={dateTo}
+                            onChange={(e) => setDateFrom(e.target.value)}
+                            className="w-full md:w-auto px-4 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-primary"
+                        />
+                        <input
+                            type="date"
+                            value={dateTo}
+                            min={dateFrom}
+                            onChange={(e) => setDateTo(e.target.value)}
+                            className="w-full md:w-auto px-4 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-primary"
+                        />
                          <input
                             type="text"
                             placeholder="Filter by Name..."
@@ -91,6 +148,17 @@ const AttendanceLogPage: React.FC = () => {
                      {filteredAttendance.length === 0 && (
                         <p className="text-center text-gray-500 py-8">No matching records found.</p>
                     )}
+                    {nextAfterId !== null && (
+                        <div className="text-center py-4">
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="px-4 py-2 bg-primary text-white rounded-lg disabled:opacity-50"
+                            >
+                                {loadingMore ? 'Loading...' : `Load more (${attendance.length} loaded)`}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
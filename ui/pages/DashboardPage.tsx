@@ -1,23 +1,31 @@
 
 import React, { useEffect, useState, useMemo } from 'react';
-import { getStudents, getAttendance } from '../services/api';
-import { Student, AttendanceRecord } from '../types';
+import { getStudents, getDailySummary, subscribeToEvents, LiveEvent } from '../services/api';
+import { Student, DailySummary } from '../types';
 import StatCard from '../components/StatCard';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 const DashboardPage: React.FC = () => {
     const [students, setStudents] = useState<Student[]>([]);
-    const [attendance, setAttendance] = useState<AttendanceRecord[]>([]);
+    const [daily, setDaily] = useState<DailySummary[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    const [liveEvents, setLiveEvents] = useState<LiveEvent[]>([]);
+    const [liveUnavailable, setLiveUnavailable] = useState(false);
 
     useEffect(() => {
         const fetchData = async () => {
             try {
                 setLoading(true);
-                const [studentsData, attendanceData] = await Promise.all([getStudents(), getAttendance()]);
+                // The dashboard only charts the last 7 days
+                const since = new Date();
+                since.setDate(since.getDate() - 6);
+                const [studentsData, dailyData] = await Promise.all([
+                    getStudents(),
+                    getDailySummary(since.toISOString().split('T')[0]),
+                ]);
                 setStudents(studentsData);
-                setAttendance(attendanceData);
+                setDaily(dailyData);
             } catch (err) {
                 setError(err instanceof Error ? err.message : 'Failed to fetch data');
             } finally {
@@ -27,13 +35,29 @@ const DashboardPage: React.FC = () => {
         fetchData();
     }, []);
 
-    const todayString = new Date().toISOString().split('T')[0];
-    const presentToday = useMemo(() => {
-        const presentRollNos = new Set(
-            attendance.filter(record => record.date === todayString).map(record => record.roll_no)
+    // Live attendance feed; each new mark also refreshes today's count
+    useEffect(() => {
+        const today = new Date().toISOString().split('T')[0];
+        const unsubscribe = subscribeToEvents(
+            (event) => {
+                setLiveEvents(prev => [event, ...prev].slice(0, 10));
+                getDailySummary(today, today)
+                    .then(rows => setDaily(prev => [...prev.filter(d => d.date !== today), ...rows]))
+                    .catch(() => undefined);
+            },
+            ['attendance'],
+            () => setLiveUnavailable(true),
         );
-        return presentRollNos.size;
-    }, [attendance, todayString]);
+        return unsubscribe;
+    }, []);
+
+    const todayString = new Date().toISOString().split('T')[0];
+    const presentByDate = useMemo(
+        () => new Map(daily.map(d => [d.date, d.present])),
+        [daily]
+    );
+
+    const presentToday = presentByDate.get(todayString) ?? 0;
 
     const absentToday = useMemo(() => {
         return students.length - presentToday;
@@ -52,13 +76,13 @@ const DashboardPage: React.FC = () => {
         }).reverse();
 
         return last7Days.map(date => {
-            const count = new Set(attendance.filter(a => a.date === date).map(a => a.roll_no)).size;
+            const count = presentByDate.get(date) ?? 0;
             return {
                 name: new Date(date).toLocaleDateString('en-US', { weekday: 'short' }),
                 present: count
             };
         });
-    }, [attendance]);
+    }, [presentByDate]);
 
 
     if (loading) return <div className="text-center p-8">Loading dashboard...</div>;
@@ -106,6 +130,28 @@ const DashboardPage: React.FC = () => {
                     </BarChart>
                 </ResponsiveContainer>
             </div>
+
+            <div className="bg-white p-6 rounded-xl shadow-lg mt-8">
+                <h3 className="text-xl font-semibold text-gray-700 mb-4">Live Attendance</h3>
+                {liveUnavailable ? (
+                    <p className="text-gray-500">Live feed unavailable.</p>
+                ) : liveEvents.length === 0 ? (
+                    <p className="text-gray-500">Waiting for recognitions...</p>
+                ) : (
+                    <ul className="divide-y divide-gray-200">
+                        {liveEvents.map((event, i) => (
+                            <li key={`${event.ts}-${i}`} className="py-2 flex justify-between">
+                                <span className="font-medium text-gray-800">
+                                    {String(event.name ?? event.roll_no)} ({String(event.roll_no)})
+                                </span>
+                                <span className="text-gray-500">
+                                    {String(event.camera)} · {String(event.detected_time)}
+                                </span>
+                            </li>
+                        ))}
+                    </ul>
+                )}
+            </div>
         </div>
     );
 };
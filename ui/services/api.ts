@@ -1,4 +1,4 @@
-import { Student, Camera, AttendanceRecord } from '../types';
+import { Student, Camera, AttendanceRecord, DailySummary } from '../types';
 
 const BASE_URL = 'http://127.0.0.1:5000'; // Your Flask backend URL
 
@@ -36,6 +36,14 @@ export const login = async (email: string, password: string): Promise<{ token: s
     return handleResponse(response);
 };
 
+export const logout = async (): Promise<void> => {
+    // Best effort: the server revokes the token so cached verification can't outlive logout
+    await fetch(`${BASE_URL}/auth/logout`, {
+        method: 'POST',
+        headers: getAuthHeaders(),
+    }).catch(() => undefined);
+};
+
 // --- Students ---
 export const getStudents = async (): Promise<Student[]> => {
     const response = await fetch(`${BASE_URL}/students`, {
@@ -71,9 +79,80 @@ export const addCamera = async (ip_address: string): Promise<{ message: string }
 };
 
 // --- Attendance ---
-export const getAttendance = async (): Promise<AttendanceRecord[]> => {
-    const response = await fetch(`${BASE_URL}/attendance`, {
+export interface AttendanceQuery {
+    date_from?: string;
+    date_to?: string;
+    roll_no?: string;
+    camera_id?: number;
+    after_id?: number;
+    limit?: number;
+}
+
+export const getAttendance = async (query: AttendanceQuery = {}): Promise<AttendanceRecord[]> => {
+    const params = new URLSearchParams();
+    Object.entries(query).forEach(([key, value]) => {
+        if (value !== undefined && value !== '') params.append(key, String(value));
+    });
+    const qs = params.toString();
+    const response = await fetch(`${BASE_URL}/attendance${qs ? `?${qs}` : ''}`, {
+        headers: getAuthHeaders(),
+    });
+    return handleResponse(response);
+};
+
+export interface AttendancePage {
+    records: AttendanceRecord[];
+    // Cursor for the next page (pass as after_id), null when this was the last one
+    nextAfterId: number | null;
+}
+
+export const getAttendancePage = async (query: AttendanceQuery & { limit: number }): Promise<AttendancePage> => {
+    const params = new URLSearchParams();
+    Object.entries(query).forEach(([key, value]) => {
+        if (value !== undefined && value !== '') params.append(key, String(value));
+    });
+    const response = await fetch(`${BASE_URL}/attendance?${params.toString()}`, {
+        headers: getAuthHeaders(),
+    });
+    const records: AttendanceRecord[] = await handleResponse(response);
+    const next = response.headers.get('X-Next-After-Id');
+    return { records, nextAfterId: next ? Number(next) : null };
+};
+
+export const getDailySummary = async (date_from?: string, date_to?: string): Promise<DailySummary[]> => {
+    const params = new URLSearchParams();
+    if (date_from) params.append('date_from', date_from);
+    if (date_to) params.append('date_to', date_to);
+    const qs = params.toString();
+    const response = await fetch(`${BASE_URL}/attendance/summary/daily${qs ? `?${qs}` : ''}`, {
         headers: getAuthHeaders(),
     });
     return handleResponse(response);
 };
+
+// --- Live Events (SSE) ---
+export interface LiveEvent {
+    type: string;
+    ts: number;
+    [key: string]: unknown;
+}
+
+// The server caps concurrent streams per worker (503) and only sees events from
+// camera processes it shares a bus with; onError reports a stream that closed.
+export const subscribeToEvents = (
+    onEvent: (event: LiveEvent) => void,
+    types: string[] = ['attendance'],
+    onError?: () => void,
+): (() => void) => {
+    const token = localStorage.getItem('authToken') ?? '';
+    const params = new URLSearchParams({ token, types: types.join(',') });
+    const source = new EventSource(`${BASE_URL}/events/stream?${params.toString()}`);
+    types.forEach(type => {
+        source.addEventListener(type, (e) => onEvent(JSON.parse((e as MessageEvent).data)));
+    });
+    source.onerror = () => {
+        // EventSource retries dropped connections itself; CLOSED means it gave up (e.g. 401/503)
+        if (source.readyState === EventSource.CLOSED && onError) onError();
+    };
+    return () => source.close();
+};
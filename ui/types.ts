@@ -2,6 +2,7 @@
 export interface Student {
   roll_no: string;
   name: string;
+  dataset_folder?: string | null;
 }
 
 export interface Camera {
@@ -20,3 +21,8 @@ export interface AttendanceRecord {
 export interface AttendanceRecordWithName extends AttendanceRecord {
     name: string;
 }
+
+export interface DailySummary {
+  date: string;
+  present: number;
+}
@@ -1,20 +1,24 @@
 import cv2
 import time
+import numpy as np
 import sys
 import os
 import threading
+from datetime import datetime
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.recognize_faces import FaceRecognizer, draw_results
-from src.utils import load_config, AttendanceManager
+from src.utils import load_config, AttendanceManager, DedupeManager
+from src.metrics import REGISTRY, start_metrics_server
+from src.events import BUS
+from src.frames import FrameBufferPool
+from src.threads import apply_thread_budget, configure_worker_thread
+from src.schedule import CameraSchedule, MODE_FULL, MODE_LOW, MODE_DETECT, MODE_OFF, MODES, load_schedule
 
-# Video stream setup
-def _camera_loop(source, name, recognizer: FaceRecognizer, attendance: AttendanceManager):
-    print(f"[{name}] Starting camera thread...")
-    print(f"[{name}] Source: {source} (type: {type(source).__name__})")
-    
+def _open_capture(source, name):
+    """Open a camera source, or None if it can't be opened."""
     # Use DirectShow backend for integer indices (webcams) to avoid MSMF lock issues
     if isinstance(source, int):
         print(f"[{name}] Using DirectShow backend for webcam")
@@ -25,7 +29,7 @@ def _camera_loop(source, name, recognizer: FaceRecognizer, attendance: Attendanc
     
     if not cap.isOpened():
         print(f"[{name}] ✗ ERROR: Could not open video source!")
-        return
+        return None
     
     print(f"[{name}] ✓ Camera opened successfully")
     
@@ -35,53 +39,183 @@ def _camera_loop(source, name, recognizer: FaceRecognizer, attendance: Attendanc
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv2.CAP_PROP_FPS, 30)
         cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer lag
-    
+    return cap
+
+
+# Video stream setup
+def _camera_loop(source, name, recognizer: FaceRecognizer, attendance: AttendanceManager,
+                 dedupe: DedupeManager, stop_event: threading.Event = None, display: bool = True,
+                 pool_size: int = 3, schedule: CameraSchedule = None):
+    """Read, recognize and mark attendance for one camera until the stream
+    ends, 'q' is pressed or stop_event is set. display=False runs headless
+    (no window, no drawing), e.g. for load tests. With a schedule the camera
+    follows its timetable mode (full / low / detect / off) instead of
+    recognizing every frame around the clock."""
+    print(f"[{name}] Starting camera thread...")
+    print(f"[{name}] Source: {source} (type: {type(source).__name__})")
+
+    cap = None
+    opened_once = False
+    window_open = False
     prev_time = time.time()
     window_name = f"Face Recognition - {name}"
-    print(f"[{name}] Window name: '{window_name}'")
-    
-    # Create window
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-    cv2.resizeWindow(window_name, 640, 480)
 
     frame_count = 0
     skip_frames = 2 if isinstance(source, int) else 0  # Skip frames for webcam to improve FPS
-    
-    while True:
-        ret, frame = cap.read()
+
+    # Frames are decoded into a ring of reused buffers; annotation goes to a separate one
+    frames = FrameBufferPool(pool_size, name=name)
+    annotated = None
+
+    mode, until = MODE_FULL, None
+    next_check = 0.0
+    last_processed = 0.0
+
+    def wait(seconds):
+        if stop_event is not None:
+            stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    while stop_event is None or not stop_event.is_set():
+        # Re-evaluate the timetable when a window starts/ends (at least once a minute)
+        if schedule is not None and time.time() >= next_check:
+            now = datetime.now()
+            first_check = until is None
+            new_mode, until = schedule.mode_at(name, now)
+            next_check = time.time() + min(60.0, max(1.0, (until - now).total_seconds()))
+            if new_mode != mode or first_check:
+                print(f"[{name}] 🗓️ Schedule mode: {new_mode} until {until:%a %H:%M}")
+            mode = new_mode
+            REGISTRY.set('camera_schedule_mode', MODES.index(mode), camera=name)
+
+        # 'off' (overnight): the capture is released and nothing is decoded
+        if mode == MODE_OFF:
+            if cap is not None:
+                cap.release()
+                cap = None
+                print(f"[{name}] 💤 Capture suspended")
+            if window_open:
+                # Nothing would call waitKey while suspended, leaving a frozen
+                # "not responding" window; it is recreated when the camera resumes
+                cv2.destroyWindow(window_name)
+                cv2.waitKey(1)
+                window_open = False
+            wait(max(0.0, next_check - time.time()))
+            continue
+
+        if cap is None:
+            cap = _open_capture(source, name)
+            if cap is None:
+                if not opened_once:
+                    return
+                # Came back from a suspension but the camera isn't reachable yet
+                wait(30.0)
+                continue
+            if display and not window_open:
+                print(f"[{name}] Window name: '{window_name}'")
+
+                # Create window
+                cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+                cv2.resizeWindow(window_name, 640, 480)
+                window_open = True
+            opened_once = True
+
+        # Skip frames for webcam to improve performance (grab() advances without decoding)
+        if skip_frames > 0 and frame_count > 0 and (frame_count + 1) % (skip_frames + 1) != 0:
+            frame_count += 1
+            if not cap.grab():
+                REGISTRY.inc('frames_dropped_total', camera=name, reason='read_failed')
+                print(f"[{name}] ✗ Can't receive frame (stream end?). Exiting...")
+                break
+            REGISTRY.inc('frames_skipped_total', camera=name, reason='webcam_skip')
+            continue
+
+        # Low-rate modes keep draining the stream but only process LOW_RATE_FPS frames
+        if mode in (MODE_LOW, MODE_DETECT) and time.monotonic() - last_processed < 1.0 / schedule.low_rate_fps:
+            if not cap.grab():
+                REGISTRY.inc('frames_dropped_total', camera=name, reason='read_failed')
+                print(f"[{name}] ✗ Can't receive frame (stream end?). Exiting...")
+                break
+            REGISTRY.inc('frames_skipped_total', camera=name, reason='scheduled')
+            continue
+
+        with REGISTRY.timer('decode', camera=name):
+            ret, frame = frames.read(cap)
         if not ret:
+            REGISTRY.inc('frames_dropped_total', camera=name, reason='read_failed')
             print(f"[{name}] ✗ Can't receive frame (stream end?). Exiting...")
             break
         
         frame_count += 1
+        last_processed = time.monotonic()
         if frame_count == 1:
             print(f"[{name}] ✓ Successfully reading frames (shape: {frame.shape})")
-        
-        # Skip frames for webcam to improve performance
-        if skip_frames > 0 and frame_count % (skip_frames + 1) != 0:
-            continue
 
-        # Mirror webcam feed for natural view
+        # Mirror webcam feed for natural view (in place, no new frame)
         if isinstance(source, int):
-            frame = cv2.flip(frame, 1)
+            cv2.flip(frame, 1, dst=frame)
 
-        # Recognition (process every frame for accuracy)
-        results = recognizer.recognize_face(frame)
+        if mode == MODE_DETECT:
+            # Occupancy only: no embeddings, no attendance
+            with REGISTRY.timer('detect_only', camera=name):
+                results = recognizer.detect_faces(frame)
+            REGISTRY.inc('frames_processed_total', camera=name)
+            REGISTRY.inc('faces_detected_total', len(results), camera=name)
+        else:
+            # Recognition (process every frame for accuracy)
+            with REGISTRY.timer('recognize', camera=name):
+                results = recognizer.recognize_face(frame)
+            REGISTRY.inc('frames_processed_total', camera=name)
+            REGISTRY.inc('faces_detected_total', len(results), camera=name)
 
-        # Attendance marking
-        for r in results:
-            label = r.get('label', 'Unknown')
-            if attendance.should_mark(label):
-                attendance.mark(label, name)
-                print(f"✓ {label} is present (camera: {name})")
+            if len(results) and BUS.has_subscribers:
+                BUS.publish('recognition', camera=name, faces=results.to_dicts())
 
-        # Draw bounding boxes and labels
-        annotated = draw_results(frame, results)
+        # Attendance marking (not in detect-only mode, where every face is Unknown)
+        if mode != MODE_DETECT:
+            # With a schedule the cooldown ends at the next mode change: a mark in a
+            # 'full' window doesn't carry into the next one, and a sighting in 'low'
+            # mode before class doesn't suppress the mark once the window starts
+            period_cooldown = None
+            if schedule is not None:
+                period_cooldown = (until - datetime.now()).total_seconds()
+            with REGISTRY.timer('attendance', camera=name):
+                known = int(results.known_mask().sum())
+                REGISTRY.inc('faces_recognized_total', known, camera=name)
+                REGISTRY.inc('faces_unknown_total', len(results) - known, camera=name)
+                known = results.known_mask()
+                known_ids = results.label_ids[known]
+                for label_id, identity_id, distance in zip(known_ids, recognizer.identity_ids[known_ids],
+                                                           results.distances[known]):
+                    identity_id = int(identity_id)
+                    # No main-model distance when the cascade accepted the face on its own threshold
+                    distance = float(distance) if np.isfinite(distance) else None
+                    # Same person seen again within the cooldowns (by any camera thread, or any
+                    # cluster node: roll_no is the one id every node agrees on)
+                    if not dedupe.check_and_mark(attendance.roll_no(identity_id), name, distance):
+                        continue
+                    REGISTRY.inc('sightings_total', camera=name)
+                    # Folder name is only looked up for the log line / CSV
+                    label = recognizer.labels[label_id]
+                    if attendance.try_mark(identity_id, name, label, cooldown_seconds=period_cooldown):
+                        print(f"✓ {label} ({attendance.roll_no(identity_id)}) is present (camera: {name})")
 
         # Calculate and display FPS
         curr_time = time.time()
         fps = 1.0 / max(curr_time - prev_time, 1e-6)
         prev_time = curr_time
+        REGISTRY.set('camera_fps', fps, camera=name)
+
+        if not display:
+            continue
+
+        # Draw bounding boxes and labels on a reused copy; the decoded frame stays untouched
+        with REGISTRY.timer('draw', camera=name):
+            if annotated is None or annotated.shape != frame.shape:
+                annotated = np.empty_like(frame)
+            np.copyto(annotated, frame)
+            draw_results(annotated, results)
         
         # FPS text with background for better visibility
         text = f"FPS: {fps:.1f}"
@@ -102,16 +236,43 @@ def _camera_loop(source, name, recognizer: FaceRecognizer, attendance: Attendanc
             print(f"[{name}] Quit requested by user")
             break
 
-    cap.release()
-    try:
-        cv2.destroyWindow(window_name)
-    except:
-        pass  # Window may not exist if camera failed early
+    if cap is not None:
+        cap.release()
+    if window_open:
+        try:
+            cv2.destroyWindow(window_name)
+        except:
+            pass  # Window may not exist if camera failed early
+
+
+def _start_embedded_api(port):
+    """Run the Flask API in this process so /events/stream sees live recognition events."""
+    from src.api_backend import app, init_db
+    init_db()
+    t = threading.Thread(target=app.run, kwargs={'host': '0.0.0.0', 'port': port, 'threaded': True,
+                                                 'use_reloader': False}, daemon=True)
+    t.start()
+    print(f"🌐 API (with live event stream) running on port {port}")
 
 
 def run_video_stream():
 
     config = load_config()
+    cluster_cfg = config.get('CLUSTER', {}) if config else {}
+    shared_state = None
+    if cluster_cfg.get('ENABLED', False):
+        from src.cluster import create_shared_state
+        # Cooldowns and attendance events are shared with the other nodes
+        shared_state = create_shared_state(cluster_cfg)
+
+    sources = config.get('CAMERA_SOURCES', []) if config else []
+    if not sources:
+        sources = [{ 'name': 'Webcam-0', 'source': 0 }]
+
+    # One inference worker per camera. run_video.py exports the OMP/BLAS
+    # variables before numpy/cv2 load; this applies OpenCV and the gauges.
+    apply_thread_budget(config or {}, workers=len(sources))
+
     try:
         recognizer = FaceRecognizer()
     except Exception as e:
@@ -123,12 +284,37 @@ def run_video_stream():
     att_cfg = config.get('ATTENDANCE', {}) if config else {}
     attendance = AttendanceManager(
         cooldown_hours=int(att_cfg.get('COOLDOWN_HOURS', 4)),
-        log_file=att_cfg.get('LOG_FILE', None)
+        log_file=att_cfg.get('LOG_FILE', None),
+        db_path=att_cfg.get('DATABASE', None),
+        roll_numbers=recognizer.roll_numbers,
+        batch_size=int(att_cfg.get('FLUSH_BATCH_SIZE', 64)),
+        flush_interval=float(att_cfg.get('FLUSH_INTERVAL_SECONDS', 1.0)),
+        fsync=str(att_cfg.get('FSYNC', 'batch')),
+        shared_state=shared_state
     )
 
-    sources = config.get('CAMERA_SOURCES', []) if config else []
-    if not sources:
-        sources = [{ 'name': 'Webcam-0', 'source': 0 }]
+    dedupe_cfg = config.get('DEDUPLICATION', {}) if config else {}
+    dedupe = DedupeManager(
+        same_camera_cooldown=int(dedupe_cfg.get('SAME_CAMERA_COOLDOWN_SECONDS', 15)),
+        cross_camera_cooldown=int(dedupe_cfg.get('CROSS_CAMERA_COOLDOWN_SECONDS', 30)),
+        max_accepted_distance=dedupe_cfg.get('MAX_ACCEPTED_DISTANCE', None),
+        max_entries=int(dedupe_cfg.get('MAX_ENTRIES', 100000)),
+        store=shared_state
+    )
+
+    # Timetable: full rate in attendance windows, low-rate/detect-only outside, off overnight
+    schedule = load_schedule(config) if config else None
+
+    metrics_cfg = config.get('METRICS', {}) if config else {}
+    if metrics_cfg.get('ENABLED', True):
+        try:
+            start_metrics_server(int(metrics_cfg.get('PORT', 9100)))
+        except OSError as e:
+            print(f"Warning: could not start metrics server: {e}")
+
+    api_cfg = config.get('API', {}) if config else {}
+    if api_cfg.get('SERVE_WITH_VIDEO', False):
+        _start_embedded_api(int(api_cfg.get('PORT', 5000)))
 
     print(f"\n{'='*60}")
     print(f"📹 Camera Sources: {len(sources)}")
@@ -136,21 +322,63 @@ def run_video_stream():
         print(f"   {i+1}. {cam.get('name')} → {cam.get('source')}")
     print(f"{'='*60}")
     print("🎬 Starting video streams... Press 'q' in any window to exit.\n")
-    
-    threads = []
-    for i, cam in enumerate(sources):
+
+    threads = {}  # camera name -> (thread, stop event)
+
+    def start_camera(cam):
         name = str(cam.get('name', cam.get('source', 'camera')))
         src = cam.get('source', 0)
-        t = threading.Thread(target=_camera_loop, args=(src, name, recognizer, attendance), daemon=True)
+        attendance.register_camera(name, src)
+        stop_event = threading.Event()
+        worker_index = sources.index(cam) if cam in sources else len(threads)
+
+        def run():
+            # FAISS's OpenMP team size is per thread; pins only with THREADS.PIN_CORES
+            configure_worker_thread(worker_index)
+            _camera_loop(src, name, recognizer, attendance, dedupe, stop_event, schedule=schedule)
+
+        t = threading.Thread(target=run, daemon=True)
         t.start()
-        threads.append(t)
-        time.sleep(0.3)  # Small delay between starting threads
+        threads[name] = (t, stop_event)
+
+    def stop_camera(cam):
+        name = str(cam.get('name', cam.get('source', 'camera')))
+        t, stop_event = threads.pop(name, (None, None))
+        if t is not None:
+            stop_event.set()
+            t.join(timeout=5)
+
+    def camera_running(cam):
+        t, _ = threads.get(str(cam.get('name', cam.get('source', 'camera'))), (None, None))
+        return t is not None and t.is_alive()
+
+    agent = None
+    if shared_state is not None:
+        # This node runs only its share of CAMERA_SOURCES; the share follows node joins/losses
+        from src.cluster import NodeAgent
+        agent = NodeAgent(shared_state, sources, start_camera, stop_camera,
+                          node_id=cluster_cfg.get('NODE_ID') or None,
+                          capacity=int(cluster_cfg.get('CAPACITY', 1)),
+                          heartbeat_interval=float(cluster_cfg.get('HEARTBEAT_SECONDS', 5)),
+                          node_ttl=float(cluster_cfg.get('NODE_TTL_SECONDS', 15)),
+                          is_running=camera_running)
+        print(f"🔗 Cluster node {agent.node_id} joining ({cluster_cfg.get('BACKEND', 'sqlite')} backend)")
+        agent.start()
+    else:
+        for cam in sources:
+            start_camera(cam)
+            time.sleep(0.3)  # Small delay between starting threads
 
-    
     try:
-        while any(t.is_alive() for t in threads):
+        # A cluster node keeps running (cameras may be reassigned to it) until interrupted
+        while agent is not None or any(t.is_alive() for t, _ in list(threads.values())):
             time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
     finally:
+        if agent is not None:
+            agent.stop()
+        attendance.close()
         cv2.destroyAllWindows()
         print("Video streams closed.")
 